@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
 from agents import Agent, RunContextWrapper, function_tool
 from chatkit.agents import AgentContext
 from pydantic import BaseModel, ConfigDict, Field
 
 from .car_inventory import CarInventoryStore, CarRecord, load_inventory
+from .inventory_geo import Coordinates, distance_miles, geocode
 
 CAR_AGENT_INSTRUCTIONS = """
 You are Scout, a personable dealership guide who helps shoppers narrow inventory.
@@ -18,7 +19,22 @@ Workflow expectations:
 - Ask quick clarifying questions when key info is missing (budget, seats, powertrain).
 - Summaries should highlight 2-3 standout matches and why they fit.
 - Mention the next filter to confirm so the shopper feels guided.
-- If no cars match, call out what's missing and suggest relaxing one constraint.
+- Pass `sort` to `search_inventory` when the shopper cares most about age, mileage,
+  EV range or overall value rather than price.
+- When the shopper wants a car near a town, set `near` (and `radius_miles` if they
+  say how far they will travel) instead of `locations`; `sort="nearest"` then lists
+  the closest cars first.
+- If no cars match, call out what's missing and suggest relaxing one constraint; the
+  `relaxations` list says how many cars each dropped or widened filter would bring back.
+- Use the `facets` counts to suggest the next filter that splits the matches well.
+- `corrections` lists filter values that were misspelled or unknown and the inventory
+  value searched instead; mention a correction briefly if it changes the meaning.
+- When the shopper asks for cars like one they have seen, or describes a feel rather
+  than specs ("quiet, comfy cruiser"), call `find_similar_cars` with the car id and/or
+  the description; it stays within the active filters unless `within_filters=false`.
+- When a car the shopper likes is over budget or otherwise out of reach, call
+  `find_alternative_cars` with its id for the closest cars on price, year, mileage,
+  seats and range that still fit their make, body style and feature filters.
 - Use `reset_inventory_filters` when the shopper wants to start from scratch.
 - When the shopper is satisfied, point them to the "More information" buttons in the
   results panel to view the listing.
@@ -26,6 +42,8 @@ Workflow expectations:
 
 MODEL = "gpt-4.1-mini"
 
+SortOrder = Literal["cheapest", "newest", "lowest_mileage", "best_range", "value", "nearest"]
+
 
 class CarAgentContext(AgentContext):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -42,9 +60,14 @@ class CarSummary(BaseModel):
     fuel_type: str
     location: str
     listing_url: str
+    # Miles from the shopper's `near` place, when they searched by distance.
+    distance_miles: float | None = None
+    # Cosine similarity of the listing text to the `find_similar_cars` query, from 0 to 1.
+    similarity: float | None = None
 
     @classmethod
-    def from_record(cls, car: CarRecord) -> "CarSummary":
+    def from_record(cls, car: CarRecord, origin: Coordinates | None = None) -> "CarSummary":
+        place = geocode(car.location) if origin is not None else None
         return cls(
             id=car.id,
             name=car.display_name(),
@@ -55,6 +78,9 @@ class CarSummary(BaseModel):
             fuel_type=car.fuel_type,
             location=car.location,
             listing_url=car.listing_url,
+            distance_miles=None
+            if origin is None or place is None
+            else round(distance_miles(origin, place), 1),
         )
 
 
@@ -62,6 +88,18 @@ class CarSearchResult(BaseModel):
     total: int
     filters: dict[str, Any]
     cars: list[CarSummary]
+    # Match counts per make, body style, drivetrain, fuel type, location and price/mileage band.
+    facets: dict[str, Any] = Field(default_factory=dict)
+    # Set when the requested filters matched nothing: the match count with each one relaxed.
+    relaxations: list[dict[str, Any]] = Field(default_factory=list)
+    # Requested values that matched nothing in the inventory, and the known value used instead.
+    corrections: list[dict[str, Any]] = Field(default_factory=list)
+
+
+class SimilarCarsResult(BaseModel):
+    # The filters candidates were drawn from; empty when the whole inventory was searched.
+    filters: dict[str, Any]
+    cars: list[CarSummary]
 
 
 class CarFilterCriteria(BaseModel):
@@ -76,6 +114,8 @@ class CarFilterCriteria(BaseModel):
     fuel_types: list[str] | None = None
     must_have_features: list[str] | None = None
     locations: list[str] | None = None
+    near: str | None = Field(None, description="Town or city to search around, e.g. Reading")
+    radius_miles: int | None = Field(None, description="Search radius around `near` (default 25)")
 
     def to_update(self) -> dict[str, Any]:
         return self.model_dump(exclude_none=True)
@@ -94,8 +134,8 @@ async def list_inventory(
     limit: int = 6,
 ) -> CarSearchResult:
     inventory = ctx.context.inventory
-    cars = inventory.initial_matches()[: max(1, limit)]
-    profile = inventory.get_profile(_thread_id(ctx))
+    cars = await inventory.initial_matches_async(max(1, limit))
+    profile = await inventory.get_profile_async(_thread_id(ctx))
     return CarSearchResult(
         total=len(inventory.initial_matches()),
         filters=profile.filters.to_payload(),
@@ -107,14 +147,78 @@ async def list_inventory(
 async def search_inventory(
     ctx: RunContextWrapper[CarAgentContext],
     criteria: CarFilterCriteria,
+    sort: SortOrder = "cheapest",
 ) -> CarSearchResult:
     inventory = ctx.context.inventory
-    matches = inventory.update_filters(_thread_id(ctx), criteria.to_update())
+    matches = await inventory.update_filters_async(_thread_id(ctx), criteria.to_update())
     profile = inventory.get_profile(_thread_id(ctx))
+    area = profile.filters.area()
+    origin = geocode(area[0]) if area is not None else None
+    if sort == "nearest" and area is None:
+        sort = "cheapest"
     return CarSearchResult(
         total=len(matches),
         filters=profile.filters.to_payload(),
-        cars=[CarSummary.from_record(car) for car in matches[:8]],
+        cars=[
+            CarSummary.from_record(car, origin)
+            for car in await inventory.ranked_async(_thread_id(ctx), sort, limit=8)
+        ],
+        facets=await inventory.facets_async(_thread_id(ctx)),
+        relaxations=profile.relaxations,
+        corrections=profile.corrections,
+    )
+
+
+@function_tool(
+    description_override=(
+        "Find cars whose listing reads most like a given car and/or a free-text description, "
+        "optionally restricted to the shopper's active filters."
+    )
+)
+async def find_similar_cars(
+    ctx: RunContextWrapper[CarAgentContext],
+    car_id: str | None = None,
+    description: str | None = None,
+    within_filters: bool = True,
+    limit: int = 5,
+) -> SimilarCarsResult:
+    inventory = ctx.context.inventory
+    profile = await inventory.get_profile_async(_thread_id(ctx))
+    matches = await inventory.similar_async(
+        _thread_id(ctx), car_id, description, max(1, limit), within_filters
+    )
+    area = profile.filters.area()
+    origin = geocode(area[0]) if area is not None else None
+    filtered = within_filters and profile.searched
+    return SimilarCarsResult(
+        filters=profile.filters.to_payload() if filtered else {},
+        cars=[
+            CarSummary.from_record(car, origin).model_copy(update={"similarity": round(score, 3)})
+            for car, score in matches
+        ],
+    )
+
+
+@function_tool(
+    description_override=(
+        "Find the cars closest to a given car on price, year, mileage, seats and EV range "
+        "that still meet the shopper's make, body style, drivetrain, fuel, feature and "
+        "location filters."
+    )
+)
+async def find_alternative_cars(
+    ctx: RunContextWrapper[CarAgentContext],
+    car_id: str,
+    limit: int = 5,
+) -> SimilarCarsResult:
+    inventory = ctx.context.inventory
+    filters = (await inventory.get_profile_async(_thread_id(ctx))).filters
+    area = filters.area()
+    origin = geocode(area[0]) if area is not None else None
+    alternatives = await inventory.alternatives_async(_thread_id(ctx), car_id, max(1, limit))
+    return SimilarCarsResult(
+        filters=filters.categorical().to_payload(),
+        cars=[CarSummary.from_record(car, origin) for car, _ in alternatives],
     )
 
 
@@ -124,11 +228,11 @@ async def reset_inventory_filters(
 ) -> CarSearchResult:
     inventory = ctx.context.inventory
     profile = inventory.reset_profile(_thread_id(ctx))
-    matches = inventory.initial_matches()
     return CarSearchResult(
-        total=len(matches),
+        total=len(inventory.initial_matches()),
         filters=profile.filters.to_payload(),
-        cars=[CarSummary.from_record(car) for car in matches[:8]],
+        cars=[CarSummary.from_record(car) for car in await inventory.initial_matches_async(8)],
+        facets=await inventory.facets_async(_thread_id(ctx)),
     )
 
 
@@ -137,12 +241,19 @@ async def get_current_preferences(
     ctx: RunContextWrapper[CarAgentContext],
 ) -> dict[str, Any]:
     inventory = ctx.context.inventory
-    summary = inventory.build_context_block(_thread_id(ctx))
+    summary = await inventory.build_context_block_async(_thread_id(ctx))
     return {"profile": summary}
 
 
 def build_car_agent() -> Agent[CarAgentContext]:
-    tools = [list_inventory, search_inventory, reset_inventory_filters, get_current_preferences]
+    tools = [
+        list_inventory,
+        search_inventory,
+        find_similar_cars,
+        find_alternative_cars,
+        reset_inventory_filters,
+        get_current_preferences,
+    ]
     return Agent[CarAgentContext](
         model=MODEL,
         name="Scout",
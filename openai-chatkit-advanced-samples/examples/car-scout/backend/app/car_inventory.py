@@ -1,12 +1,109 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import heapq
 import json
-from dataclasses import dataclass, field
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Iterable, Sequence
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+    TypeVar,
+    overload,
+)
 
+import numpy as np
+import orjson
+from numpy.typing import NDArray
 
-@dataclass
+from .inventory_cache import FilterResultCache
+from .inventory_columnar import ColumnarInventory
+from .inventory_geo import DEFAULT_RADIUS_MILES, distance_miles, geocode, normalize_place
+from .inventory_index import (
+    CATEGORICAL_FILTERS,
+    HISTOGRAM_EDGES,
+    MILEAGE_LIMIT,
+    SORT_ORDERS,
+    CategoricalCounts,
+    InventoryIndex,
+    bits_from_rows,
+    rank_value,
+)
+from .inventory_neighbors import NEIGHBOR_POOL, AttributeSpace
+from .inventory_parallel import ShardedSearchExecutor
+from .inventory_payloads import PayloadCache
+from .inventory_profiles import MatchSet, ProfileStore
+from .inventory_similarity import TextVectors
+from .inventory_vocabulary import FilterVocabulary
+
+if TYPE_CHECKING:
+    from .inventory_snapshot import InventorySnapshot, MappingOverlay, RowOverlay
+    from .inventory_sqlite import SqliteInventory
+
+INVENTORY_ENGINES = ("python", "numpy", "sqlite")
+
+T = TypeVar("T")
+
+# Profile changes touching more ids than this are announced as a replacement, not a diff.
+PROFILE_DIFF_LIMIT = 1_000
+
+ProfileListener = Callable[[str, dict[str, Any]], None]
+
+# Relaxation analysis widens numeric bounds by this fraction of their value.
+RELAXATION_STEP = 0.1
+
+# Values that repeat across thousands of cars; each distinct string is stored once.
+INTERNED_FIELDS = (
+    "make",
+    "model",
+    "trim",
+    "body_style",
+    "drivetrain",
+    "fuel_type",
+    "color",
+    "location",
+)
+
+# Fields the indexes compare and sort on, which a delta must not get wrong.
+INTEGER_FIELDS = ("year", "price", "mileage", "seats")
+TEXT_FIELDS = (*INTERNED_FIELDS, "id", "description", "listing_url", "image_url")
+
+CAR_PAYLOAD_FIELDS = (
+    "id",
+    "name",
+    "make",
+    "model",
+    "trim",
+    "year",
+    "price",
+    "mileage",
+    "body_style",
+    "drivetrain",
+    "fuel_type",
+    "seats",
+    "range_miles",
+    "color",
+    "location",
+    "description",
+    "features",
+    "listing_url",
+    "image_url",
+)
+
+
+@dataclass(frozen=True, slots=True)
 class CarRecord:
     id: str
     make: str
@@ -23,16 +120,23 @@ class CarRecord:
     color: str
     location: str
     description: str
-    features: list[str]
+    features: tuple[str, ...]
     listing_url: str
     image_url: str
 
+    def __post_init__(self) -> None:
+        for name in INTERNED_FIELDS:
+            object.__setattr__(self, name, sys.intern(getattr(self, name)))
+        object.__setattr__(
+            self, "features", tuple(sys.intern(feature) for feature in self.features)
+        )
+
     def display_name(self) -> str:
         trim = f" {self.trim}" if self.trim else ""
         return f"{self.year} {self.make} {self.model}{trim}".strip()
 
-    def to_payload(self) -> dict[str, Any]:
-        return {
+    def to_payload(self, fields: Sequence[str] | None = None) -> dict[str, Any]:
+        payload = {
             "id": self.id,
             "name": self.display_name(),
             "make": self.make,
@@ -49,10 +153,11 @@ class CarRecord:
             "color": self.color,
             "location": self.location,
             "description": self.description,
-            "features": self.features,
+            "features": list(self.features),
             "listing_url": self.listing_url,
             "image_url": self.image_url,
         }
+        return payload if fields is None else {name: payload[name] for name in fields}
 
 
 @dataclass
@@ -68,6 +173,9 @@ class CarFilters:
     min_year: int | None = None
     must_have_features: list[str] = field(default_factory=list)
     locations: list[str] = field(default_factory=list)
+    # A place name from the gazetteer; only cars within `radius_miles` of it match.
+    near: str | None = None
+    radius_miles: int | None = None
 
     def is_empty(self) -> bool:
         values: Sequence[Any] = (
@@ -82,9 +190,137 @@ class CarFilters:
             self.fuel_types,
             self.must_have_features,
             self.locations,
+            self.near,
         )
         return all(value in (None, [], "") for value in values)
 
+    def cache_key(self) -> Hashable:
+        """Canonical form of the filters: list order, case and duplicates do not matter."""
+
+        def canonical(values: list[str]) -> tuple[str, ...]:
+            return tuple(sorted({value.lower() for value in values}))
+
+        return (
+            self.price_min,
+            self.price_max,
+            self.seats_min,
+            self.max_mileage,
+            self.min_year,
+            canonical(self.makes),
+            canonical(self.body_styles),
+            canonical(self.drivetrains),
+            canonical(self.fuel_types),
+            canonical(self.must_have_features),
+            canonical(self.locations),
+            *(self.area() or (None, None)),
+        )
+
+    @classmethod
+    def from_cache_key(cls, key: Hashable) -> CarFilters:
+        assert isinstance(key, tuple)
+        price_min, price_max, seats_min, max_mileage, min_year, *lists, near, radius_miles = key
+        makes, body_styles, drivetrains, fuel_types, features, locations = map(list, lists)
+        return cls(
+            price_min=price_min,
+            price_max=price_max,
+            makes=makes,
+            body_styles=body_styles,
+            drivetrains=drivetrains,
+            fuel_types=fuel_types,
+            seats_min=seats_min,
+            max_mileage=max_mileage,
+            min_year=min_year,
+            must_have_features=features,
+            locations=locations,
+            near=near,
+            radius_miles=radius_miles,
+        )
+
+    def area(self) -> tuple[str, int] | None:
+        """The normalized `near` place and the radius around it, if a radius search is on."""
+        if not self.near:
+            return None
+        radius = DEFAULT_RADIUS_MILES if self.radius_miles is None else self.radius_miles
+        return normalize_place(self.near), radius
+
+    def categorical(self) -> CarFilters:
+        """These filters without their price, seat, mileage and year bounds."""
+        return replace(
+            self, price_min=None, price_max=None, seats_min=None, max_mileage=None, min_year=None
+        )
+
+    def matches(self, car: CarRecord) -> bool:
+        """Check a single car, with the same semantics as the indexed searches."""
+        if self.price_min is not None and car.price < self.price_min:
+            return False
+        if self.price_max is not None and car.price > self.price_max:
+            return False
+        if self.seats_min is not None and car.seats < self.seats_min:
+            return False
+        if self.max_mileage is not None and car.mileage > self.max_mileage:
+            return False
+        if self.min_year is not None and car.year < self.min_year:
+            return False
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            values: list[str] = getattr(self, key)
+            if values and getattr(car, attribute).lower() not in {v.lower() for v in values}:
+                return False
+        area = self.area()
+        if area is not None:
+            origin, place = geocode(area[0]), geocode(car.location)
+            if origin is None or place is None or distance_miles(origin, place) > area[1]:
+                return False
+        feature_blob = " ".join(car.features).lower()
+        return all(feature.lower() in feature_blob for feature in self.must_have_features)
+
+    def constraints(self) -> list[FilterConstraint]:
+        """Every active filter on its own; each must-have feature counts separately."""
+        constraints = []
+        for key in ("price_min", "price_max", "seats_min", "max_mileage", "min_year"):
+            value = getattr(self, key)
+            if value is None:
+                continue
+            widened_value = _widen(key, value)
+            constraints.append(
+                FilterConstraint(
+                    key=key,
+                    value=value,
+                    only=_single_filter(key, value),
+                    widened_value=widened_value,
+                    widened=None if widened_value is None else _single_filter(key, widened_value),
+                )
+            )
+        for key in CATEGORICAL_FILTERS:
+            values = getattr(self, key)
+            if values:
+                constraints.append(
+                    FilterConstraint(key=key, value=values, only=_single_filter(key, values))
+                )
+        for feature in dict.fromkeys(feature.lower() for feature in self.must_have_features):
+            constraints.append(
+                FilterConstraint(
+                    key="must_have_features",
+                    value=feature,
+                    only=CarFilters(must_have_features=[feature]),
+                )
+            )
+        area = self.area()
+        if area is not None:
+            near, radius = area
+            widened_radius = _widen("radius_miles", radius)
+            constraints.append(
+                FilterConstraint(
+                    key="radius_miles",
+                    value=radius,
+                    only=CarFilters(near=near, radius_miles=radius),
+                    widened_value=widened_radius,
+                    widened=None
+                    if widened_radius is None
+                    else CarFilters(near=near, radius_miles=widened_radius),
+                )
+            )
+        return constraints
+
     def to_payload(self) -> dict[str, Any]:
         return {
             "price_min": self.price_min,
@@ -98,98 +334,1176 @@ class CarFilters:
             "min_year": self.min_year,
             "must_have_features": self.must_have_features,
             "locations": self.locations,
+            "near": self.near,
+            "radius_miles": self.radius_miles,
         }
 
 
-@dataclass
+@dataclass(frozen=True)
+class FilterConstraint:
+    """One active filter, as relaxation analysis drops or widens it."""
+
+    key: str
+    value: Any
+    # The constraint alone, and loosened by `RELAXATION_STEP` for numeric bounds.
+    only: CarFilters
+    widened_value: int | None = None
+    widened: CarFilters | None = None
+
+
+def _single_filter(key: str, value: Any) -> CarFilters:
+    filters = CarFilters()
+    setattr(filters, key, value)
+    return filters
+
+
+def _widen(key: str, value: int) -> int | None:
+    if key == "price_min":
+        widened = int(value * (1 - RELAXATION_STEP))
+    elif key in ("price_max", "max_mileage"):
+        widened = round(value * (1 + RELAXATION_STEP))
+    elif key == "radius_miles":
+        # A few miles rarely reaches the next town, so the search area doubles.
+        widened = max(value * 2, 1)
+    else:
+        # Seats and model years are small integers: loosen by one.
+        widened = value - 1
+    return None if widened == value or widened < 0 else widened
+
+
+@dataclass(slots=True)
 class CarSearchProfile:
     filters: CarFilters = field(default_factory=CarFilters)
-    match_ids: list[str] = field(default_factory=list)
+    # A `MatchSet` shared with the result cache, or the store's shared tuple of
+    # every id for "all cars"; never mutate in place.
+    match_ids: Sequence[str] = ()
+    # Inventory version `match_ids` was computed against.
+    version: int = 0
+    # Until the first search, `match_ids` is the whole inventory in load order.
+    searched: bool = False
+    # When the last search matched nothing: how much dropping or widening each filter helps.
+    relaxations: list[dict[str, Any]] = field(default_factory=list)
+    # Filter values the last update named that were rewritten to known ones.
+    corrections: list[dict[str, Any]] = field(default_factory=list)
+
+
+class CarMatches(Sequence[CarRecord]):
+    """Matched cars looked up by id on access, so slicing a page never touches the rest."""
+
+    def __init__(self, match_ids: Sequence[str], cars_by_id: Mapping[str, CarRecord]) -> None:
+        self.match_ids = match_ids
+        self._cars_by_id = cars_by_id
+
+    def __len__(self) -> int:
+        return len(self.match_ids)
+
+    @overload
+    def __getitem__(self, index: int) -> CarRecord: ...
 
-    def update_matches(self, matches: Iterable[CarRecord]) -> None:
-        self.match_ids = [car.id for car in matches]
+    @overload
+    def __getitem__(self, index: slice) -> list[CarRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> CarRecord | list[CarRecord]:
+        if isinstance(index, slice):
+            return [self._cars_by_id[car_id] for car_id in self.match_ids[index]]
+        return self._cars_by_id[self.match_ids[index]]
+
+
+class RowIds(Sequence[str]):
+    """Ids of the cars in `rows`, resolved on access, so a page never decodes the rest."""
+
+    def __init__(self, rows: NDArray[np.int64], id_of_row: Callable[[int], str]) -> None:
+        self._rows = rows
+        self._id_of_row = id_of_row
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self._id_of_row(row) for row in self._rows[index].tolist()]
+        return self._id_of_row(int(self._rows[index]))
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self._id_of_row, self._rows.tolist())
+
+
+@dataclass
+class SnapshotPage:
+    """One page of a thread's matches, identified by `etag` before any car is serialized."""
+
+    filters: dict[str, Any]
+    car_ids: Sequence[str]
+    total: int
+    next_cursor: str | None
+    fields: tuple[str, ...] | None
+    etag: str
+    facets: dict[str, Any] = field(default_factory=dict)
+
+
+def check_record(car: CarRecord) -> None:
+    """Raise ValueError unless every field of `car` has its declared type and a usable value.
+
+    Numbers must not be negative and mileage must fit the index's sort keys.
+    """
+    for name in INTEGER_FIELDS:
+        if type(getattr(car, name)) is not int:
+            raise ValueError(f"Car {car.id!r}: {name} must be an integer")
+        if getattr(car, name) < 0:
+            raise ValueError(f"Car {car.id!r}: {name} must not be negative")
+    if car.mileage >= MILEAGE_LIMIT:
+        raise ValueError(f"Car {car.id!r}: mileage must be below {MILEAGE_LIMIT}")
+    if car.range_miles is not None and type(car.range_miles) is not int:
+        raise ValueError(f"Car {car.id!r}: range_miles must be an integer or null")
+    if car.range_miles is not None and car.range_miles < 0:
+        raise ValueError(f"Car {car.id!r}: range_miles must not be negative")
+    for name in TEXT_FIELDS:
+        if not isinstance(getattr(car, name), str):
+            raise ValueError(f"Car {car.id!r}: {name} must be a string")
+    if not isinstance(car.features, tuple) or not all(
+        isinstance(feature, str) for feature in car.features
+    ):
+        raise ValueError(f"Car {car.id!r}: features must be a list of strings")
+
+
+def load_records(data_path: Path) -> list[CarRecord]:
+    raw = json.loads(data_path.read_text())
+    return [CarRecord(**entry) for entry in raw]
 
 
 class CarInventoryStore:
-    def __init__(self, data_path: Path) -> None:
-        raw = json.loads(data_path.read_text())
-        self._inventory = [CarRecord(**entry) for entry in raw]
-        self._inventory_by_id = {car.id: car for car in self._inventory}
-        self._profiles: dict[str, CarSearchProfile] = {}
+    """Search state over a car feed.
+
+    `data_path` is either a JSON feed or a snapshot compiled by
+    `app.inventory_snapshot`, which is memory-mapped and defaults to the NumPy
+    engine so startup does no per-car work, or a database compiled by
+    `app.inventory_sqlite`, which defaults to searching it in SQL.
+    """
+
+    def __init__(
+        self,
+        data_path: Path,
+        engine: str | None = None,
+        result_cache_size: int = 256,
+        max_profiles: int = 10_000,
+        profile_ttl: float | None = 6 * 3600,
+        search_workers: int = 0,
+    ) -> None:
+        # Imported here because these modules build on the records defined above.
+        from .inventory_snapshot import (
+            InventorySnapshot,
+            MappingOverlay,
+            RowOverlay,
+            is_snapshot,
+        )
+        from .inventory_sqlite import (
+            DEFAULT_SEARCH_THREADS,
+            InventoryDatabase,
+            SqliteInventory,
+            is_database,
+        )
+
+        self._columnar: ColumnarInventory | None = None
+        self._sqlite: SqliteInventory | None = None
+        self._snapshot: InventorySnapshot | None = None
+        # Snapshots build these on first use, so startup stays free of per-car work.
+        self._vocabulary: FilterVocabulary | None = None
+        self._text_vectors: TextVectors | None = None
+        self._attributes: AttributeSpace | None = None
+        # Rows are addressed by position; a removed car leaves its row behind as a hole.
+        self._inventory: list[CarRecord] | RowOverlay
+        self._inventory_by_id: dict[str, CarRecord] | MappingOverlay[str, CarRecord]
+        self._row_by_id: dict[str, int] | MappingOverlay[str, int]
+        # Ids by row as loaded; rows appended by deltas are looked up in `_inventory`.
+        self._loaded_ids: Sequence[str]
+        self._all_ids: Sequence[str] | None
+        if is_snapshot(data_path):
+            self._snapshot = snapshot = InventorySnapshot(data_path)
+            engine = engine or "numpy"
+            self._inventory = RowOverlay(snapshot)
+            self._inventory_by_id = MappingOverlay(snapshot.records_by_id)
+            self._row_by_id = MappingOverlay(snapshot.rows_by_id)
+            self._loaded_ids = self._all_ids = snapshot.ids
+            # Counted from the string references in milliseconds, before any delta lands.
+            self._vocabulary = FilterVocabulary.from_counts(snapshot.value_counts())
+            if engine == "numpy":
+                self._columnar = snapshot.columnar()
+        elif is_database(data_path):
+            database = InventoryDatabase(data_path)
+            engine = engine or "sqlite"
+            self._inventory = RowOverlay(database)
+            self._inventory_by_id = MappingOverlay(database.records_by_id)
+            self._row_by_id = MappingOverlay(database.rows_by_id)
+            self._loaded_ids = self._all_ids = database.ids
+            if engine == "sqlite":
+                self._sqlite = SqliteInventory(database, search_workers or DEFAULT_SEARCH_THREADS)
+            elif engine == "numpy":
+                self._columnar = ColumnarInventory.from_records(self._inventory)
+        else:
+            engine = engine or "python"
+            self._inventory = load_records(data_path)
+            self._inventory_by_id = {car.id: car for car in self._inventory}
+            self._row_by_id = {car.id: row for row, car in enumerate(self._inventory)}
+            self._loaded_ids = self._all_ids = tuple(car.id for car in self._inventory)
+            self._vocabulary = FilterVocabulary.from_records(self._inventory)
+            self._text_vectors = TextVectors.from_records(self._inventory)
+            self._attributes = AttributeSpace.from_records(self._inventory)
+            if engine == "numpy":
+                self._columnar = ColumnarInventory.from_records(self._inventory)
+        if engine not in INVENTORY_ENGINES:
+            raise ValueError(f"Unknown inventory engine {engine!r}")
+        if engine == "sqlite" and self._sqlite is None:
+            raise ValueError("The sqlite engine needs a database compiled by app.inventory_sqlite")
+        self._index = InventoryIndex(self._inventory) if engine == "python" else None
+        self._profiles = ProfileStore(max_profiles, profile_ttl)
+        self._version = 0
+        self._results: FilterResultCache[MatchSet] = FilterResultCache(result_cache_size)
+        self._facets: FilterResultCache[dict[str, Any]] = FilterResultCache(result_cache_size)
+        self._relaxations: FilterResultCache[list[dict[str, Any]]] = FilterResultCache(
+            result_cache_size
+        )
+        # Nearest cars in attribute space per (car id, categorical filters).
+        self._neighbors: FilterResultCache[list[tuple[int, float]]] = FilterResultCache(
+            result_cache_size
+        )
+        self._payloads = PayloadCache()
+        self._listeners: list[ProfileListener] = []
+        # Rows of removed cars, in removal order.
+        self._holes: list[int] = []
+        # The sqlite engine searches on its own thread pool, sized by `search_workers`.
+        self._executor = (
+            ShardedSearchExecutor(search_workers)
+            if search_workers > 0 and self._sqlite is None
+            else None
+        )
+        # The Python engine keeps a columnar copy for the workers, patched by deltas like
+        # the other engines, so each publish only writes the rows in `_unpublished`.
+        self._search_copy: ColumnarInventory | None = None
+        if self._executor is not None and self._columnar is None:
+            self._search_copy = ColumnarInventory.from_records(self._inventory)
+        self._unpublished: set[int] = set()
+
+    def initial_matches(self) -> Sequence[CarRecord]:
+        """The whole inventory in feed order; treat it as read-only.
+
+        Once cars have been removed, this is a view that looks each car up as
+        it is read, so paging through it costs only the page.
+        """
+        if not self._holes:
+            return self._inventory
+        return CarMatches(self._ids_in_load_order(), self._inventory_by_id)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def cache_stats(self) -> dict[str, Any]:
+        return self._results.stats()
+
+    def payload_stats(self) -> dict[str, Any]:
+        return self._payloads.stats()
+
+    def facet_stats(self) -> dict[str, Any]:
+        return self._facets.stats()
+
+    def profile_stats(self) -> dict[str, Any]:
+        return self._profiles.stats()
+
+    def facets(self, thread_id: str | None) -> dict[str, Any]:
+        """Counts of the thread's matches per make, body style, etc. and per price/mileage band.
+
+        Every value present in the matches is listed, most common first, and
+        histogram bands without matches are left out. Cached per filter set.
+        """
+        profile = self.get_profile(thread_id)
+        key = profile.filters.cache_key() if profile.searched else None
+        facets = self._facets.get(key, self._version)
+        if facets is None:
+            facets = self._count_facets(profile)
+            self._facets.put(key, self._version, facets)
+        return facets
+
+    async def facets_async(self, thread_id: str | None) -> dict[str, Any]:
+        """`facets`, counted off the event loop on the sqlite engine's threads."""
+        profile = await self.get_profile_async(thread_id)
+        key = profile.filters.cache_key() if profile.searched else None
+        facets = self._facets.get(key, self._version)
+        if facets is None:
+            version = self._version
+            facets = await self._off_loop(self._count_facets, self._detached(profile))
+            if version == self._version:
+                self._facets.put(key, version, facets)
+        return facets
+
+    def ranked(
+        self, thread_id: str | None, sort: str = "cheapest", limit: int = 8, offset: int = 0
+    ) -> list[CarRecord]:
+        """Cars `offset` to `offset + limit` of the thread's matches in `sort` order.
+
+        Only the first `offset + limit` matches are ranked, with a bounded heap
+        or `np.partition`, so a large match set is never sorted in full.
+        "nearest" ranks by distance from the thread's `near` place.
+        """
+        return self._ranked(self.get_profile(thread_id), sort, limit, offset)
+
+    async def ranked_async(
+        self, thread_id: str | None, sort: str = "cheapest", limit: int = 8, offset: int = 0
+    ) -> list[CarRecord]:
+        """`ranked`, run off the event loop on the sqlite engine's threads."""
+        profile = await self.get_profile_async(thread_id)
+        return await self._off_loop(self._ranked, self._detached(profile), sort, limit, offset)
+
+    def _ranked(
+        self, profile: CarSearchProfile, sort: str, limit: int, offset: int
+    ) -> list[CarRecord]:
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order {sort!r}")
+        origin = None
+        if sort == "nearest":
+            area = profile.filters.area()
+            if area is None:
+                raise ValueError("Sorting by distance needs a `near` place")
+            origin = geocode(area[0])
+        stop = offset + limit
+        if sort == "cheapest" and profile.searched:
+            # Searched matches are already in this order.
+            return self._records(profile.match_ids[offset:stop])
+        engine = self._engine()
+        if engine is not None:
+            filters = profile.filters if profile.searched else None
+            rows = engine.top_k(filters, sort, stop, origin)[offset:]
+            return [self._inventory[row] for row in rows]
+        assert self._index is not None
+        if sort == "cheapest":
+            return [self._inventory[row] for row in self._index.order[offset:stop]]
+        cars: Iterable[CarRecord]
+        if profile.searched:
+            cars = (self._inventory[row] for row in self._rows(profile.match_ids))
+        else:
+            cars = (self._inventory[row] for row in self._index.order)
+        # nsmallest is stable, so ties keep the (price, mileage) order they arrive in.
+        return heapq.nsmallest(stop, cars, key=lambda car: rank_value(sort, car, origin))[offset:]
+
+    def similar(
+        self,
+        thread_id: str | None,
+        car_id: str | None = None,
+        text: str | None = None,
+        limit: int = 5,
+        within_filters: bool = True,
+    ) -> list[tuple[CarRecord, float]]:
+        """Cars most like `car_id` and/or `text`, best first, with their cosine similarity.
+
+        Compares TF-IDF vectors of the listings' trim, description and
+        features. With `within_filters`, only the thread's current matches are
+        candidates; the car itself is never returned.
+        """
+        if car_id is None and not text:
+            raise ValueError("Give a car id, a description or both")
+        vectors = self.text_vectors()
+        profile = self.get_profile(thread_id)
+        return self._similar(vectors, profile, car_id, text, limit, within_filters)
+
+    async def similar_async(
+        self,
+        thread_id: str | None,
+        car_id: str | None = None,
+        text: str | None = None,
+        limit: int = 5,
+        within_filters: bool = True,
+    ) -> list[tuple[CarRecord, float]]:
+        """`similar`, with the vectors fitted and SQLite read off the event loop."""
+        if car_id is None and not text:
+            raise ValueError("Give a car id, a description or both")
+        vectors = await self.text_vectors_async()
+        profile = self._detached(await self.get_profile_async(thread_id))
+        return await self._off_loop(
+            self._similar, vectors, profile, car_id, text, limit, within_filters
+        )
+
+    def _similar(
+        self,
+        vectors: TextVectors,
+        profile: CarSearchProfile,
+        car_id: str | None,
+        text: str | None,
+        limit: int,
+        within_filters: bool,
+    ) -> list[tuple[CarRecord, float]]:
+        row = None
+        if car_id is not None:
+            row = self._row_by_id.get(car_id)
+            if row is None:
+                raise ValueError(f"Unknown car id {car_id!r}")
+        rows: Iterable[int]
+        if within_filters and profile.searched:
+            rows = self._rows(profile.match_ids)
+        else:
+            rows = self._live_rows()
+        ranked = vectors.top_k(vectors.query(row, text), rows, limit, exclude=row)
+        return [(self._inventory[match], score) for match, score in ranked]
 
-    def initial_matches(self) -> list[CarRecord]:
-        return list(self._inventory)
+    def alternatives(
+        self, thread_id: str | None, car_id: str, limit: int = 5
+    ) -> list[tuple[CarRecord, float]]:
+        """Cars closest to `car_id` on price, year, mileage, seats and range, nearest first.
+
+        Only cars meeting the thread's categorical filters (make, body style,
+        features, place, ...) are offered; its numeric bounds are ignored, since
+        the point is to find something close to a car that missed them. The
+        nearest cars are cached per car id and filter set, so a repeat lookup
+        costs a dictionary hit.
+        """
+        row = self._row_by_id.get(car_id)
+        if row is None:
+            raise ValueError(f"Unknown car id {car_id!r}")
+        filters = self.get_profile(thread_id).filters.categorical()
+        key = (car_id, filters.cache_key())
+        neighbors = self._neighbors.get(key, self._version)
+        # A short list means every candidate is already in it.
+        if neighbors is None or (len(neighbors) < limit and len(neighbors) >= NEIGHBOR_POOL):
+            if filters.is_empty():
+                candidates = self._live_rows()
+            else:
+                candidates = np.asarray(self._rows(self._search(filters)), dtype=np.int64)
+            pool = max(limit, NEIGHBOR_POOL)
+            neighbors = self.attribute_space().nearest(row, candidates, pool)
+            self._neighbors.put(key, self._version, neighbors)
+        return [(self._inventory[match], distance) for match, distance in neighbors[:limit]]
+
+    async def alternatives_async(
+        self, thread_id: str | None, car_id: str, limit: int = 5
+    ) -> list[tuple[CarRecord, float]]:
+        """`alternatives`, with its SQLite reads run off the event loop.
+
+        The searches, columns and records it needs are fetched on the sqlite
+        engine's threads; ranking the candidates stays a NumPy scan.
+        """
+        if self._sqlite is None:
+            return self.alternatives(thread_id, car_id, limit)
+        sqlite = self._sqlite
+        row = await sqlite.run(self._row_by_id.get, car_id)
+        if row is None:
+            raise ValueError(f"Unknown car id {car_id!r}")
+        filters = (await self.get_profile_async(thread_id)).filters.categorical()
+        key = (car_id, filters.cache_key())
+        version = self._version
+        neighbors = self._neighbors.get(key, version)
+        if neighbors is None or (len(neighbors) < limit and len(neighbors) >= NEIGHBOR_POOL):
+            if filters.is_empty():
+                candidates = await sqlite.run(lambda: sqlite.order)
+            else:
+                matches = await self._prefetch(filters)
+                candidates = np.asarray(matches.rows, dtype=np.int64)
+            if self._attributes is None:
+                numeric = await sqlite.run(lambda: sqlite.numeric)
+                if version == self._version and self._attributes is None:
+                    self._attributes = AttributeSpace(numeric)
+            if version != self._version:
+                # A delta landed meanwhile; rank against the new inventory instead.
+                return self.alternatives(thread_id, car_id, limit)
+            neighbors = self.attribute_space().nearest(row, candidates, max(limit, NEIGHBOR_POOL))
+            self._neighbors.put(key, version, neighbors)
+        rows = [match for match, _ in neighbors[:limit]]
+        cars = await sqlite.run(lambda: [self._inventory[match] for match in rows])
+        return list(zip(cars, [distance for _, distance in neighbors[:limit]]))
+
+    def relaxations(self, filters: CarFilters) -> list[dict[str, Any]]:
+        """How many cars match with each active filter dropped, or widened where numeric.
+
+        Counted in one pass over per-constraint match sets: a car contributes to
+        a constraint when it is the only one the car fails. Sorted by
+        `matches_without`, best relaxation first.
+        """
+        key = filters.cache_key()
+        relaxations = self._relaxations.get(key, self._version)
+        if relaxations is None:
+            constraints = filters.constraints()
+            engine = self._engine()
+            if engine is not None:
+                counts = engine.relaxation_counts(constraints)
+            else:
+                assert self._index is not None
+                counts = self._index.relaxation_counts(constraints)
+            relaxations = self._relaxation_entries(constraints, counts)
+            self._relaxations.put(key, self._version, relaxations)
+        return relaxations
+
+    async def _prefetch_relaxations(self, filters: CarFilters) -> None:
+        """Count `relaxations` on the sqlite engine's threads, so the sync call is a cache hit."""
+        key = filters.cache_key()
+        if self._sqlite is None or self._relaxations.get(key, self._version) is not None:
+            return
+        version = self._version
+        constraints = filters.constraints()
+        counts = await self._sqlite.run(self._sqlite.relaxation_counts, constraints)
+        if version == self._version:
+            self._relaxations.put(key, version, self._relaxation_entries(constraints, counts))
+
+    def _relaxation_entries(
+        self,
+        constraints: Sequence[FilterConstraint],
+        counts: Sequence[tuple[int, int | None]],
+    ) -> list[dict[str, Any]]:
+        relaxations = [
+            {
+                "filter": constraint.key,
+                "value": constraint.value,
+                "matches_without": without,
+                "widened_to": constraint.widened_value,
+                "matches_widened": widened,
+            }
+            for constraint, (without, widened) in zip(constraints, counts)
+        ]
+        relaxations.sort(key=lambda relaxation: -relaxation["matches_without"])
+        return relaxations
+
+    def _count_facets(self, profile: CarSearchProfile) -> dict[str, Any]:
+        categorical: CategoricalCounts
+        engine = self._engine()
+        if engine is not None:
+            filters = profile.filters if profile.searched else None
+            categorical, histograms = engine.facet_counts(filters)
+        else:
+            assert self._index is not None
+            bits = self._index.all_rows
+            if profile.searched:
+                bits = bits_from_rows(self._rows(profile.match_ids))
+            categorical, histograms = self._index.facet_counts(bits)
+        facets: dict[str, Any] = {}
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            counts = sorted(categorical[key], key=lambda item: (-item[1], item[0]))
+            facets[key] = [
+                {"value": getattr(self._inventory[row], attribute), "count": count}
+                for row, count in counts
+            ]
+        for column, edges in HISTOGRAM_EDGES.items():
+            bounds = zip(edges, (*edges[1:], None))
+            facets[column] = [
+                {"min": low, "max": high, "count": count}
+                for (low, high), count in zip(bounds, histograms[column])
+                if count
+            ]
+        return facets
 
     def get_profile(self, thread_id: str | None) -> CarSearchProfile:
         if not thread_id:
-            profile = CarSearchProfile()
-            profile.update_matches(self.initial_matches())
-            return profile
-        if thread_id not in self._profiles:
-            profile = CarSearchProfile()
-            profile.update_matches(self.initial_matches())
-            self._profiles[thread_id] = profile
-        return self._profiles[thread_id]
+            return self._new_profile()
+        profile = self._profiles.get(thread_id)
+        if profile is None:
+            profile = self._new_profile()
+            self._profiles.put(thread_id, profile)
+        if profile.version != self._version:
+            self._reconcile(profile)
+        return profile
+
+    async def get_profile_async(self, thread_id: str | None) -> CarSearchProfile:
+        """`get_profile`, with the search a stale profile needs run off the event loop."""
+        if self._sqlite is not None and thread_id:
+            profile = self._profiles.get(thread_id)
+            if profile is not None and profile.searched and profile.version != self._version:
+                await self._prefetch(profile.filters)
+        return self.get_profile(thread_id)
+
+    async def initial_matches_async(self, limit: int) -> list[CarRecord]:
+        """The first `limit` cars of `initial_matches`, read off the event loop."""
+        matches = self.initial_matches()
+        return await self._off_loop(lambda: list(matches[:limit]))
+
+    async def _off_loop(self, function: Callable[..., T], *args: Any) -> T:
+        """Call `function` on the sqlite engine's threads; other engines answer from memory."""
+        if self._sqlite is None:
+            return function(*args)
+        return await self._sqlite.run(function, *args)
+
+    def _detached(self, profile: CarSearchProfile) -> CarSearchProfile:
+        # Work handed to another thread reads a copy, as tools update filters in place.
+        return replace(profile, filters=copy.deepcopy(profile.filters))
+
+    def add_listener(self, listener: ProfileListener) -> None:
+        """Call `listener(thread_id, change)` whenever a tool changes a thread's profile.
+
+        `change` carries the new filters and total plus the `added` and
+        `removed` car ids; `replaced` is set instead when the diff would be too
+        large to be worth sending, and `reordered` when the match order changed.
+        """
+        self._listeners.append(listener)
 
     def reset_profile(self, thread_id: str) -> CarSearchProfile:
-        profile = CarSearchProfile()
-        profile.update_matches(self.initial_matches())
-        self._profiles[thread_id] = profile
+        before = self._profile_state(self.get_profile(thread_id))
+        profile = self._new_profile()
+        self._profiles.put(thread_id, profile)
+        self._publish(thread_id, before, profile)
         return profile
 
-    def update_filters(self, thread_id: str, update: dict[str, Any]) -> list[CarRecord]:
+    def update_filters(self, thread_id: str, update: dict[str, Any]) -> CarMatches:
+        """Apply `update` to the thread's filters and search again.
+
+        Values the inventory does not know are first corrected to the closest
+        known ones; the profile's `corrections` lists what was rewritten.
+        """
+        update, corrections = self.vocabulary().canonicalize(update)
+        return self._update_filters(thread_id, update, corrections)
+
+    def _update_filters(
+        self, thread_id: str, update: dict[str, Any], corrections: list[dict[str, Any]]
+    ) -> CarMatches:
         profile = self.get_profile(thread_id)
-        filters = profile.filters
-        self._apply_update(filters, update)
-        matches = self._apply_filters(filters)
-        if matches:
-            profile.update_matches(matches)
+        before = self._profile_state(profile)
+        matches = self._update_profile(profile, update)
+        profile.corrections = corrections
+        self._publish(thread_id, before, profile)
+        return matches
+
+    async def update_filters_async(self, thread_id: str, update: dict[str, Any]) -> CarMatches:
+        """`update_filters`, with any uncached search run off the event loop.
+
+        The searches `update_filters` is about to need are resolved first, on
+        the worker processes or the sqlite engine's threads, and land in the
+        result cache; the update itself then only reads them back. Without
+        either this is `update_filters`.
+        """
+        update, corrections = (await self.vocabulary_async()).canonicalize(update)
+        if self._executor is not None or self._sqlite is not None:
+            filters = copy.deepcopy((await self.get_profile_async(thread_id)).filters)
+            self._apply_update(filters, update)
+            if not await self._prefetch(filters):
+                await self._prefetch_relaxations(filters)
+                if update:
+                    fresh = CarFilters()
+                    self._apply_update(fresh, update)
+                    await self._prefetch(fresh)
+        return self._update_filters(thread_id, update, corrections)
+
+    async def vocabulary_async(self) -> FilterVocabulary:
+        """`vocabulary`, with a database's values counted off the event loop."""
+        if self._vocabulary is None and self._sqlite is not None:
+            version = self._version
+            counts = await self._sqlite.run(self._sqlite.value_counts)
+            # Deltas patch a built vocabulary, so counts from before one are stale.
+            if self._vocabulary is None and version == self._version:
+                self._vocabulary = FilterVocabulary.from_counts(counts)
+        return self.vocabulary()
+
+    def vocabulary(self) -> FilterVocabulary:
+        if self._vocabulary is None:
+            if self._sqlite is not None:
+                self._vocabulary = FilterVocabulary.from_counts(self._sqlite.value_counts())
+            else:
+                self._vocabulary = FilterVocabulary.from_records(self.initial_matches())
+        return self._vocabulary
+
+    def text_vectors(self) -> TextVectors:
+        if self._text_vectors is None:
+            self._text_vectors = self._fit_text_vectors(self._changed_rows())
+        return self._text_vectors
+
+    async def text_vectors_async(self) -> TextVectors:
+        """`text_vectors`, fitted on a worker thread the first time, like a prefetched search."""
+        if self._text_vectors is None:
+            version = self._version
+            changes = self._changed_rows()
+            if self._sqlite is not None:
+                vectors = await self._sqlite.run(self._fit_text_vectors, changes)
+            else:
+                loop = asyncio.get_running_loop()
+                vectors = await loop.run_in_executor(None, self._fit_text_vectors, changes)
+            # Deltas patch built vectors in place, so a fit from before one is stale.
+            if self._text_vectors is None and version == self._version:
+                self._text_vectors = vectors
+        return self.text_vectors()
+
+    def _fit_text_vectors(self, changes: Mapping[int, CarRecord | None]) -> TextVectors:
+        if self._snapshot is None:
+            return TextVectors.from_records(self._inventory)
+        # Fitted on the snapshot as compiled, then patched like any later delta.
+        vectors = self._snapshot.text_vectors()
+        vectors.apply(changes)
+        return vectors
+
+    def _changed_rows(self) -> dict[int, CarRecord | None]:
+        """Rows changed since a snapshot was loaded, with None for removed cars."""
+        if self._snapshot is None:
+            return {}
+        assert not isinstance(self._inventory, list)
+        return {**self._inventory.changes(), **dict.fromkeys(self._holes)}
+
+    def attribute_space(self) -> AttributeSpace:
+        if self._attributes is None:
+            engine = self._engine()
+            if engine is not None:
+                self._attributes = AttributeSpace(engine.numeric)
+            else:
+                self._attributes = AttributeSpace.from_records(self._inventory)
+        return self._attributes
+
+    def _live_rows(self) -> NDArray[np.int64]:
+        """Rows of every car still in the inventory, in result order."""
+        engine = self._engine()
+        if engine is not None:
+            return engine.order.astype(np.int64, copy=False)
+        assert self._index is not None
+        return np.asarray(self._index.order, dtype=np.int64)
+
+    def _engine(self) -> ColumnarInventory | SqliteInventory | None:
+        """The column-at-a-time engine, if the store has one rather than the Python index."""
+        return self._columnar if self._columnar is not None else self._sqlite
+
+    async def _prefetch(self, filters: CarFilters) -> MatchSet:
+        key = filters.cache_key()
+        matches = self._results.get(key, self._version)
+        if matches is not None:
             return matches
+        version = self._version
+        if self._sqlite is not None:
+            rows = await self._sqlite.search_async(filters)
+        else:
+            assert self._executor is not None
+            if self._executor.version != version:
+                columns = self._search_columns()
+                self._executor.publish(columns, columns.order, version, self._unpublished)
+                self._unpublished.clear()
+            rows = await self._executor.search(filters)
+        if version != self._version:
+            # A delta landed while the workers were busy; search the new inventory here.
+            return self._search(filters)
+        matches = MatchSet(rows, self._inventory)
+        self._results.put(key, version, matches)
+        return matches
+
+    def _search_columns(self) -> ColumnarInventory:
+        """Columns of the current inventory, for the executor."""
+        columns = self._columnar if self._columnar is not None else self._search_copy
+        assert columns is not None
+        return columns
+
+    def close(self) -> None:
+        """Stop the search workers, if any."""
+        if self._executor is not None:
+            self._executor.close()
+        if self._sqlite is not None:
+            self._sqlite.close()
+
+    def _profile_state(
+        self, profile: CarSearchProfile
+    ) -> tuple[dict[str, Any], Sequence[str], bool]:
+        return profile.filters.to_payload(), profile.match_ids, profile.searched
+
+    def _publish(
+        self,
+        thread_id: str,
+        before: tuple[dict[str, Any], Sequence[str], bool],
+        profile: CarSearchProfile,
+    ) -> None:
+        if not self._listeners:
+            return
+        filters, match_ids, searched = before
+        new_filters = profile.filters.to_payload()
+        same_matches = match_ids is profile.match_ids or match_ids == profile.match_ids
+        if filters == new_filters and searched == profile.searched and same_matches:
+            return
+        change: dict[str, Any] = {
+            "filters": new_filters,
+            "total": len(profile.match_ids),
+            "reordered": searched != profile.searched,
+            "replaced": False,
+            "added": [],
+            "removed": [],
+        }
+        # The diff is at least as long as the change in size, so skip hopeless cases early.
+        if abs(len(match_ids) - len(profile.match_ids)) > PROFILE_DIFF_LIMIT:
+            change["replaced"] = True
+        else:
+            old, new = set(match_ids), set(profile.match_ids)
+            change["added"] = [car_id for car_id in profile.match_ids if car_id not in old]
+            change["removed"] = [car_id for car_id in match_ids if car_id not in new]
+            if len(change["added"]) + len(change["removed"]) > PROFILE_DIFF_LIMIT:
+                change.update(replaced=True, added=[], removed=[])
+        for listener in self._listeners:
+            listener(thread_id, change)
+
+    def _update_profile(self, profile: CarSearchProfile, update: dict[str, Any]) -> CarMatches:
+        filters = profile.filters
+        # An unfiltered profile lists the whole inventory in load order, so refining it
+        # would not be cheaper than a fresh search.
+        refinable = not filters.is_empty()
+        narrowed = self._apply_update(filters, update)
+        match_ids = self._search(filters, profile.match_ids if refinable and narrowed else None)
+        profile.version = self._version
+        profile.searched = True
+        profile.relaxations = []
+        if match_ids:
+            profile.match_ids = match_ids
+            return CarMatches(match_ids, self._inventory_by_id)
+
+        profile.relaxations = self.relaxations(filters)
 
         if update:
             fresh = CarFilters()
             self._apply_update(fresh, update)
-            fallback_matches = self._apply_filters(fresh)
-            if fallback_matches:
+            fallback_ids = self._search(fresh)
+            if fallback_ids:
                 profile.filters = fresh
-                profile.update_matches(fallback_matches)
-                return fallback_matches
+                profile.match_ids = fallback_ids
+                return CarMatches(fallback_ids, self._inventory_by_id)
+
+        profile.match_ids = match_ids
+        return CarMatches(match_ids, self._inventory_by_id)
+
+    def apply_delta(
+        self, upserts: Iterable[CarRecord] = (), removals: Iterable[str] = ()
+    ) -> dict[str, int]:
+        """Add or replace cars by id and remove others, without rebuilding the store.
+
+        Indexes and cached results are patched in place under a new version.
+        Thread profiles catch up lazily, the next time they are read. Every car
+        is checked before anything changes, so a bad delta raises ValueError
+        and leaves the store as it was.
+        """
+        upserts, removals = list(upserts), list(removals)
+        for upsert in upserts:
+            check_record(upsert)
+        for removal in removals:
+            if not isinstance(removal, str):
+                raise ValueError(f"Car id {removal!r} must be a string")
+        changes: dict[str, CarRecord | None] = {car.id: car for car in upserts}
+        for car_id in removals:
+            if car_id in self._row_by_id or car_id in changes:
+                changes[car_id] = None
+        previous: dict[int, tuple[int, int, int]] = {}
+        row_changes: dict[int, CarRecord | None] = {}
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        for car_id, car in changes.items():
+            row = self._row_by_id.get(car_id)
+            if row is None:
+                if car is None:
+                    continue
+                row = len(self._inventory)
+                self._inventory.append(car)
+                self._row_by_id[car_id] = row
+                counts["added"] += 1
+            else:
+                old = self._inventory[row]
+                previous[row] = self._sort_key(old, row)
+                if self._index is not None:
+                    self._index.discard(row, old)
+                if self._vocabulary is not None:
+                    self._vocabulary.discard(old)
+                if car is None:
+                    del self._inventory_by_id[car_id]
+                    del self._row_by_id[car_id]
+                    self._holes.append(row)
+                    counts["removed"] += 1
+                else:
+                    self._inventory[row] = car
+                    counts["updated"] += 1
+            if car is not None:
+                self._inventory_by_id[car_id] = car
+                if self._index is not None:
+                    self._index.add(row, car)
+                if self._vocabulary is not None:
+                    self._vocabulary.add(car)
+            row_changes[row] = car
+
+        if row_changes:
+            engine = self._engine()
+            if engine is not None:
+                engine.apply(row_changes)
+            if self._search_copy is not None:
+                self._search_copy.apply(row_changes)
+            if self._executor is not None:
+                self._unpublished.update(row_changes)
+            if self._text_vectors is not None:
+                self._text_vectors.apply(row_changes)
+            if self._attributes is not None:
+                self._attributes.apply(row_changes)
+            self._version += 1
+            self._all_ids = None
+            self._results.patch(
+                self._version - 1,
+                self._version,
+                lambda key, matches: self._patch_matches(
+                    CarFilters.from_cache_key(key), matches, row_changes, previous
+                ),
+            )
+            self._payloads.patch(self._version - 1, self._version, changes)
+        return {"version": self._version, **counts, "total": len(self._inventory_by_id)}
 
-        profile.update_matches(matches)
+    def _patch_matches(
+        self,
+        filters: CarFilters,
+        matches: MatchSet,
+        row_changes: Mapping[int, CarRecord | None],
+        previous: Mapping[int, tuple[int, int, int]],
+    ) -> MatchSet:
+        """Carry a result computed before `apply_delta` over to the new inventory."""
+
+        def old_key(row: int) -> tuple[int, int, int]:
+            return previous.get(row) or self._sort_key_by_row(row)
+
+        rows = matches.rows
+        stale = []
+        for row, key in previous.items():
+            position = bisect_left(rows, key, key=old_key)
+            if position < len(rows) and rows[position] == row:
+                stale.append(position)
+        fresh = [
+            row for row, car in row_changes.items() if car is not None and filters.matches(car)
+        ]
+        if not stale and not fresh:
+            return matches
+        patched = array("i", rows)
+        for position in sorted(stale, reverse=True):
+            del patched[position]
+        for row in fresh:
+            insort(patched, row, key=self._sort_key_by_row)
+        return MatchSet(patched, self._inventory)
+
+    def _sort_key(self, car: CarRecord, row: int) -> tuple[int, int, int]:
+        # Result order: (price, mileage), ties in load order.
+        return car.price, car.mileage, row
+
+    def _sort_key_by_id(self, car_id: str) -> tuple[int, int, int]:
+        return self._sort_key(self._inventory_by_id[car_id], self._row_by_id[car_id])
+
+    def _sort_key_by_row(self, row: int) -> tuple[int, int, int]:
+        # Removed rows still hold their last record, so they keep a key too.
+        return self._sort_key(self._inventory[row], row)
+
+    def _ids_in_load_order(self) -> Sequence[str]:
+        if self._all_ids is None:
+            rows = np.delete(np.arange(len(self._inventory), dtype=np.int64), self._holes)
+            self._all_ids = RowIds(rows, self._id_of_row)
+        return self._all_ids
+
+    def _id_of_row(self, row: int) -> str:
+        # Updates keep a car's row, so a loaded row still has its loaded id.
+        if row < len(self._loaded_ids):
+            return self._loaded_ids[row]
+        return self._inventory[row].id
+
+    def _reconcile(self, profile: CarSearchProfile) -> None:
+        """Bring matches computed before the last `apply_delta` up to date."""
+        if not profile.searched:
+            profile.match_ids = self._ids_in_load_order()
+        else:
+            profile.match_ids = self._search(profile.filters)
+        profile.version = self._version
+
+    def _new_profile(self) -> CarSearchProfile:
+        return CarSearchProfile(match_ids=self._ids_in_load_order(), version=self._version)
+
+    def _search(self, filters: CarFilters, within: Sequence[str] | None = None) -> MatchSet:
+        """Cached search; `within` narrows the scan to a known superset of the result."""
+        key = filters.cache_key()
+        matches = self._results.get(key, self._version)
+        if matches is None:
+            rows = None if within is None else self._rows(within)
+            matches = MatchSet(self._filter_rows(filters, rows), self._inventory)
+            self._results.put(key, self._version, matches)
         return matches
 
-    def _apply_update(self, filters: CarFilters, update: dict[str, Any]) -> None:
-        if "price_min" in update:
-            filters.price_min = update.get("price_min")
-        if "price_max" in update:
-            filters.price_max = update.get("price_max")
-        if "seats_min" in update:
-            filters.seats_min = update.get("seats_min")
-        if "max_mileage" in update:
-            filters.max_mileage = update.get("max_mileage")
-        if "min_year" in update:
-            filters.min_year = update.get("min_year")
-        for key in ("makes", "body_styles", "drivetrains", "fuel_types", "must_have_features", "locations"):
+    def _rows(self, match_ids: Sequence[str]) -> Sequence[int]:
+        if isinstance(match_ids, MatchSet):
+            return match_ids.rows
+        return [self._row_by_id[car_id] for car_id in match_ids]
+
+    def _records(self, match_ids: Sequence[str]) -> list[CarRecord]:
+        return [self._inventory_by_id[car_id] for car_id in match_ids]
+
+    def _apply_update(self, filters: CarFilters, update: dict[str, Any]) -> bool:
+        """Apply `update` in place and report whether it can only shrink the match set."""
+        narrowed = True
+        for key in ("price_min", "seats_min", "min_year"):
+            if key in update:
+                current, value = getattr(filters, key), update.get(key)
+                narrowed &= current is None or (value is not None and value >= current)
+                setattr(filters, key, value)
+        for key in ("price_max", "max_mileage"):
+            if key in update:
+                current, value = getattr(filters, key), update.get(key)
+                narrowed &= current is None or (value is not None and value <= current)
+                setattr(filters, key, value)
+        for key in (
+            "makes",
+            "body_styles",
+            "drivetrains",
+            "fuel_types",
+            "must_have_features",
+            "locations",
+        ):
             if key in update and update[key] is not None:
                 value = update[key]
+                current = {item.lower() for item in getattr(filters, key)}
                 if isinstance(value, str):
                     setattr(filters, key, [value])
                 else:
                     setattr(filters, key, [str(item) for item in value if item])
+                updated = {item.lower() for item in getattr(filters, key)}
+                if key == "must_have_features":
+                    # Every extra feature is one more requirement.
+                    narrowed &= current <= updated
+                else:
+                    # Any-of lists narrow when they keep a subset of the allowed values.
+                    narrowed &= not current or (bool(updated) and updated <= current)
+        if "near" in update or "radius_miles" in update:
+            area = filters.area()
+            if "near" in update:
+                filters.near = update["near"] or None
+            if "radius_miles" in update:
+                filters.radius_miles = update["radius_miles"]
+            if filters.near is None:
+                filters.radius_miles = None
+            elif filters.radius_miles is None:
+                filters.radius_miles = DEFAULT_RADIUS_MILES
+            # A circle no larger around the same place can only lose cars.
+            updated_area = filters.area()
+            narrowed &= area is None or (
+                updated_area is not None
+                and updated_area[0] == area[0]
+                and updated_area[1] <= area[1]
+            )
+        return narrowed
 
-    def snapshot(self, thread_id: str | None) -> dict[str, Any]:
-        profile = self.get_profile(thread_id)
-        cars = self._resolve_matches(profile)
+    def snapshot(
+        self,
+        thread_id: str | None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> dict[str, Any]:
+        """The thread's filters and matches, optionally one page at a time.
+
+        `next_cursor` resumes after the last car of the page by its sort key,
+        so paging stays consistent when the inventory changes in between.
+        `fields` limits each car payload to those keys.
+        """
+        page = self.snapshot_page(thread_id, limit, cursor, fields)
         return {
-            "filters": profile.filters.to_payload(),
-            "cars": [car.to_payload() for car in cars],
-            "total": len(cars),
+            "filters": page.filters,
+            "cars": [car.to_payload(page.fields) for car in self._records(page.car_ids)],
+            "total": page.total,
+            "next_cursor": page.next_cursor,
+            "facets": page.facets,
         }
 
+    def snapshot_page(
+        self,
+        thread_id: str | None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> SnapshotPage:
+        """Resolve the page `snapshot` would return, without serializing any car."""
+        self._check_fields(fields)
+        profile = self.get_profile(thread_id)
+        return self._page(profile, limit, cursor, fields, self.facets(thread_id))
+
+    async def snapshot_page_async(
+        self,
+        thread_id: str | None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> SnapshotPage:
+        """`snapshot_page`, with its SQLite reads run off the event loop."""
+        self._check_fields(fields)
+        facets = await self.facets_async(thread_id)
+        profile = self._detached(await self.get_profile_async(thread_id))
+        return await self._off_loop(self._page, profile, limit, cursor, fields, facets)
+
+    def _check_fields(self, fields: Sequence[str] | None) -> None:
+        unknown = set(fields or ()) - set(CAR_PAYLOAD_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown car fields: {', '.join(sorted(unknown))}")
+
+    def _page(
+        self,
+        profile: CarSearchProfile,
+        limit: int | None,
+        cursor: str | None,
+        fields: Sequence[str] | None,
+        facets: dict[str, Any],
+    ) -> SnapshotPage:
+        match_ids = profile.match_ids
+        start = 0 if cursor is None else self._page_start(profile, cursor)
+        stop = len(match_ids) if limit is None else min(len(match_ids), start + limit)
+        page = match_ids[start:stop]
+        next_cursor = None
+        if stop < len(match_ids):
+            next_cursor = "-".join(map(str, self._page_key(profile, page[-1])))
+        filters = profile.filters.to_payload()
+        projection = None if fields is None else tuple(fields)
+        # The page's ids and the inventory version pin down every byte of the body.
+        fingerprint = orjson.dumps(
+            [self._version, filters, len(match_ids), list(page), next_cursor, projection]
+        )
+        return SnapshotPage(
+            filters=filters,
+            car_ids=page,
+            total=len(match_ids),
+            next_cursor=next_cursor,
+            fields=projection,
+            etag=f'"{hashlib.blake2b(fingerprint, digest_size=16).hexdigest()}"',
+            facets=facets,
+        )
+
+    def render_snapshot(self, page: SnapshotPage) -> bytes:
+        """The `/autos/cars` response body, assembled from cached per-car JSON."""
+        return self._render(page, self._records(page.car_ids))
+
+    async def render_snapshot_async(self, page: SnapshotPage) -> bytes:
+        """`render_snapshot`, with the page's records read off the event loop."""
+        return self._render(page, await self._off_loop(self._records, page.car_ids))
+
+    def _render(self, page: SnapshotPage, records: Iterable[CarRecord]) -> bytes:
+        cars = b",".join(self._payloads.get(car, page.fields, self._version) for car in records)
+        return (
+            b'{"inventory":{"filters":%b,"cars":[%b],"total":%d,"next_cursor":%b,"facets":%b}}'
+            % (
+                orjson.dumps(page.filters),
+                cars,
+                page.total,
+                orjson.dumps(page.next_cursor),
+                orjson.dumps(page.facets),
+            )
+        )
+
+    def _page_key(self, profile: CarSearchProfile, car_id: str) -> tuple[int, ...]:
+        # New profiles page through load order, searched ones through result order.
+        if not profile.searched:
+            return (self._row_by_id[car_id],)
+        return self._sort_key_by_id(car_id)
+
+    def _page_start(self, profile: CarSearchProfile, cursor: str) -> int:
+        key = tuple(int(part) for part in cursor.split("-"))
+        expected = 3 if profile.searched else 1
+        if len(key) != expected:
+            raise ValueError("Cursor does not belong to these results")
+        return bisect_right(
+            profile.match_ids, key, key=lambda car_id: self._page_key(profile, car_id)
+        )
+
     def build_context_block(self, thread_id: str) -> str:
         profile = self.get_profile(thread_id)
+        facets = self.facets(thread_id) if profile.match_ids else None
+        return self._context_block(profile, facets)
+
+    async def build_context_block_async(self, thread_id: str) -> str:
+        """`build_context_block`, with its SQLite reads run off the event loop."""
+        profile = await self.get_profile_async(thread_id)
+        facets = await self.facets_async(thread_id) if profile.match_ids else None
+        return await self._off_loop(self._context_block, self._detached(profile), facets)
+
+    def _context_block(self, profile: CarSearchProfile, facets: dict[str, Any] | None) -> str:
         filters = profile.filters
-        cars = self._resolve_matches(profile)
+        total = len(profile.match_ids)
         summary_lines = ["<CAR_SEARCH_PROFILE>"]
         if filters.is_empty():
             summary_lines.append("No filters selected yet. Showing the full inventory.")
@@ -220,64 +1534,50 @@ class CarInventoryStore:
                 summary_lines.append(f"- Fuel types: {', '.join(filters.fuel_types)}.")
             if filters.locations:
                 summary_lines.append(f"- Locations: {', '.join(filters.locations)}.")
+            if filters.near:
+                summary_lines.append(f"- Within {filters.radius_miles} miles of {filters.near}.")
             if filters.must_have_features:
                 summary_lines.append(
                     f"- Must-have features: {', '.join(filters.must_have_features)}."
                 )
-        top_matches = ", ".join(car.display_name() for car in cars[:5]) or "No matches yet"
-        summary_lines.append(f"Matches ready: {len(cars)} vehicles. Top picks: {top_matches}.")
+        top_picks = self._records(profile.match_ids[:5])
+        top_matches = ", ".join(car.display_name() for car in top_picks) or "No matches yet"
+        summary_lines.append(f"Matches ready: {total} vehicles. Top picks: {top_matches}.")
+        if facets is not None:
+            breakdown = [
+                f"{label}: "
+                + ", ".join(f"{entry['value']} ({entry['count']})" for entry in facets[key][:5])
+                for key, label in (
+                    ("makes", "Makes"),
+                    ("body_styles", "Body styles"),
+                    ("fuel_types", "Fuel types"),
+                )
+            ]
+            summary_lines.append(f"Match breakdown: {'; '.join(breakdown)}.")
         summary_lines.append("</CAR_SEARCH_PROFILE>")
         return "\n".join(summary_lines)
 
-    def _resolve_matches(self, profile: CarSearchProfile) -> list[CarRecord]:
-        return [
-            self._inventory_by_id[car_id]
-            for car_id in profile.match_ids
-            if car_id in self._inventory_by_id
-        ]
-
-    def _apply_filters(self, filters: CarFilters) -> list[CarRecord]:
-        def normalized(values: list[str]) -> set[str]:
-            return {value.lower() for value in values}
-
-        makes = normalized(filters.makes)
-        body_styles = normalized(filters.body_styles)
-        drivetrains = normalized(filters.drivetrains)
-        fuel_types = normalized(filters.fuel_types)
-        locations = normalized(filters.locations)
-        features = normalized(filters.must_have_features)
+    def _apply_filters(
+        self, filters: CarFilters, within: Sequence[int] | None = None
+    ) -> list[CarRecord]:
+        return [self._inventory[row] for row in self._filter_rows(filters, within)]
 
-        matches: list[CarRecord] = []
-        for car in self._inventory:
-            if filters.price_min is not None and car.price < filters.price_min:
-                continue
-            if filters.price_max is not None and car.price > filters.price_max:
-                continue
-            if filters.seats_min is not None and car.seats < filters.seats_min:
-                continue
-            if filters.max_mileage is not None and car.mileage > filters.max_mileage:
-                continue
-            if filters.min_year is not None and car.year < filters.min_year:
-                continue
-            if makes and car.make.lower() not in makes:
-                continue
-            if body_styles and car.body_style.lower() not in body_styles:
-                continue
-            if drivetrains and car.drivetrain.lower() not in drivetrains:
-                continue
-            if fuel_types and car.fuel_type.lower() not in fuel_types:
-                continue
-            if locations and car.location.lower() not in locations:
-                continue
-            if features:
-                feature_blob = " ".join(car.features).lower()
-                if any(feat not in feature_blob for feat in features):
-                    continue
-            matches.append(car)
-        matches.sort(key=lambda c: (c.price, c.mileage))
-        return matches
+    def _filter_rows(self, filters: CarFilters, within: Sequence[int] | None = None) -> list[int]:
+        engine = self._engine()
+        if engine is not None:
+            return engine.search(filters, within)
+        assert self._index is not None
+        return self._index.select(filters, within)
 
 
 def load_inventory() -> CarInventoryStore:
-    data_path = Path(__file__).parent / "data" / "cars.json"
-    return CarInventoryStore(data_path)
+    default_path = Path(__file__).parent / "data" / "cars.json"
+    data_path = Path(os.environ.get("CAR_INVENTORY_PATH", default_path))
+    ttl = os.environ.get("CAR_PROFILE_TTL_SECONDS")
+    return CarInventoryStore(
+        data_path,
+        engine=os.environ.get("CAR_INVENTORY_ENGINE"),
+        max_profiles=int(os.environ.get("CAR_PROFILE_MAX_THREADS", 10_000)),
+        profile_ttl=float(ttl) if ttl else 6 * 3600,
+        search_workers=int(os.environ.get("CAR_SEARCH_WORKERS", 0)),
+    )
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class FilterResultCache(Generic[T]):
+    """LRU cache of per-filter results (match ids, facet counts) shared by every thread.
+
+    Entries are only valid for the inventory version they were computed
+    against: `patch` carries them over to the next version, otherwise the first
+    lookup with a newer version drops the whole cache.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, T] = OrderedDict()
+
+    def get(self, key: Hashable, version: int) -> T | None:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, version: int, value: T) -> None:
+        if version != self.version:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def patch(
+        self,
+        version: int,
+        new_version: int,
+        update: Callable[[Hashable, T], T],
+    ) -> None:
+        """Carry entries computed at `version` over to `new_version` by rewriting them.
+
+        Entries from any other version are stale and dropped instead.
+        """
+        if version == self.version:
+            for key, value in self._entries.items():
+                self._entries[key] = update(key, value)
+        else:
+            self._entries.clear()
+        self.version = new_version
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
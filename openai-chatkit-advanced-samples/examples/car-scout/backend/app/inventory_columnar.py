@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .inventory_geo import Coordinates, PlaceIndex, distance_rank
+from .inventory_index import (
+    CATEGORICAL_FILTERS,
+    HISTOGRAM_EDGES,
+    RANGE_COLUMNS,
+    VALUE_MILES_PER_POUND,
+    VALUE_PER_MODEL_YEAR,
+    CategoricalCounts,
+)
+
+if TYPE_CHECKING:
+    from .car_inventory import CarFilters, CarRecord, FilterConstraint
+
+# Stored in the `range_miles` column for cars without a quoted range.
+NO_RANGE = -1
+
+NUMERIC_COLUMNS = (*RANGE_COLUMNS, "range_miles")
+
+
+class DictionaryColumn:
+    """Lowercased string column stored as integer codes into a value dictionary."""
+
+    def __init__(self, values: list[str], codes: NDArray[np.int32]) -> None:
+        self.values = values
+        self.codes_by_value = {value: code for code, value in enumerate(values)}
+        self.codes = codes
+
+    @classmethod
+    def encode(cls, column: Iterable[str]) -> DictionaryColumn:
+        values: list[str] = []
+        codes_by_value: dict[str, int] = {}
+        codes: list[int] = []
+        for value in column:
+            code = codes_by_value.get(value)
+            if code is None:
+                code = len(values)
+                codes_by_value[value] = code
+                values.append(value)
+            codes.append(code)
+        return cls(values, np.asarray(codes, dtype=np.int32))
+
+    def code(self, value: str) -> int:
+        """Code of `value`, adding it to the dictionary if it is new."""
+        code = self.codes_by_value.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes_by_value[value] = code
+            self.values.append(value)
+        return code
+
+    def isin(
+        self, wanted: Iterable[str], rows: NDArray[np.intp] | None = None
+    ) -> NDArray[np.bool_]:
+        lookup = np.zeros(len(self.values), dtype=bool)
+        for value in wanted:
+            code = self.codes_by_value.get(value)
+            if code is not None:
+                lookup[code] = True
+        return lookup[self.codes if rows is None else self.codes[rows]]
+
+
+class SubstringColumn:
+    """Dictionary-encoded text column answering substring predicates.
+
+    The distinct values are stored once as NUL-separated UTF-8 `text`, with
+    `starts` holding the offset of each value. A term is located with a single
+    regex scan over the text and each hit is mapped back to its value with a
+    binary search, so the per-query cost follows the number of hits rather
+    than the number of distinct values.
+    """
+
+    def __init__(
+        self,
+        text: bytes | bytearray | memoryview,
+        starts: NDArray[np.int64],
+        codes: NDArray[np.int32],
+    ) -> None:
+        self.text = text
+        self.starts = starts
+        self.codes = codes
+        self._codes_by_value: dict[str, int] | None = None
+
+    @classmethod
+    def encode(cls, column: Iterable[str]) -> SubstringColumn:
+        return cls.from_dictionary(DictionaryColumn.encode(column))
+
+    @classmethod
+    def from_dictionary(cls, dictionary: DictionaryColumn) -> SubstringColumn:
+        encoded = [value.encode("utf-8") for value in dictionary.values]
+        starts = np.zeros(len(encoded), dtype=np.int64)
+        if encoded:
+            np.cumsum([len(value) + 1 for value in encoded[:-1]], out=starts[1:])
+        return cls(b"\x00".join(encoded), starts, dictionary.codes)
+
+    def code(self, value: str) -> int:
+        """Code of `value`, appending it to the text if it is new."""
+        if self._codes_by_value is None:
+            entries = bytes(self.text).split(b"\x00") if len(self.starts) else []
+            self._codes_by_value = {
+                entry.decode("utf-8"): index for index, entry in enumerate(entries)
+            }
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = len(self.starts)
+            self._codes_by_value[value] = code
+            if not isinstance(self.text, bytearray):
+                self.text = bytearray(self.text)
+            start = len(self.text) + 1 if code else 0
+            self.text += (b"\x00" if code else b"") + value.encode("utf-8")
+            self.starts = np.append(self.starts, start)
+        return code
+
+    def contains(self, term: str) -> NDArray[np.bool_]:
+        """Lookup table over the distinct values: True where `term` is a substring."""
+        lookup = np.zeros(len(self.starts), dtype=bool)
+        needle = term.encode("utf-8")
+        if not needle:
+            lookup[:] = True
+        elif b"\x00" not in needle:
+            hits = np.fromiter(
+                (match.start() for match in re.finditer(re.escape(needle), self.text)),
+                dtype=np.int64,
+            )
+            lookup[np.searchsorted(self.starts, hits, side="right") - 1] = True
+        return lookup
+
+    def contains_all(
+        self, terms: Iterable[str], rows: NDArray[np.intp] | None = None
+    ) -> NDArray[np.bool_]:
+        lookup = np.ones(len(self.starts), dtype=bool)
+        for term in terms:
+            lookup &= self.contains(term)
+        return lookup[self.codes if rows is None else self.codes[rows]]
+
+
+class ColumnarInventory:
+    """NumPy-backed search engine evaluating `CarFilters` as boolean masks.
+
+    Numeric fields live in contiguous arrays and categorical fields are
+    dictionary-encoded, so a search is a handful of vectorized comparisons.
+    `search` returns row positions in the same `(price, mileage)` order as the
+    scan in `CarInventoryStore`, ties keeping their load order.
+    """
+
+    def __init__(
+        self,
+        numeric: Mapping[str, NDArray[np.int64]],
+        categorical: Mapping[str, DictionaryColumn],
+        features: SubstringColumn,
+        order: NDArray[np.intp] | None = None,
+    ) -> None:
+        self.numeric = dict(numeric)
+        self.categorical = categorical
+        self.features = features
+        self.places = PlaceIndex(self.categorical["locations"].values)
+        self._bind_numeric()
+        # np.lexsort is stable, matching the list.sort() tie-breaking of the scan.
+        self.order = np.lexsort((self._mileage, self._price)) if order is None else order
+
+    def _bind_numeric(self) -> None:
+        self._price = self.numeric["price"]
+        self._mileage = self.numeric["mileage"]
+        self._year = self.numeric["year"]
+        self._seats = self.numeric["seats"]
+        self._size = len(self._price)
+
+    @classmethod
+    def from_records(cls, cars: Sequence[CarRecord]) -> ColumnarInventory:
+        numeric = {
+            column: np.fromiter((getattr(car, column) for car in cars), np.int64, len(cars))
+            for column in RANGE_COLUMNS
+        }
+        numeric["range_miles"] = np.fromiter(
+            (NO_RANGE if car.range_miles is None else car.range_miles for car in cars),
+            np.int64,
+            len(cars),
+        )
+        categorical = {
+            key: DictionaryColumn.encode(getattr(car, attribute).lower() for car in cars)
+            for key, attribute in CATEGORICAL_FILTERS.items()
+        }
+        features = SubstringColumn.encode(" ".join(car.features).lower() for car in cars)
+        return cls(numeric, categorical, features)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def apply(self, changes: Mapping[int, CarRecord | None]) -> None:
+        """Write changed rows in place: a record replaces or appends a row, None removes it.
+
+        Removed rows keep their values but leave `order`, so no search returns
+        them. Appending reallocates the columns, so apply changes in batches.
+        """
+        rows = np.fromiter(changes, dtype=np.intp, count=len(changes))
+        if not len(rows):
+            return
+        size = max(self._size, int(rows.max()) + 1)
+        self.numeric = {column: _writable(values, size) for column, values in self.numeric.items()}
+        self._bind_numeric()
+        for dictionary in self.categorical.values():
+            dictionary.codes = _writable(dictionary.codes, size)
+        self.features.codes = _writable(self.features.codes, size)
+        self.order = self.order[~np.isin(self.order, rows)]
+
+        live: list[int] = []
+        for row, car in changes.items():
+            if car is None:
+                continue
+            for name, values in self.numeric.items():
+                value = getattr(car, name)
+                values[row] = NO_RANGE if value is None else value
+            for key, attribute in CATEGORICAL_FILTERS.items():
+                dictionary = self.categorical[key]
+                dictionary.codes[row] = dictionary.code(getattr(car, attribute).lower())
+            self.places.add(car.location.lower())
+            self.features.codes[row] = self.features.code(" ".join(car.features).lower())
+            live.append(row)
+        self._insert_ordered(live)
+
+    def _insert_ordered(self, rows: list[int]) -> None:
+        """Insert live `rows` into `order`, keeping (price, mileage, row) order."""
+        rows.sort(key=lambda row: (self._price[row], self._mileage[row], row))
+        prices, mileages = self._price[self.order], self._mileage[self.order]
+        positions: list[int] = []
+        for row in rows:
+            start, stop = _equal_range(prices, self._price[row], 0, len(prices))
+            start, stop = _equal_range(mileages, self._mileage[row], start, stop)
+            positions.append(_equal_range(self.order, row, start, stop)[0])
+        self.order = np.insert(self.order, positions, rows)
+
+    def mask(self, filters: CarFilters, rows: NDArray[np.intp] | None = None) -> NDArray[np.bool_]:
+        """Evaluate `filters` over every row, or only over `rows` when given."""
+
+        def take(column: NDArray[np.int64]) -> NDArray[np.int64]:
+            return column if rows is None else column[rows]
+
+        mask = np.ones(self._size if rows is None else len(rows), dtype=bool)
+        if filters.price_min is not None:
+            mask &= take(self._price) >= filters.price_min
+        if filters.price_max is not None:
+            mask &= take(self._price) <= filters.price_max
+        if filters.seats_min is not None:
+            mask &= take(self._seats) >= filters.seats_min
+        if filters.max_mileage is not None:
+            mask &= take(self._mileage) <= filters.max_mileage
+        if filters.min_year is not None:
+            mask &= take(self._year) >= filters.min_year
+        for key, column in self.categorical.items():
+            values: list[str] = getattr(filters, key)
+            if values:
+                mask &= column.isin((value.lower() for value in values), rows)
+        area = filters.area()
+        if area is not None:
+            mask &= self.categorical["locations"].isin(self.places.within(*area), rows)
+        if filters.must_have_features:
+            mask &= self.features.contains_all(
+                {feature.lower() for feature in filters.must_have_features}, rows
+            )
+        return mask
+
+    def facet_counts(
+        self, filters: CarFilters | None
+    ) -> tuple[CategoricalCounts, dict[str, list[int]]]:
+        """Facet and histogram counts over the rows matching `filters` (all rows if None).
+
+        One `np.unique` per categorical column gives every value's count and
+        first row; the histograms are a `searchsorted` plus `bincount`.
+        """
+        rows = self.order if filters is None else self.order[self.mask(filters)[self.order]]
+        # Row order, so each value's first row is its lowest, as with the bitmap index.
+        rows = np.sort(rows)
+        categorical: CategoricalCounts = {}
+        for key, column in self.categorical.items():
+            _, first, counts = np.unique(column.codes[rows], return_index=True, return_counts=True)
+            categorical[key] = list(zip(rows[first].tolist(), counts.tolist()))
+        histograms = {}
+        for name, edges in HISTOGRAM_EDGES.items():
+            buckets = np.searchsorted(edges, self.numeric[name][rows], side="right") - 1
+            histograms[name] = np.bincount(np.maximum(buckets, 0), minlength=len(edges)).tolist()
+        return categorical, histograms
+
+    def relaxation_counts(
+        self, constraints: Sequence[FilterConstraint]
+    ) -> list[tuple[int, int | None]]:
+        """Per constraint, the match count without it and with it widened (if it can be).
+
+        Each live row's failed constraints are counted across the stacked
+        masks; a row failing exactly one counts towards relaxing that one.
+        """
+        live = np.zeros(self._size, dtype=bool)
+        live[self.order] = True
+        if not constraints:
+            return []
+        masks = np.stack([self.mask(constraint.only) for constraint in constraints])
+        failures = np.count_nonzero(~masks, axis=0)
+        passing = int(np.count_nonzero(live & (failures == 0)))
+        near = live & (failures == 1)
+        # The first failed constraint is the only one on `near` rows.
+        culprit = np.argmin(masks, axis=0)
+        without = np.bincount(culprit[near], minlength=len(constraints)) + passing
+        counts: list[tuple[int, int | None]] = []
+        for position, constraint in enumerate(constraints):
+            widened = None
+            if constraint.widened is not None:
+                recovered = near & (culprit == position) & self.mask(constraint.widened)
+                widened = passing + int(np.count_nonzero(recovered))
+            counts.append((int(without[position]), widened))
+        return counts
+
+    def top_k(
+        self, filters: CarFilters | None, sort: str, k: int, origin: Coordinates | None = None
+    ) -> list[int]:
+        """The first `k` rows matching `filters` (all rows if None) ranked by `sort`.
+
+        `np.partition` finds the k-th best rank value, so only the candidates
+        up to it are sorted; a stable sort keeps ties in result order.
+        """
+        rows = self.order if filters is None else self.order[self.mask(filters)[self.order]]
+        if k <= 0:
+            return []
+        values = self.rank_values(sort, rows, origin)
+        candidates = np.arange(len(rows))
+        if k < len(rows):
+            kth = np.partition(values, k - 1)[k - 1]
+            candidates = np.flatnonzero(values <= kth)
+        best = candidates[np.argsort(values[candidates], kind="stable")[:k]]
+        ranked: list[int] = rows[best].tolist()
+        return ranked
+
+    def rank_values(
+        self, sort: str, rows: NDArray[np.intp], origin: Coordinates | None = None
+    ) -> NDArray[np.int64]:
+        """Vectorized `inventory_index.rank_value` over `rows`."""
+        if sort == "cheapest":
+            return self._price[rows]
+        if sort == "newest":
+            return -self._year[rows]
+        if sort == "lowest_mileage":
+            return self._mileage[rows]
+        if sort == "best_range":
+            range_miles = self.numeric["range_miles"][rows]
+            return np.where(range_miles == NO_RANGE, 1, -range_miles)
+        if sort == "value":
+            return (
+                self._price[rows]
+                + self._mileage[rows] // VALUE_MILES_PER_POUND
+                - VALUE_PER_MODEL_YEAR * self._year[rows]
+            )
+        if sort == "nearest":
+            # One distance per distinct location, gathered through the codes.
+            locations = self.categorical["locations"]
+            distances = np.fromiter(
+                (distance_rank(origin, place) for place in locations.values),
+                np.int64,
+                len(locations.values),
+            )
+            return distances[locations.codes[rows]]
+        raise ValueError(f"Unknown sort order {sort!r}")
+
+    def search(self, filters: CarFilters, within: Sequence[int] | None = None) -> list[int]:
+        """Matching rows in `(price, mileage)` order, optionally only among `within`.
+
+        `within` must already be in result order, as returned by an earlier search.
+        """
+        if within is not None:
+            candidates = np.asarray(within, dtype=np.intp)
+            narrowed: list[int] = candidates[self.mask(filters, candidates)].tolist()
+            return narrowed
+        mask = self.mask(filters)
+        rows: list[int] = self.order[mask[self.order]].tolist()
+        return rows
+
+
+def _writable(values: NDArray[Any], size: int) -> NDArray[Any]:
+    """`values` grown to `size` rows, copied if it is a read-only view of a snapshot."""
+    if len(values) == size and values.flags.writeable:
+        return values
+    grown = np.zeros(size, dtype=values.dtype)
+    grown[: len(values)] = values
+    return grown
+
+
+def _equal_range(keys: NDArray[Any], value: Any, start: int, stop: int) -> tuple[int, int]:
+    """Bounds of `value` within the sorted slice `keys[start:stop]`."""
+    window = keys[start:stop]
+    return (
+        start + int(np.searchsorted(window, value, side="left")),
+        start + int(np.searchsorted(window, value, side="right")),
+    )
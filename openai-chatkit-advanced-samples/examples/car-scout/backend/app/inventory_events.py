@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class ThreadEventBroker:
+    """Fans inventory profile changes out to the streams watching each thread."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue[dict[str, Any]]]] = {}
+
+    def publish(self, thread_id: str, change: dict[str, Any]) -> None:
+        for queue in self._subscribers.get(thread_id, ()):
+            queue.put_nowait(change)
+
+    @contextmanager
+    def subscribe(self, thread_id: str) -> Iterator[asyncio.Queue[dict[str, Any]]]:
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._subscribers.setdefault(thread_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[thread_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[thread_id]
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+# (latitude, longitude) in degrees.
+Coordinates = tuple[float, float]
+
+EARTH_RADIUS_MILES = 3_958.8
+
+DEFAULT_RADIUS_MILES = 25
+
+# Rank given to cars whose location is not in the gazetteer when sorting by distance.
+UNKNOWN_DISTANCE = 1 << 40
+
+# Town and city centres, keyed by the normalized place name.
+GAZETTEER: dict[str, Coordinates] = {
+    "aberdeen": (57.1497, -2.0943),
+    "basingstoke": (51.2665, -1.0924),
+    "bath": (51.3758, -2.3599),
+    "bedford": (52.1360, -0.4667),
+    "belfast": (54.5973, -5.9301),
+    "birmingham": (52.4862, -1.8904),
+    "blackpool": (53.8175, -3.0357),
+    "bolton": (53.5769, -2.4282),
+    "bournemouth": (50.7192, -1.8808),
+    "bradford": (53.7960, -1.7594),
+    "brighton": (50.8225, -0.1372),
+    "bristol": (51.4545, -2.5879),
+    "cambridge": (52.2053, 0.1218),
+    "canterbury": (51.2802, 1.0789),
+    "cardiff": (51.4816, -3.1791),
+    "carlisle": (54.8925, -2.9329),
+    "chelmsford": (51.7356, 0.4685),
+    "cheltenham": (51.8994, -2.0783),
+    "chester": (53.1934, -2.8931),
+    "colchester": (51.8959, 0.8919),
+    "coventry": (52.4068, -1.5197),
+    "crawley": (51.1091, -0.1872),
+    "derby": (52.9225, -1.4746),
+    "derry": (54.9966, -7.3086),
+    "doncaster": (53.5228, -1.1285),
+    "dundee": (56.4620, -2.9707),
+    "durham": (54.7761, -1.5733),
+    "edinburgh": (55.9533, -3.1883),
+    "exeter": (50.7184, -3.5339),
+    "glasgow": (55.8642, -4.2518),
+    "gloucester": (51.8642, -2.2382),
+    "guildford": (51.2362, -0.5704),
+    "harrogate": (53.9921, -1.5418),
+    "high wycombe": (51.6287, -0.7482),
+    "huddersfield": (53.6458, -1.7850),
+    "hull": (53.7676, -0.3274),
+    "inverness": (57.4778, -4.2247),
+    "ipswich": (52.0567, 1.1482),
+    "lancaster": (54.0466, -2.8007),
+    "leeds": (53.8008, -1.5491),
+    "leicester": (52.6369, -1.1398),
+    "lincoln": (53.2307, -0.5406),
+    "liverpool": (53.4084, -2.9916),
+    "london": (51.5074, -0.1278),
+    "luton": (51.8787, -0.4200),
+    "maidstone": (51.2704, 0.5227),
+    "manchester": (53.4808, -2.2426),
+    "middlesbrough": (54.5742, -1.2350),
+    "milton keynes": (52.0406, -0.7594),
+    "newcastle upon tyne": (54.9783, -1.6178),
+    "newport": (51.5842, -2.9977),
+    "northampton": (52.2405, -0.9027),
+    "norwich": (52.6309, 1.2974),
+    "nottingham": (52.9548, -1.1581),
+    "oxford": (51.7520, -1.2577),
+    "perth": (56.3950, -3.4308),
+    "peterborough": (52.5695, -0.2405),
+    "plymouth": (50.3755, -4.1427),
+    "portsmouth": (50.8198, -1.0880),
+    "preston": (53.7632, -2.7031),
+    "reading": (51.4543, -0.9781),
+    "salisbury": (51.0688, -1.7945),
+    "sheffield": (53.3811, -1.4701),
+    "slough": (51.5105, -0.5950),
+    "southampton": (50.9097, -1.4044),
+    "southend-on-sea": (51.5459, 0.7077),
+    "stirling": (56.1165, -3.9369),
+    "stockport": (53.4106, -2.1575),
+    "stoke-on-trent": (53.0027, -2.1794),
+    "sunderland": (54.9069, -1.3838),
+    "swansea": (51.6214, -3.9436),
+    "swindon": (51.5558, -1.7797),
+    "wakefield": (53.6833, -1.4977),
+    "warrington": (53.3900, -2.5970),
+    "watford": (51.6565, -0.3903),
+    "winchester": (51.0632, -1.3080),
+    "wolverhampton": (52.5862, -2.1288),
+    "worcester": (52.1936, -2.2216),
+    "wrexham": (53.0466, -2.9930),
+    "york": (53.9600, -1.0873),
+}
+
+PLACE_ALIASES = {
+    "newcastle": "newcastle upon tyne",
+    "kingston upon hull": "hull",
+    "londonderry": "derry",
+    "southend": "southend-on-sea",
+    "stoke": "stoke-on-trent",
+}
+
+_COUNTRY_SUFFIX = re.compile(
+    r",\s*(uk|united kingdom|gb|great britain|england|scotland|wales|northern ireland)$"
+)
+
+
+def normalize_place(place: str) -> str:
+    """Lowercase `place` and drop a trailing country, so "Leeds, UK" becomes "leeds"."""
+    name = " ".join(place.lower().split())
+    name = _COUNTRY_SUFFIX.sub("", name).strip(" ,")
+    return PLACE_ALIASES.get(name, name)
+
+
+@lru_cache(maxsize=4096)
+def geocode(place: str) -> Coordinates | None:
+    """Coordinates of a place name from the gazetteer, or None if it is not listed."""
+    return GAZETTEER.get(normalize_place(place))
+
+
+def distance_miles(origin: Coordinates, destination: Coordinates) -> float:
+    """Great-circle distance by the haversine formula."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*origin, *destination))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_rank(origin: Coordinates | None, place: str) -> int:
+    """Distance to `place` in tenths of a mile, for integer sort keys."""
+    coordinates = geocode(place)
+    if origin is None or coordinates is None:
+        return UNKNOWN_DISTANCE
+    return round(distance_miles(origin, coordinates) * 10)
+
+
+def _unit_vector(coordinates: Coordinates) -> tuple[float, float, float]:
+    lat, lon = map(math.radians, coordinates)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+@dataclass(slots=True)
+class _Node:
+    item: int
+    axis: int
+    left: _Node | None
+    right: _Node | None
+
+
+class KDTree:
+    """Static 3-d tree over points on the unit sphere.
+
+    Points are stored as unit vectors, where the straight-line (chord)
+    distance grows with the great-circle distance, so a radius on the earth's
+    surface is a ball query answered in O(log n + hits).
+    """
+
+    def __init__(self, points: Sequence[Coordinates]) -> None:
+        self._vectors = [_unit_vector(point) for point in points]
+        self._root = self._build(list(range(len(points))), 0)
+
+    def _build(self, items: list[int], depth: int) -> _Node | None:
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: self._vectors[item][axis])
+        middle = len(items) // 2
+        return _Node(
+            items[middle],
+            axis,
+            self._build(items[:middle], depth + 1),
+            self._build(items[middle + 1 :], depth + 1),
+        )
+
+    def within(self, center: Coordinates, radius_miles: float) -> list[int]:
+        """Points at most about `radius_miles` from `center`; callers check exact distances.
+
+        The search radius is padded slightly so rounding never drops a point
+        right on the boundary.
+        """
+        angle = min(math.pi, max(0.0, radius_miles) / EARTH_RADIUS_MILES)
+        chord = 2 * math.sin(angle / 2) * (1 + 1e-9) + 1e-12
+        query = _unit_vector(center)
+        found: list[int] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            vector = self._vectors[node.item]
+            if sum((a - b) ** 2 for a, b in zip(vector, query)) <= chord * chord:
+                found.append(node.item)
+            offset = query[node.axis] - vector[node.axis]
+            near, far = (node.left, node.right) if offset < 0 else (node.right, node.left)
+            stack.append(near)
+            if abs(offset) <= chord:
+                stack.append(far)
+        return found
+
+
+class PlaceIndex:
+    """Geocoded inventory locations in a k-d tree, for "within N miles of" filters.
+
+    Indexes the distinct location strings rather than individual cars: a
+    radius query resolves to the set of locations inside the circle, which
+    the engines then match like any other categorical filter.
+    """
+
+    def __init__(self, locations: Iterable[str] = ()) -> None:
+        self._coordinates: dict[str, Coordinates] = {}
+        self.unresolved: set[str] = set()
+        self._tree: KDTree | None = None
+        self._places: list[str] = []
+        for location in locations:
+            self.add(location)
+
+    def add(self, location: str) -> None:
+        if location in self._coordinates or location in self.unresolved:
+            return
+        coordinates = geocode(location)
+        if coordinates is None:
+            self.unresolved.add(location)
+            return
+        self._coordinates[location] = coordinates
+        self._tree = None
+
+    def within(self, near: str, radius_miles: float) -> dict[str, float]:
+        """Indexed locations within `radius_miles` of `near`, with their distances.
+
+        Empty when `near` itself is not in the gazetteer.
+        """
+        origin = geocode(near)
+        if origin is None:
+            return {}
+        if self._tree is None:
+            self._places = list(self._coordinates)
+            self._tree = KDTree([self._coordinates[place] for place in self._places])
+        nearby = {}
+        for item in self._tree.within(origin, radius_miles):
+            place = self._places[item]
+            distance = distance_miles(origin, self._coordinates[place])
+            if distance <= radius_miles:
+                nearby[place] = distance
+        return nearby
@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+from .inventory_geo import Coordinates, PlaceIndex, distance_rank
+
+if TYPE_CHECKING:
+    from .car_inventory import CarFilters, CarRecord, FilterConstraint
+
+CATEGORICAL_FILTERS: dict[str, str] = {
+    "makes": "make",
+    "body_styles": "body_style",
+    "drivetrains": "drivetrain",
+    "fuel_types": "fuel_type",
+    "locations": "location",
+}
+
+RANGE_COLUMNS = ("price", "mileage", "year", "seats")
+
+# Sort keys pack the mileage into 32 bits, so every mileage must stay below this.
+MILEAGE_LIMIT = 1 << 32
+
+# Lower edges of the facet histogram buckets; the last bucket is open-ended.
+HISTOGRAM_EDGES: dict[str, tuple[int, ...]] = {
+    "price": (0, 10_000, 15_000, 20_000, 25_000, 30_000, 40_000, 50_000, 75_000),
+    "mileage": (0, 10_000, 25_000, 50_000, 75_000, 100_000),
+}
+
+# Orderings for ranked results. Each ranks by one value, lowest first, and
+# keeps the default (price, mileage) order among ties. "nearest" needs a `near` filter.
+SORT_ORDERS = ("cheapest", "newest", "lowest_mileage", "best_range", "value", "nearest")
+
+# The "value" score: price, plus £1 per 10 miles, minus £1,000 per model year.
+VALUE_MILES_PER_POUND = 10
+VALUE_PER_MODEL_YEAR = 1_000
+
+# Per facet: (representative row, count) for every value present in the match set.
+CategoricalCounts = dict[str, list[tuple[int, int]]]
+
+# Row sets are plain Python ints used as bitsets: bit `n` is set when row `n` is in the set.
+_NONZERO_RUN = re.compile(rb"[^\x00]+")
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+def bits_from_rows(rows: Iterable[int], size: int = 0) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for row in rows:
+        index = row >> 3
+        if index >= len(buffer):
+            buffer.extend(bytes(index + 1 - len(buffer)))
+        buffer[index] |= 1 << (row & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def histogram_bucket(column: str, value: int) -> int:
+    return max(bisect_right(HISTOGRAM_EDGES[column], value) - 1, 0)
+
+
+def rank_value(sort: str, car: CarRecord, origin: Coordinates | None = None) -> int:
+    """The value `sort` ranks `car` by; `ColumnarInventory.rank_values` must agree.
+
+    `origin` is the point "nearest" measures distances from.
+    """
+    if sort == "cheapest":
+        return car.price
+    if sort == "newest":
+        return -car.year
+    if sort == "lowest_mileage":
+        return car.mileage
+    if sort == "best_range":
+        # Cars without a quoted range rank after every EV.
+        return 1 if car.range_miles is None else -car.range_miles
+    if sort == "value":
+        return car.price + car.mileage // VALUE_MILES_PER_POUND - VALUE_PER_MODEL_YEAR * car.year
+    if sort == "nearest":
+        return distance_rank(origin, car.location)
+    raise ValueError(f"Unknown sort order {sort!r}")
+
+
+def filter_rows(bits: int, rows: Iterable[int]) -> list[int]:
+    """Keep the rows that are members of `bits`, at O(1) per row."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    size = len(data) << 3
+    return [row for row in rows if row < size and data[row >> 3] >> (row & 7) & 1]
+
+
+def iter_rows(bits: int) -> Iterator[int]:
+    """Yield the rows of a bitset in ascending order, skipping empty bytes in C."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for run in _NONZERO_RUN.finditer(data):
+        for offset, byte in enumerate(run.group(), run.start()):
+            base = offset << 3
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+class BitmapIndex:
+    """Row bitmaps keyed by the lowercased value of one categorical attribute."""
+
+    def __init__(self, values: Sequence[str]) -> None:
+        rows_by_value: dict[str, list[int]] = {}
+        for row, value in enumerate(values):
+            rows_by_value.setdefault(value, []).append(row)
+        self._bitmaps = {
+            value: bits_from_rows(rows, len(values)) for value, rows in rows_by_value.items()
+        }
+
+    def add(self, row: int, value: str) -> None:
+        self._bitmaps[value] = self._bitmaps.get(value, 0) | 1 << row
+
+    def discard(self, row: int, value: str) -> None:
+        bits = self._bitmaps.get(value, 0) & ~(1 << row)
+        if bits:
+            self._bitmaps[value] = bits
+        else:
+            self._bitmaps.pop(value, None)
+
+    def rows_any(self, values: Iterable[str]) -> int:
+        bits = 0
+        for value in values:
+            bits |= self._bitmaps.get(value, 0)
+        return bits
+
+    def count(self, value: str, bits: int) -> int:
+        return (self._bitmaps.get(value, 0) & bits).bit_count()
+
+    def counts(self, bits: int) -> list[tuple[int, int]]:
+        """(lowest row, count) of every value with rows in `bits`."""
+        counts = []
+        for bitmap in self._bitmaps.values():
+            common = bitmap & bits
+            if common:
+                counts.append(((common & -common).bit_length() - 1, common.bit_count()))
+        return counts
+
+
+class RangeIndex:
+    """Rows sorted by one numeric attribute, so a range predicate is a contiguous slice."""
+
+    def __init__(self, values: Sequence[int]) -> None:
+        self.values = list(values)
+        self._rows = sorted(range(len(self.values)), key=self.values.__getitem__)
+        self._keys = [self.values[row] for row in self._rows]
+
+    def bounds(self, low: int | None, high: int | None) -> tuple[int, int]:
+        start = 0 if low is None else bisect_left(self._keys, low)
+        stop = len(self._keys) if high is None else bisect_right(self._keys, high)
+        return start, max(start, stop)
+
+    def rows(self, start: int, stop: int) -> list[int]:
+        return self._rows[start:stop]
+
+    def add(self, row: int, value: int) -> None:
+        if row == len(self.values):
+            self.values.append(value)
+        else:
+            self.values[row] = value
+        position = self._position(row, value)
+        self._rows.insert(position, row)
+        self._keys.insert(position, value)
+
+    def discard(self, row: int) -> None:
+        position = self._position(row, self.values[row])
+        del self._rows[position]
+        del self._keys[position]
+
+    def _position(self, row: int, value: int) -> int:
+        # Equal values are kept in row order, as the initial stable sort left them.
+        start, stop = bisect_left(self._keys, value), bisect_right(self._keys, value)
+        return bisect_left(self._rows, row, start, stop)
+
+
+class FeatureIndex:
+    """Inverted index from lowercased feature phrases to the rows listing them.
+
+    Matches keep the substring semantics of searching `" ".join(features)`:
+    a term without spaces can only occur inside a single phrase, so it is the
+    union of the bitmaps of every phrase containing it. A term with spaces may
+    straddle two phrases; its candidates are narrowed with the space-free
+    pieces and only those rows are checked against the joined text.
+    """
+
+    _TERM_CACHE_SIZE = 1024
+
+    def __init__(self, features: Sequence[Sequence[str]]) -> None:
+        self._features = list(features)
+        self._all_rows = (1 << len(features)) - 1
+        rows_by_phrase: dict[str, list[int]] = {}
+        for row, phrases in enumerate(features):
+            for phrase in phrases:
+                rows_by_phrase.setdefault(phrase.lower(), []).append(row)
+        self._bitmaps = {
+            phrase: bits_from_rows(rows, len(features)) for phrase, rows in rows_by_phrase.items()
+        }
+        self._term_rows: dict[str, int] = {}
+
+    def add(self, row: int, phrases: Sequence[str]) -> None:
+        if row == len(self._features):
+            self._features.append(phrases)
+        else:
+            self._features[row] = phrases
+        for phrase in phrases:
+            self._bitmaps[phrase.lower()] = self._bitmaps.get(phrase.lower(), 0) | 1 << row
+        self._all_rows |= 1 << row
+        self._term_rows.clear()
+
+    def discard(self, row: int) -> None:
+        for phrase in self._features[row]:
+            bits = self._bitmaps.get(phrase.lower(), 0) & ~(1 << row)
+            if bits:
+                self._bitmaps[phrase.lower()] = bits
+            else:
+                self._bitmaps.pop(phrase.lower(), None)
+        self._all_rows &= ~(1 << row)
+        self._term_rows.clear()
+
+    def rows_containing(self, term: str) -> int:
+        bits = self._term_rows.get(term)
+        if bits is not None:
+            return bits
+        bits = 0
+        for phrase, phrase_rows in self._bitmaps.items():
+            if term in phrase:
+                bits |= phrase_rows
+        if not term:
+            bits = self._all_rows
+        elif " " in term:
+            candidates = self._all_rows & ~bits
+            for piece in term.split(" "):
+                if piece:
+                    candidates &= self.rows_containing(piece)
+            straddling = (
+                row
+                for row in iter_rows(candidates)
+                if term in " ".join(self._features[row]).lower()
+            )
+            bits |= bits_from_rows(straddling, len(self._features))
+        if len(self._term_rows) >= self._TERM_CACHE_SIZE:
+            self._term_rows.clear()
+        self._term_rows[term] = bits
+        return bits
+
+    def rows_containing_all(self, terms: Iterable[str]) -> int:
+        bits = self._all_rows
+        for term in terms:
+            bits &= self.rows_containing(term)
+            if not bits:
+                break
+        return bits
+
+
+def _range_predicates(filters: CarFilters) -> list[tuple[str, int | None, int | None]]:
+    predicates: list[tuple[str, int | None, int | None]] = []
+    if filters.price_min is not None or filters.price_max is not None:
+        predicates.append(("price", filters.price_min, filters.price_max))
+    if filters.max_mileage is not None:
+        predicates.append(("mileage", None, filters.max_mileage))
+    if filters.min_year is not None:
+        predicates.append(("year", filters.min_year, None))
+    if filters.seats_min is not None:
+        predicates.append(("seats", filters.seats_min, None))
+    return predicates
+
+
+def _sort_key(price: int, mileage: int, row: int) -> int:
+    # (price, mileage, row) packed into one int; `check_record` keeps both in range.
+    return price << 64 | mileage << 32 | row
+
+
+class InventoryIndex:
+    """Indexes over an inventory, addressed by row position.
+
+    They are built at load time and kept current by `add` and `discard`. A
+    removed row leaves a hole: it is dropped from every index but row numbers
+    are never reused.
+    """
+
+    def __init__(self, cars: Sequence[CarRecord]) -> None:
+        self.size = len(cars)
+        self.all_rows = (1 << self.size) - 1
+        self.facets = {
+            key: BitmapIndex([getattr(car, attribute).lower() for car in cars])
+            for key, attribute in CATEGORICAL_FILTERS.items()
+        }
+        self.features = FeatureIndex([car.features for car in cars])
+        self.places = PlaceIndex(car.location.lower() for car in cars)
+        self.ranges = {
+            column: RangeIndex([getattr(car, column) for car in cars]) for column in RANGE_COLUMNS
+        }
+        self.histograms = {
+            column: BitmapIndex(
+                [str(histogram_bucket(column, getattr(car, column))) for car in cars]
+            )
+            for column in HISTOGRAM_EDGES
+        }
+        # Result order of the original scan: (price, mileage), ties in load order.
+        self.sort_keys = [_sort_key(car.price, car.mileage, row) for row, car in enumerate(cars)]
+        self.order = sorted(range(self.size), key=self.sort_keys.__getitem__)
+
+    def add(self, row: int, car: CarRecord) -> None:
+        """Index `car` at `row`, either the next new row or one just discarded."""
+        if row == self.size:
+            self.size += 1
+            self.sort_keys.append(0)
+        self.all_rows |= 1 << row
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            self.facets[key].add(row, getattr(car, attribute).lower())
+        self.features.add(row, car.features)
+        self.places.add(car.location.lower())
+        for column in RANGE_COLUMNS:
+            self.ranges[column].add(row, getattr(car, column))
+        for column, histogram in self.histograms.items():
+            histogram.add(row, str(histogram_bucket(column, getattr(car, column))))
+        self.sort_keys[row] = _sort_key(car.price, car.mileage, row)
+        insort(self.order, row, key=self.sort_keys.__getitem__)
+
+    def discard(self, row: int, car: CarRecord) -> None:
+        """Drop `row`, which currently holds `car`, from every index."""
+        self.all_rows &= ~(1 << row)
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            self.facets[key].discard(row, getattr(car, attribute).lower())
+        self.features.discard(row)
+        for column in RANGE_COLUMNS:
+            self.ranges[column].discard(row)
+        for column, histogram in self.histograms.items():
+            histogram.discard(row, str(histogram_bucket(column, getattr(car, column))))
+        position = bisect_left(self.order, self.sort_keys[row], key=self.sort_keys.__getitem__)
+        del self.order[position]
+
+    def select(self, filters: CarFilters, within: Sequence[int] | None = None) -> list[int]:
+        """Rows matching every filter, in result order.
+
+        The cheapest access path drives the query: the narrowest range slice,
+        the combined categorical and feature bitmaps, or the caller's `within`
+        rows when it already knows the answer is a subset of them. The other
+        predicates are then checked per candidate row.
+        """
+        predicates = _range_predicates(filters)
+        bits = self.categorical_rows(filters)
+        if filters.must_have_features and bits != 0:
+            feature_rows = self.features.rows_containing_all(
+                {feature.lower() for feature in filters.must_have_features}
+            )
+            bits = feature_rows if bits is None else bits & feature_rows
+        if not predicates and bits is None:
+            return (
+                list(self.order)
+                if within is None
+                else sorted(within, key=self.sort_keys.__getitem__)
+            )
+
+        slices = [
+            (column, *self.ranges[column].bounds(low, high)) for column, low, high in predicates
+        ]
+        narrowest = min(slices, key=lambda item: item[2] - item[1], default=None)
+        sizes = [self.size if narrowest is None else narrowest[2] - narrowest[1]]
+        if bits is not None:
+            sizes.append(bits.bit_count())
+        if within is not None and len(within) <= min(sizes):
+            rows = self._check_ranges(within, predicates)
+            if bits is not None:
+                rows = filter_rows(bits, rows)
+        elif bits is not None and (narrowest is None or sizes[1] < sizes[0]):
+            rows = self._check_ranges(iter_rows(bits), predicates)
+        else:
+            assert narrowest is not None
+            column, start, stop = narrowest
+            rows = self._check_ranges(
+                self.ranges[column].rows(start, stop),
+                [predicate for predicate in predicates if predicate[0] != column],
+            )
+            if bits is not None:
+                rows = filter_rows(bits, rows)
+        rows.sort(key=self.sort_keys.__getitem__)
+        return rows
+
+    def facet_counts(self, bits: int) -> tuple[CategoricalCounts, dict[str, list[int]]]:
+        """Facet and histogram counts over the rows in `bits`, by popcount of each bitmap."""
+        categorical = {key: facet.counts(bits) for key, facet in self.facets.items()}
+        histograms = {
+            column: [
+                self.histograms[column].count(str(bucket), bits) for bucket in range(len(edges))
+            ]
+            for column, edges in HISTOGRAM_EDGES.items()
+        }
+        return categorical, histograms
+
+    def matching_bits(self, filters: CarFilters) -> int:
+        """Rows matching `filters` as a bitmap, in no particular order."""
+        bits = self.all_rows
+        for column, low, high in _range_predicates(filters):
+            start, stop = self.ranges[column].bounds(low, high)
+            bits &= bits_from_rows(self.ranges[column].rows(start, stop), self.size)
+        categorical = self.categorical_rows(filters)
+        if categorical is not None:
+            bits &= categorical
+        if filters.must_have_features:
+            bits &= self.features.rows_containing_all(
+                {feature.lower() for feature in filters.must_have_features}
+            )
+        return bits
+
+    def relaxation_counts(
+        self, constraints: Sequence[FilterConstraint]
+    ) -> list[tuple[int, int | None]]:
+        """Per constraint, the match count without it and with it widened (if it can be).
+
+        Prefix and suffix ANDs of the constraint bitmaps give the rows passing
+        every constraint but one, without re-running a search per constraint.
+        """
+        sets = [self.matching_bits(constraint.only) for constraint in constraints]
+        prefix = [self.all_rows]
+        for bits in sets:
+            prefix.append(prefix[-1] & bits)
+        suffix = [self.all_rows]
+        for bits in reversed(sets):
+            suffix.append(suffix[-1] & bits)
+        suffix.reverse()
+        counts: list[tuple[int, int | None]] = []
+        for position, constraint in enumerate(constraints):
+            others = prefix[position] & suffix[position + 1]
+            widened = None
+            if constraint.widened is not None:
+                widened = (others & self.matching_bits(constraint.widened)).bit_count()
+            counts.append((others.bit_count(), widened))
+        return counts
+
+    def _check_ranges(
+        self, rows: Iterable[int], predicates: list[tuple[str, int | None, int | None]]
+    ) -> list[int]:
+        checked = list(rows)
+        for column, low, high in predicates:
+            values = self.ranges[column].values
+            if low is not None:
+                checked = [row for row in checked if values[row] >= low]
+            if high is not None:
+                checked = [row for row in checked if values[row] <= high]
+        return checked
+
+    def categorical_rows(self, filters: CarFilters) -> int | None:
+        """OR the bitmaps within each facet and AND across facets.
+
+        A radius search counts as one more facet: the locations inside the
+        circle. Returns None when no categorical filter is active.
+        """
+        wanted = [
+            (self.facets[key], [value.lower() for value in getattr(filters, key)])
+            for key in CATEGORICAL_FILTERS
+            if getattr(filters, key)
+        ]
+        area = filters.area()
+        if area is not None:
+            wanted.append((self.facets["locations"], list(self.places.within(*area))))
+        bits: int | None = None
+        for facet, values in wanted:
+            rows = facet.rows_any(values)
+            bits = rows if bits is None else bits & rows
+            if not bits:
+                break
+        return bits
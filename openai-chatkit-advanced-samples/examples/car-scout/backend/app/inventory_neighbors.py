@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING, Mapping, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    from .car_inventory import CarRecord
+
+# Numeric attributes compared when suggesting alternatives, and how much each one counts.
+ATTRIBUTE_WEIGHTS = {"price": 2.0, "year": 1.0, "mileage": 1.0, "seats": 1.0, "range_miles": 0.5}
+
+# Neighbours kept per car, enough that most filter sets still leave a full page of them.
+NEIGHBOR_POOL = 64
+
+# Candidate sets at least this large are searched in a k-d tree rather than scanned.
+TREE_THRESHOLD = 16384
+
+# Points per k-d tree leaf, whose distances are computed together.
+LEAF_SIZE = 512
+
+# Moved points are scanned beside the tree until they are this share of all points.
+MOVED_SHARE = 0.125
+
+
+class AttributeSpace:
+    """Cars as points in a standardized (price, year, mileage, seats, range) space.
+
+    Each attribute is centred and divided by its standard deviation when the
+    space is built, then scaled by its weight, so a Euclidean distance says
+    how different two cars are overall. Cars without an electric range count
+    as zero range. Small candidate sets are scanned; large ones are searched
+    in a k-d tree built on first use, with the points deltas moved since then
+    scanned beside it.
+    """
+
+    def __init__(self, columns: Mapping[str, NDArray[np.int64]]) -> None:
+        values = _stack(columns)
+        self._mean = values.mean(axis=0) if len(values) else np.zeros(len(ATTRIBUTE_WEIGHTS))
+        spread = values.std(axis=0) if len(values) else np.ones(len(ATTRIBUTE_WEIGHTS))
+        self._scale = np.array(list(ATTRIBUTE_WEIGHTS.values())) / np.where(spread > 0, spread, 1)
+        self._points = self._project(values)
+        self._size = len(values)
+        self._tree: _PointTree | None = None
+        # Rows changed or added since the tree was built, whose points it may not hold.
+        self._moved: set[int] = set()
+        # The last large candidate array searched, and each row's position in it.
+        self._positions: tuple[NDArray[np.int64], NDArray[np.int64]] | None = None
+
+    @classmethod
+    def from_records(cls, cars: Sequence[CarRecord]) -> AttributeSpace:
+        columns = {
+            name: np.fromiter(
+                (getattr(car, name) or 0 for car in cars), dtype=np.int64, count=len(cars)
+            )
+            for name in ATTRIBUTE_WEIGHTS
+        }
+        return cls(columns)
+
+    def _project(self, values: NDArray[np.float64]) -> NDArray[np.float32]:
+        return ((values - self._mean) * self._scale).astype(np.float32)
+
+    def apply(self, changes: Mapping[int, CarRecord | None]) -> None:
+        """Move the points of added or changed cars; removed cars keep their last point."""
+        size = max(self._size, max(changes, default=-1) + 1)
+        if size > len(self._points):
+            shape = (max(size, len(self._points) * 5 // 4), len(ATTRIBUTE_WEIGHTS))
+            grown = np.zeros(shape, dtype=np.float32)
+            grown[: self._size] = self._points[: self._size]
+            self._points = grown
+        self._moved.update(range(self._size, size))
+        self._positions = None
+        self._size = size
+        for row, car in changes.items():
+            if car is not None:
+                values = [getattr(car, name) or 0 for name in ATTRIBUTE_WEIGHTS]
+                self._points[row] = self._project(np.array(values, dtype=np.float64))
+        self._moved.update(changes)
+        if len(self._moved) > self._size * MOVED_SHARE:
+            self._tree = None
+
+    def nearest(self, row: int, candidates: NDArray[np.int64], k: int) -> list[tuple[int, float]]:
+        """The `k` candidates closest to `row`, nearest first; ties keep the candidates' order."""
+        if len(candidates) < TREE_THRESHOLD:
+            candidates = candidates[candidates != row]
+            order = np.arange(len(candidates))
+            distances = self._distances(row, candidates)
+        else:
+            candidates, distances, order = self._search(row, candidates, k)
+        if k <= 0 or not len(candidates):
+            return []
+        if k < len(distances):
+            kth = np.partition(distances, k - 1)[k - 1]
+            keep = np.flatnonzero(distances <= kth)
+            candidates, distances, order = candidates[keep], distances[keep], order[keep]
+        best = np.lexsort((order, distances))[:k]
+        return [(int(candidates[i]), float(np.sqrt(distances[i]))) for i in best]
+
+    def _distances(self, row: int, rows: NDArray[np.int64]) -> NDArray[np.float32]:
+        """Squared distances from `row` to each of `rows`."""
+        offsets = self._points[rows] - self._points[row]
+        return np.einsum("ij,ij->i", offsets, offsets)
+
+    def _search(
+        self, row: int, candidates: NDArray[np.int64], k: int
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32], NDArray[np.int64]]:
+        """Candidates other than `row` that may be among its `k` nearest, from the tree.
+
+        Returned with their squared distances and their positions in `candidates`.
+        """
+        if self._tree is None:
+            self._tree = _PointTree(self._points[: self._size])
+            self._moved = set()
+        if self._positions is None or self._positions[0] is not candidates:
+            # Alternatives for one filter set are usually looked up car after car.
+            positions = np.full(self._size, -1, dtype=np.int64)
+            positions[candidates] = np.arange(len(candidates))
+            self._positions = (candidates, positions)
+        positions = self._positions[1]
+        moved = np.fromiter(self._moved, dtype=np.int64, count=len(self._moved))
+        moved = moved[(positions[moved] >= 0) & (moved != row)]
+        # The tree holds stale points for moved rows, so they are scanned instead.
+        hidden = np.append(moved, row)
+        hidden_positions = positions[hidden]
+        positions[hidden] = -1
+        try:
+            rows, distances = self._tree.nearest(
+                self._points[row], positions, k, moved, self._distances(row, moved)
+            )
+        finally:
+            positions[hidden] = hidden_positions
+        return rows, distances, positions[rows]
+
+
+class _PointTree:
+    """Static k-d tree over a copy of some points, with leaves scanned as blocks.
+
+    Each node splits its points at the median of their widest attribute and
+    keeps their bounding box. A query visits nodes nearest box first and stops
+    once the nearest box left is further than the `k`-th best distance found.
+    """
+
+    def __init__(self, points: NDArray[np.float32]) -> None:
+        self._points = points.copy()
+        self._lower: list[NDArray[np.float32]] = []
+        self._upper: list[NDArray[np.float32]] = []
+        self._children: list[tuple[int, ...]] = []
+        self._leaves: list[NDArray[np.int64] | None] = []
+        self._add(np.arange(len(points), dtype=np.int64))
+
+    def _add(self, rows: NDArray[np.int64]) -> int:
+        node = len(self._leaves)
+        points = self._points[rows]
+        lower, upper = points.min(axis=0), points.max(axis=0)
+        self._lower.append(lower)
+        self._upper.append(upper)
+        self._children.append(())
+        self._leaves.append(None)
+        if len(rows) <= LEAF_SIZE:
+            self._leaves[node] = np.sort(rows)
+        else:
+            middle = len(rows) // 2
+            split = rows[np.argpartition(points[:, np.argmax(upper - lower)], middle)]
+            self._children[node] = (self._add(split[:middle]), self._add(split[middle:]))
+        return node
+
+    def _gap(self, node: int, query: NDArray[np.float32]) -> float:
+        """Squared distance from `query` to the node's bounding box."""
+        outside = np.maximum(np.maximum(self._lower[node] - query, query - self._upper[node]), 0)
+        return float(outside @ outside)
+
+    def nearest(
+        self,
+        query: NDArray[np.float32],
+        positions: NDArray[np.int64],
+        k: int,
+        rows: NDArray[np.int64],
+        distances: NDArray[np.float32],
+    ) -> tuple[NDArray[np.int64], NDArray[np.float32]]:
+        """Points with a position of 0 or more that may be among the `k` nearest to `query`.
+
+        Starts from `rows` already found at `distances`, and returns them with
+        every point no further than the `k`-th nearest, so ties can be broken
+        by the caller.
+        """
+        kth = np.partition(distances, k - 1)[k - 1] if len(distances) >= k else np.inf
+        heap = [(0.0, 0)]
+        while heap:
+            gap, node = heapq.heappop(heap)
+            # Box gaps are computed in double precision and distances in single.
+            if gap * (1 - 1e-5) > kth:
+                break
+            leaf = self._leaves[node]
+            if leaf is None:
+                for child in self._children[node]:
+                    heapq.heappush(heap, (self._gap(child, query), child))
+                continue
+            leaf = leaf[positions[leaf] >= 0]
+            if not len(leaf):
+                continue
+            offsets = self._points[leaf] - query
+            rows = np.concatenate([rows, leaf])
+            distances = np.concatenate([distances, np.einsum("ij,ij->i", offsets, offsets)])
+            if len(distances) >= k:
+                kth = np.partition(distances, k - 1)[k - 1]
+                keep = distances <= kth
+                rows, distances = rows[keep], distances[keep]
+        return rows, distances
+
+
+def _stack(columns: Mapping[str, NDArray[np.int64]]) -> NDArray[np.float64]:
+    # The columnar engine marks a missing range as negative.
+    return np.column_stack(
+        [np.maximum(np.asarray(columns[name], dtype=np.float64), 0) for name in ATTRIBUTE_WEIGHTS]
+    )
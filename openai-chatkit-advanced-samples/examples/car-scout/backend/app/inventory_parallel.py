@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .inventory_columnar import ColumnarInventory, DictionaryColumn, SubstringColumn
+
+if TYPE_CHECKING:
+    from .car_inventory import CarFilters
+
+_ALIGNMENT = 8
+
+# Spare room given to every array of a shared block, so deltas can be written in place.
+HEADROOM = 1.25
+
+# Arrays with one entry per row, where a delta rewrites only the rows it changed.
+_PER_ROW = ("numeric:", "codes:", "features:codes")
+
+# Tells apart the layouts of one block as it is patched.
+_generations = count()
+
+
+class SharedColumns:
+    """The columns of a `ColumnarInventory` and its live row order in one shared-memory block.
+
+    `layout` is small and picklable; a worker maps the block back into arrays
+    from it without copying anything. Every array is allocated with
+    `HEADROOM`, so `patch` can usually bring the block up to date by writing
+    only the rows a delta changed.
+    """
+
+    def __init__(self, engine: ColumnarInventory, order: NDArray[Any]) -> None:
+        arrays = _arrays(engine, order)
+        self._capacity = {name: int(len(values) * HEADROOM) + 64 for name, values in arrays.items()}
+        size = sum(
+            _aligned(self._capacity[name] * values.itemsize) for name, values in arrays.items()
+        )
+        self.memory = SharedMemory(create=True, size=size)
+        # Searches reading the block right now; it is only patched or unlinked when idle.
+        self.searches = 0
+        self._offsets: dict[str, int] = {}
+        offset = 0
+        for name, values in arrays.items():
+            self._offsets[name] = offset
+            self._target(name, values)[:] = values
+            offset += _aligned(self._capacity[name] * values.itemsize)
+        self._describe(engine, arrays)
+
+    def patch(self, engine: ColumnarInventory, order: NDArray[Any], rows: NDArray[np.intp]) -> bool:
+        """Write `engine`'s changed `rows` into the block; False if an array outgrew its room.
+
+        Appended rows, dictionary values and the order are written too. No
+        search may be reading the block meanwhile.
+        """
+        arrays = _arrays(engine, order)
+        if any(len(values) > self._capacity[name] for name, values in arrays.items()):
+            return False
+        for name, values in arrays.items():
+            target = self._target(name, values)
+            if name == "order":
+                target[:] = values
+                continue
+            # The text and offsets of feature values only ever grow at the end.
+            known = self.layout["columns"][name][2]
+            target[known:] = values[known:]
+            if name.startswith(_PER_ROW):
+                target[rows] = values[rows]
+        self._describe(engine, arrays)
+        return True
+
+    def _target(self, name: str, values: NDArray[Any]) -> NDArray[Any]:
+        return np.ndarray(
+            values.shape, values.dtype, buffer=self.memory.buf, offset=self._offsets[name]
+        )
+
+    def _describe(self, engine: ColumnarInventory, arrays: dict[str, NDArray[Any]]) -> None:
+        self.rows = len(arrays["order"])
+        self.layout: dict[str, Any] = {
+            "name": self.memory.name,
+            "generation": next(_generations),
+            "columns": {
+                name: (self._offsets[name], values.dtype.str, len(values))
+                for name, values in arrays.items()
+            },
+            "values": {key: list(column.values) for key, column in engine.categorical.items()},
+        }
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _arrays(engine: ColumnarInventory, order: NDArray[Any]) -> dict[str, NDArray[Any]]:
+    arrays: dict[str, NDArray[Any]] = {
+        f"numeric:{name}": values for name, values in engine.numeric.items()
+    }
+    for key, column in engine.categorical.items():
+        arrays[f"codes:{key}"] = column.codes
+    arrays["features:text"] = np.frombuffer(engine.features.text, dtype=np.uint8)
+    arrays["features:starts"] = engine.features.starts
+    arrays["features:codes"] = engine.features.codes
+    arrays["order"] = np.asarray(order, dtype=np.int64)
+    return arrays
+
+
+class ShardedSearchExecutor:
+    """Evaluates filters over inventory shards in a pool of worker processes.
+
+    Each shard is a contiguous slice of the live rows in result order, so the
+    per-shard matches are already sorted and merge by concatenation. Call
+    `publish` with the current inventory before searching. Two blocks take
+    turns: each publish patches the older one with the rows changed since it
+    was written and searches move over to it, so the columns are only copied
+    in full when a block runs out of room, or is still being searched.
+    """
+
+    def __init__(self, workers: int, shards: int | None = None) -> None:
+        self.workers = workers
+        self.shards = shards or workers
+        self.version: int | None = None
+        self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self._columns: SharedColumns | None = None
+        # The block searched before the last publish, patched by the next one.
+        self._retired: SharedColumns | None = None
+        # Blocks dropped while searches were still reading them, unlinked once they finish.
+        self._draining: list[SharedColumns] = []
+        # Rows the retired block is missing, or None if it cannot be patched.
+        self._stale: NDArray[np.intp] | None = None
+        atexit.register(self.close)
+
+    def publish(
+        self,
+        engine: ColumnarInventory,
+        order: NDArray[Any],
+        version: int,
+        changed: Iterable[int] | None = None,
+    ) -> None:
+        """Make `engine` at `version` the inventory searched from now on.
+
+        `changed` lists the rows changed since the last publish; without it
+        the columns are copied in full.
+        """
+        if version == self.version and self._columns is not None:
+            return
+        rows = None if changed is None else np.fromiter(changed, dtype=np.intp)
+        spare = self._retired
+        if (
+            spare is not None
+            and not spare.searches
+            and rows is not None
+            and self._stale is not None
+            and spare.patch(engine, order, np.union1d(self._stale, rows))
+        ):
+            columns = spare
+        else:
+            if spare is not None:
+                self._drop(spare)
+            columns = SharedColumns(engine, order)
+        self._retired, self._columns = self._columns, columns
+        self._stale = rows
+        self.version = version
+
+    async def search(self, filters: CarFilters) -> list[int]:
+        """Rows matching `filters` in result order, evaluated one shard per task."""
+        columns = self._columns
+        if columns is None:
+            raise RuntimeError("No inventory published to the search executor")
+        layout = columns.layout
+        bounds = np.linspace(0, columns.rows, self.shards + 1).astype(int).tolist()
+        loop = asyncio.get_running_loop()
+        columns.searches += 1
+        try:
+            parts = await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._pool, _search_shard, layout, filters, start, stop)
+                    for start, stop in zip(bounds, bounds[1:])
+                    if stop > start
+                )
+            )
+        finally:
+            columns.searches -= 1
+            if not columns.searches and columns in self._draining:
+                self._draining.remove(columns)
+                columns.close()
+        if not parts:
+            return []
+        matches: list[int] = np.concatenate(parts).tolist()
+        return matches
+
+    def _drop(self, columns: SharedColumns) -> None:
+        if columns.searches:
+            self._draining.append(columns)
+        else:
+            columns.close()
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+        for columns in (self._columns, self._retired, *self._draining):
+            if columns is not None:
+                columns.close()
+        self._columns = self._retired = None
+        self._draining = []
+        atexit.unregister(self.close)
+
+
+def _aligned(nbytes: int) -> int:
+    return -(-nbytes // _ALIGNMENT) * _ALIGNMENT
+
+
+# Per worker process: the blocks attached, least recently used first, and the engine
+# over the last layout.
+_memory: dict[str, SharedMemory] = {}
+_attached: tuple[int, ColumnarInventory, NDArray[np.int64]] | None = None
+
+
+def _attach(layout: dict[str, Any]) -> tuple[ColumnarInventory, NDArray[np.int64]]:
+    global _attached
+    if _attached is not None and _attached[0] == layout["generation"]:
+        return _attached[1], _attached[2]
+    # Drop the arrays over the old layout before unmapping any block.
+    _attached = None
+    memory = _memory.pop(layout["name"], None)
+    if memory is None:
+        # Keep only the last block used; one still being searched is attached again.
+        for name in list(_memory)[:-1]:
+            _memory.pop(name).close()
+        # Spawned workers share the parent's resource tracker, so attaching does not
+        # hand ownership of the block to this process.
+        memory = SharedMemory(name=layout["name"])
+    _memory[layout["name"]] = memory
+
+    def column(name: str) -> NDArray[Any]:
+        offset, dtype, length = layout["columns"][name]
+        return np.ndarray((length,), np.dtype(dtype), buffer=memory.buf, offset=offset)
+
+    numeric = {
+        name.removeprefix("numeric:"): column(name)
+        for name in layout["columns"]
+        if name.startswith("numeric:")
+    }
+    categorical = {
+        key: DictionaryColumn(values, column(f"codes:{key}"))
+        for key, values in layout["values"].items()
+    }
+    features = SubstringColumn(
+        column("features:text").data, column("features:starts"), column("features:codes")
+    )
+    order = column("order")
+    engine = ColumnarInventory(numeric, categorical, features, order)
+    _attached = (layout["generation"], engine, order)
+    return engine, order
+
+
+def _search_shard(
+    layout: dict[str, Any], filters: CarFilters, start: int, stop: int
+) -> NDArray[np.int64]:
+    engine, order = _attach(layout)
+    rows = order[start:stop]
+    matches: NDArray[np.int64] = rows[engine.mask(filters, rows)]
+    return matches
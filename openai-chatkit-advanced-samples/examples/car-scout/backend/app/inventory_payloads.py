@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterable
+
+import orjson
+
+if TYPE_CHECKING:
+    from .car_inventory import CarRecord
+
+
+class PayloadCache:
+    """Car payloads serialized to JSON bytes once per field projection.
+
+    Like `FilterResultCache`, entries belong to one inventory version: `patch`
+    carries them over to the next version minus the cars that changed,
+    otherwise the first lookup with a newer version drops everything.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple[str, ...] | None, OrderedDict[str, bytes]] = {}
+
+    def get(self, car: CarRecord, fields: tuple[str, ...] | None, version: int) -> bytes:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        entries = self._entries.setdefault(fields, OrderedDict())
+        payload = entries.get(car.id)
+        if payload is not None:
+            entries.move_to_end(car.id)
+            self.hits += 1
+            return payload
+        self.misses += 1
+        payload = orjson.dumps(car.to_payload(fields))
+        entries[car.id] = payload
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return payload
+
+    def patch(self, version: int, new_version: int, car_ids: Iterable[str]) -> None:
+        """Carry entries rendered at `version` over to `new_version`, dropping `car_ids`."""
+        if version == self.version:
+            for car_id in car_ids:
+                for entries in self._entries.values():
+                    entries.pop(car_id, None)
+        else:
+            self._entries.clear()
+        self.version = new_version
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "projections": len(self._entries),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Sequence, overload
+
+if TYPE_CHECKING:
+    from .car_inventory import CarRecord, CarSearchProfile
+
+
+class MatchSet(Sequence[str]):
+    """Car ids of one search result, held as 4-byte row numbers in result order.
+
+    Ids are read from the shared inventory on access; rows are never reused,
+    so a row keeps naming the same car even after it is removed.
+    """
+
+    __slots__ = ("rows", "_inventory")
+
+    def __init__(self, rows: Iterable[int], inventory: Sequence[CarRecord]) -> None:
+        self.rows = rows if isinstance(rows, array) else array("i", rows)
+        self._inventory = inventory
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self._inventory[row].id for row in self.rows[index]]
+        return self._inventory[self.rows[index]].id
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._inventory[row].id for row in self.rows)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MatchSet):
+            return self.rows == other.rows
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.rows)
+
+
+class ProfileStore:
+    """Thread search profiles, bounded by count and by idle time.
+
+    The least recently read profile is evicted once `max_entries` is reached,
+    and a profile not read for `ttl_seconds` expires. A thread whose profile
+    is gone simply starts over from the full inventory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float | None = 6 * 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self.expirations = 0
+        self._clock = clock
+        # Least recently read first, with the time each profile was last read.
+        self._entries: OrderedDict[str, tuple[float, CarSearchProfile]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, thread_id: str) -> CarSearchProfile | None:
+        now = self._clock()
+        self._expire(now)
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+        self._entries[thread_id] = (now, entry[1])
+        self._entries.move_to_end(thread_id)
+        return entry[1]
+
+    def put(self, thread_id: str, profile: CarSearchProfile) -> None:
+        now = self._clock()
+        self._expire(now)
+        self._entries[thread_id] = (now, profile)
+        self._entries.move_to_end(thread_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        # Entries are in last-read order, so the expired ones are all at the front.
+        while self._entries:
+            thread_id, (seen, _) = next(iter(self._entries.items()))
+            if now - seen < self.ttl_seconds:
+                break
+            del self._entries[thread_id]
+            self.expirations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Counters plus an estimate of the memory held by the profiles themselves.
+
+        Match sets shared with the result cache or with other profiles are
+        counted once, and "all cars" profiles hold no match set of their own.
+        """
+        self._expire(self._clock())
+        match_sets: dict[int, MatchSet] = {}
+        resident = sys.getsizeof(self._entries)
+        for _, profile in self._entries.values():
+            resident += sys.getsizeof(profile) + sys.getsizeof(profile.filters)
+            if isinstance(profile.match_ids, MatchSet):
+                match_sets[id(profile.match_ids)] = profile.match_ids
+        resident += sum(match_set.nbytes for match_set in match_sets.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "match_sets": len(match_sets),
+            "resident_bytes": resident,
+        }
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Mapping, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    from .car_inventory import CarRecord
+
+# Columns of the vector matrix: the terms found in the most listings.
+MAX_TERMS = 256
+
+STOP_WORDS = frozenset(
+    "a all an and at by for from has have in into is it its of on or our plus "
+    "that the this to with you your".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-&][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def listing_texts(car: CarRecord) -> tuple[str, ...]:
+    """The free text of a listing that similarity is measured on."""
+    return (car.trim, car.description, *car.features)
+
+
+def _occurrences(
+    cars: Iterable[CarRecord],
+) -> tuple[NDArray[np.int64], NDArray[np.int64], list[str]]:
+    """Every word of every listing: which car (by position) it is in, its word id, and the words.
+
+    Listings share most of their text, so each distinct string is tokenized
+    once and the per-car expansion is done with array operations.
+    """
+    cars = list(cars)
+    text_ids: defaultdict[str, int] = defaultdict(lambda: len(text_ids))
+    texts = np.fromiter(
+        map(text_ids.__getitem__, chain.from_iterable(map(listing_texts, cars))), dtype=np.int64
+    )
+    per_car = np.fromiter((len(car.features) + 2 for car in cars), dtype=np.int64, count=len(cars))
+    return _text_occurrences(np.repeat(np.arange(len(cars)), per_car), texts, list(text_ids))
+
+
+def _text_occurrences(
+    owners: NDArray[np.int64], texts: NDArray[np.int64], strings: Sequence[str]
+) -> tuple[NDArray[np.int64], NDArray[np.int64], list[str]]:
+    """`_occurrences` for texts given as `strings[texts[i]]` of car `owners[i]`."""
+    word_ids: defaultdict[str, int] = defaultdict(lambda: len(word_ids))
+    tokenized = [[word_ids[word] for word in tokenize(text)] for text in strings]
+    lengths = np.fromiter(map(len, tokenized), dtype=np.int64, count=len(tokenized))
+    words = np.fromiter(chain.from_iterable(tokenized), dtype=np.int64, count=int(lengths.sum()))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # Expand each (car, text) pair into that text's words.
+    spans = lengths[texts]
+    offsets = np.repeat(starts[texts] - np.cumsum(spans) + spans, spans)
+    occurrences = words[offsets + np.arange(len(offsets))]
+    return np.repeat(owners, spans), occurrences, list(word_ids)
+
+
+class TextVectors:
+    """TF-IDF vectors of every listing's trim, description and features, one row per car.
+
+    The vocabulary and IDF weights are fitted when the matrix is built; cars
+    added later are vectorized with the same ones. Rows are L2-normalized, so
+    a matrix-vector product against a normalized query gives cosine
+    similarities for a whole candidate set in one call.
+    """
+
+    def __init__(self, terms: Sequence[str], idf: NDArray[np.float32]) -> None:
+        self.terms = list(terms)
+        self._columns = {term: column for column, term in enumerate(self.terms)}
+        self._idf = idf
+        self._matrix = np.zeros((0, len(self.terms)), dtype=np.float32)
+        self._size = 0
+
+    @classmethod
+    def from_records(cls, cars: Sequence[CarRecord], max_terms: int = MAX_TERMS) -> TextVectors:
+        return cls._fit(*_occurrences(cars), len(cars), max_terms)
+
+    @classmethod
+    def from_texts(
+        cls,
+        owners: NDArray[np.int64],
+        texts: NDArray[np.int64],
+        strings: Sequence[str],
+        size: int,
+        max_terms: int = MAX_TERMS,
+    ) -> TextVectors:
+        """Vectors of `size` cars whose listing texts are `strings[texts[i]]` of car `owners[i]`.
+
+        Lets a snapshot fit the vectors from its string references without
+        building a record per car.
+        """
+        return cls._fit(*_text_occurrences(owners, texts, strings), size, max_terms)
+
+    @classmethod
+    def _fit(
+        cls,
+        owners: NDArray[np.int64],
+        words: NDArray[np.int64],
+        vocabulary: list[str],
+        size: int,
+        max_terms: int,
+    ) -> TextVectors:
+        # One entry per (car, word) with its count; the word is the key modulo the vocabulary.
+        keys, counts = np.unique(owners * len(vocabulary) + words, return_counts=True)
+        frequency = np.bincount(keys % len(vocabulary), minlength=len(vocabulary))
+        # Most frequent first, ties alphabetical, so the columns do not depend on feed order.
+        alphabetical = np.argsort(np.argsort(np.array(vocabulary, dtype=object)))
+        chosen = np.lexsort((alphabetical, -frequency))[:max_terms]
+        idf = np.log((1 + size) / (1 + frequency[chosen])) + 1
+        vectors = cls([vocabulary[word] for word in chosen], idf.astype(np.float32))
+        columns = np.full(len(vocabulary), -1, dtype=np.int64)
+        columns[chosen] = np.arange(len(chosen))
+        vectors._grow(size)
+        vectors._write(keys // len(vocabulary), columns[keys % len(vocabulary)], counts)
+        vectors._normalize(slice(0, size))
+        return vectors
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix[: self._size].nbytes
+
+    def apply(self, changes: Mapping[int, CarRecord | None]) -> None:
+        """Write the rows of added or changed cars; a removed car's row is zeroed."""
+        if not changes:
+            return
+        self._grow(max(self._size, max(changes) + 1))
+        rows = np.fromiter(changes, dtype=np.int64, count=len(changes))
+        self._matrix[rows] = 0
+        cars = [(row, car) for row, car in changes.items() if car is not None]
+        if not cars:
+            return
+        owners, words, vocabulary = _occurrences(car for _, car in cars)
+        known = np.array([self._columns.get(word, -1) for word in vocabulary], dtype=np.int64)
+        width = len(self.terms) + 1
+        keys, counts = np.unique(owners * width + known[words] + 1, return_counts=True)
+        targets = np.array([row for row, _ in cars], dtype=np.int64)
+        self._write(targets[keys // width], keys % width - 1, counts)
+        self._normalize(targets)
+
+    def _grow(self, size: int) -> None:
+        if size > len(self._matrix):
+            # Grown geometrically, so a stream of small deltas stays amortized O(1) per row.
+            grown = np.zeros((max(size, len(self._matrix) * 5 // 4), len(self.terms)), np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+        self._size = max(self._size, size)
+
+    def _write(
+        self, rows: NDArray[np.int64], columns: NDArray[np.int64], counts: NDArray[np.int64]
+    ) -> None:
+        # Words outside the vocabulary have column -1 and are dropped.
+        known = columns >= 0
+        rows, columns = rows[known], columns[known]
+        self._matrix[rows, columns] = counts[known] * self._idf[columns]
+
+    def _normalize(self, rows: slice | NDArray[np.int64]) -> None:
+        block = self._matrix[rows]
+        norms = np.sqrt(np.einsum("ij,ij->i", block, block))[:, None]
+        block /= np.where(norms > 0, norms, 1)
+        if not isinstance(rows, slice):
+            self._matrix[rows] = block
+
+    def query(self, row: int | None = None, text: str | None = None) -> NDArray[np.float32]:
+        """Normalized query vector for a car's row, a free-text description, or both."""
+        vector = np.zeros(len(self.terms), dtype=np.float32)
+        if text:
+            for word in tokenize(text):
+                if word in self._columns:
+                    vector[self._columns[word]] += 1
+            vector *= self._idf
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        if row is not None:
+            vector += self._matrix[row]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def top_k(
+        self, query: NDArray[np.float32], rows: Iterable[int], k: int, exclude: int | None = None
+    ) -> list[tuple[int, float]]:
+        """The `k` rows most similar to `query`, best first, with their cosine similarity.
+
+        Rows with no term in common with the query are never returned, and
+        ties keep the order `rows` came in.
+        """
+        candidates = np.fromiter(rows, dtype=np.int64)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if k <= 0 or not len(candidates) or not query.any():
+            return []
+        if len(candidates) * 2 > self._size:
+            # Scoring every row beats gathering most of the matrix into a copy.
+            scores = (self._matrix[: self._size] @ query)[candidates]
+        else:
+            scores = self._matrix[candidates] @ query
+        if k < len(scores):
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = np.flatnonzero(scores >= kth)
+            candidates, scores = candidates[keep], scores[keep]
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in best if scores[i] > 0]
@@ -0,0 +1,488 @@
+"""Compact binary inventory snapshots that load by memory-mapping.
+
+A snapshot stores the feed column by column: fixed-width numeric columns,
+every distinct string once in a string table addressed by offsets, and the
+dictionary-encoded search columns the NumPy engine evaluates directly. Many
+worker processes mapping the same file share it through the page cache, and
+`CarRecord`s are only built for the rows a request actually touches.
+
+Compile a JSON feed with:
+
+    python -m app.inventory_snapshot app/data/cars.json app/data/cars.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, MutableMapping, Sequence, TypeVar, overload
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .car_inventory import CarRecord, load_records
+from .inventory_columnar import (
+    NO_RANGE,
+    NUMERIC_COLUMNS,
+    ColumnarInventory,
+    DictionaryColumn,
+    SubstringColumn,
+)
+from .inventory_index import CATEGORICAL_FILTERS, RANGE_COLUMNS
+from .inventory_similarity import TextVectors
+
+MAGIC = b"CARSNAP1"
+_PREFIX = struct.Struct("<8sQ")
+_ALIGNMENT = 8
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+STRING_FIELDS = (
+    "id",
+    "make",
+    "model",
+    "trim",
+    "body_style",
+    "drivetrain",
+    "fuel_type",
+    "color",
+    "location",
+    "description",
+    "listing_url",
+    "image_url",
+)
+
+
+def is_snapshot(path: Path) -> bool:
+    with path.open("rb") as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self._refs: dict[str, int] = {}
+        self._encoded: list[bytes] = []
+
+    def ref(self, value: str) -> int:
+        ref = self._refs.get(value)
+        if ref is None:
+            ref = len(self._encoded)
+            self._refs[value] = ref
+            self._encoded.append(value.encode("utf-8"))
+        return ref
+
+    def refs(self, values: Sequence[str]) -> NDArray[np.uint32]:
+        return np.fromiter((self.ref(value) for value in values), np.uint32, len(values))
+
+    def encoded(self, ref: int) -> bytes:
+        return self._encoded[ref]
+
+    def columns(self) -> dict[str, NDArray[Any]]:
+        offsets = np.zeros(len(self._encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in self._encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(self._encoded), dtype=np.uint8)
+        return {"string_offsets": offsets, "strings": blob}
+
+
+def compile_snapshot(cars: Iterable[CarRecord], output_path: Path) -> None:
+    """Write `cars` as a snapshot, reading them once and keeping only their columns."""
+    strings = _StringTable()
+    refs = {name: array("I") for name in STRING_FIELDS}
+    feature_offsets = array("Q", [0])
+    feature_refs = array("I")
+    numeric = {name: array("q") for name in NUMERIC_COLUMNS}
+    categorical = {key: DictionaryColumn([], np.empty(0, np.int32)) for key in CATEGORICAL_FILTERS}
+    codes = {key: array("i") for key in CATEGORICAL_FILTERS}
+    features = DictionaryColumn([], np.empty(0, np.int32))
+    feature_codes = array("i")
+    for car in cars:
+        for name in STRING_FIELDS:
+            refs[name].append(strings.ref(getattr(car, name)))
+        feature_refs.extend(strings.ref(feature) for feature in car.features)
+        feature_offsets.append(len(feature_refs))
+        for name in RANGE_COLUMNS:
+            numeric[name].append(getattr(car, name))
+        numeric["range_miles"].append(NO_RANGE if car.range_miles is None else car.range_miles)
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            codes[key].append(categorical[key].code(getattr(car, attribute).lower()))
+        feature_codes.append(features.code(" ".join(car.features).lower()))
+
+    columns: dict[str, NDArray[Any]] = {
+        name: np.asarray(values, dtype=np.uint32) for name, values in refs.items()
+    }
+    columns["feature_offsets"] = np.asarray(feature_offsets, dtype=np.uint64)
+    columns["feature_refs"] = np.asarray(feature_refs, dtype=np.uint32)
+    # UTF-8 sorts in code point order, so this is the order of the ids as strings.
+    ids = refs["id"]
+    columns["id_order"] = np.asarray(
+        sorted(range(len(ids)), key=lambda row: strings.encoded(ids[row])), dtype=np.int64
+    )
+
+    # Persist exactly what the columnar engine searches, so loading builds nothing per row.
+    for key, column in categorical.items():
+        column.codes = np.asarray(codes[key], dtype=np.int32)
+    features.codes = np.asarray(feature_codes, dtype=np.int32)
+    engine = ColumnarInventory(
+        {name: np.asarray(values, dtype=np.int64) for name, values in numeric.items()},
+        categorical,
+        SubstringColumn.from_dictionary(features),
+    )
+    for name, values in engine.numeric.items():
+        columns[name] = values
+    columns["order"] = engine.order.astype(np.int64)
+    for key, column in engine.categorical.items():
+        columns[f"{key}_codes"] = column.codes
+        columns[f"{key}_values"] = strings.refs(column.values)
+    columns["features_codes"] = engine.features.codes
+    columns["features_starts"] = engine.features.starts
+    columns["features_text"] = np.frombuffer(engine.features.text, dtype=np.uint8)
+    columns.update(strings.columns())
+
+    directory: dict[str, dict[str, Any]] = {}
+    offset = 0
+    for name, values in columns.items():
+        directory[name] = {"dtype": values.dtype.str, "offset": offset, "length": len(values)}
+        offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps({"rows": len(ids), "columns": directory}).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGNMENT)
+
+    with output_path.open("wb") as handle:
+        handle.write(_PREFIX.pack(MAGIC, len(header)))
+        handle.write(header)
+        for values in columns.values():
+            data = np.ascontiguousarray(values).tobytes()
+            handle.write(data)
+            handle.write(bytes(-len(data) % _ALIGNMENT))
+
+
+class InventorySnapshot(Sequence[CarRecord]):
+    """Read-only, memory-mapped view of a compiled snapshot.
+
+    Indexing builds the `CarRecord` for that row on demand; recently built
+    records are kept in a small LRU cache.
+    """
+
+    def __init__(self, path: Path, record_cache_size: int = 4096) -> None:
+        with path.open("rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_size = _PREFIX.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a car inventory snapshot")
+        header = json.loads(bytes(self._mmap[_PREFIX.size : _PREFIX.size + header_size]))
+        base = _PREFIX.size + header_size
+        self._size: int = header["rows"]
+        self._columns = {
+            name: np.frombuffer(
+                self._mmap,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["length"],
+                offset=base + spec["offset"],
+            )
+            for name, spec in header["columns"].items()
+        }
+        self._bytes = {
+            name: memoryview(self._mmap)[base + spec["offset"] :][: spec["length"]]
+            for name, spec in header["columns"].items()
+            if spec["dtype"] == "|u1"
+        }
+        self._strings = self._bytes["strings"]
+        self._string_offsets = self._columns["string_offsets"]
+        self._record = lru_cache(maxsize=record_cache_size)(self._build_record)
+        self.ids = _IdColumn(self)
+        self.rows_by_id = _RowsById(self)
+        self.records_by_id = _RecordsById(self)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @overload
+    def __getitem__(self, index: int) -> CarRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[CarRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> CarRecord | list[CarRecord]:
+        if isinstance(index, slice):
+            return [self._record(row) for row in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("snapshot row out of range")
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[CarRecord]:
+        for row in range(self._size):
+            yield self._record(row)
+
+    def string(self, ref: int) -> str:
+        start, stop = self._string_offsets[ref], self._string_offsets[ref + 1]
+        return str(self._strings[start:stop], "utf-8")
+
+    def field(self, name: str, row: int) -> str:
+        return self.string(int(self._columns[name][row]))
+
+    def column(self, name: str) -> NDArray[Any]:
+        return self._columns[name]
+
+    def value_counts(self) -> dict[str, Counter[str]]:
+        """Cars per make, body style, ..., location and feature, as spelled in the feed.
+
+        Counted over the string references, so no record is built.
+        """
+        counts = {
+            key: self._reference_counts(self._columns[attribute])
+            for key, attribute in CATEGORICAL_FILTERS.items()
+        }
+        counts["must_have_features"] = self._reference_counts(self._columns["feature_refs"])
+        return counts
+
+    def _reference_counts(self, refs: NDArray[np.uint32]) -> Counter[str]:
+        found, totals = np.unique(refs, return_counts=True)
+        return Counter({self.string(int(ref)): int(total) for ref, total in zip(found, totals)})
+
+    def columnar(self) -> ColumnarInventory:
+        """The NumPy engine over the mapped columns, without copying them."""
+
+        def dictionary(key: str) -> DictionaryColumn:
+            values = [self.string(int(ref)) for ref in self._columns[f"{key}_values"]]
+            return DictionaryColumn(values, self._columns[f"{key}_codes"])
+
+        return ColumnarInventory(
+            {column: self._columns[column] for column in NUMERIC_COLUMNS},
+            {key: dictionary(key) for key in CATEGORICAL_FILTERS},
+            SubstringColumn(
+                self._bytes["features_text"],
+                self._columns["features_starts"],
+                self._columns["features_codes"],
+            ),
+            self._columns["order"],
+        )
+
+    def text_vectors(self) -> TextVectors:
+        """TF-IDF vectors of the listings, fitted from the string references.
+
+        Each distinct trim, description and feature is decoded and tokenized
+        once, and no record is built.
+        """
+        columns = self._columns
+        rows = np.arange(self._size, dtype=np.int64)
+        features = np.diff(columns["feature_offsets"]).astype(np.int64)
+        owners = np.concatenate((rows, rows, np.repeat(rows, features)))
+        refs = np.concatenate((columns["trim"], columns["description"], columns["feature_refs"]))
+        used, texts = np.unique(refs, return_inverse=True)
+        strings = [self.string(int(ref)) for ref in used]
+        return TextVectors.from_texts(owners, texts.astype(np.int64), strings, self._size)
+
+    def _build_record(self, row: int) -> CarRecord:
+        columns = self._columns
+        start, stop = columns["feature_offsets"][row], columns["feature_offsets"][row + 1]
+        range_miles = int(columns["range_miles"][row])
+        return CarRecord(
+            **{name: self.field(name, row) for name in STRING_FIELDS},
+            year=int(columns["year"][row]),
+            price=int(columns["price"][row]),
+            mileage=int(columns["mileage"][row]),
+            seats=int(columns["seats"][row]),
+            range_miles=None if range_miles == NO_RANGE else range_miles,
+            features=tuple(self.string(int(ref)) for ref in columns["feature_refs"][start:stop]),
+        )
+
+
+class _IdColumn(Sequence[str]):
+    def __init__(self, snapshot: InventorySnapshot) -> None:
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self._snapshot.field("id", row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("snapshot row out of range")
+        return self._snapshot.field("id", index)
+
+
+class _SortedIds(Sequence[str]):
+    """Ids in sorted order, decoded on access so lookups can bisect the file directly."""
+
+    def __init__(self, snapshot: InventorySnapshot) -> None:
+        self._snapshot = snapshot
+        self.order = snapshot.column("id_order")
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        return self._snapshot.field("id", int(self.order[index]))
+
+
+class _RowsById(Mapping[str, int]):
+    def __init__(self, snapshot: InventorySnapshot) -> None:
+        self._snapshot = snapshot
+        self._sorted_ids = _SortedIds(snapshot)
+
+    def __getitem__(self, car_id: str) -> int:
+        position = bisect_left(self._sorted_ids, car_id)
+        if position == len(self._sorted_ids) or self._sorted_ids[position] != car_id:
+            raise KeyError(car_id)
+        return int(self._sorted_ids.order[position])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.ids)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+
+class _RecordsById(Mapping[str, CarRecord]):
+    def __init__(self, snapshot: InventorySnapshot) -> None:
+        self._snapshot = snapshot
+
+    def __getitem__(self, car_id: str) -> CarRecord:
+        return self._snapshot[self._snapshot.rows_by_id[car_id]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.ids)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+
+class RowOverlay(Sequence[CarRecord]):
+    """Writable rows over a read-only snapshot; changed and appended rows stay in memory."""
+
+    def __init__(self, base: Sequence[CarRecord]) -> None:
+        self._base = base
+        self._changed: dict[int, CarRecord] = {}
+        self._appended: list[CarRecord] = []
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._appended)
+
+    @overload
+    def __getitem__(self, index: int) -> CarRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[CarRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> CarRecord | list[CarRecord]:
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= len(self._base):
+            return self._appended[index - len(self._base)]
+        car = self._changed.get(index)
+        return self._base[index] if car is None else car
+
+    def __iter__(self) -> Iterator[CarRecord]:
+        # Streams the base in one pass rather than building each row by index.
+        for row, car in enumerate(self._base):
+            yield self._changed.get(row, car)
+        yield from self._appended
+
+    def __setitem__(self, index: int, car: CarRecord) -> None:
+        if index < 0:
+            index += len(self)
+        if index >= len(self._base):
+            self._appended[index - len(self._base)] = car
+        elif 0 <= index:
+            self._changed[index] = car
+        else:
+            raise IndexError("snapshot row out of range")
+
+    def append(self, car: CarRecord) -> None:
+        self._appended.append(car)
+
+    def changes(self) -> dict[int, CarRecord]:
+        """Every row changed or appended since the base was loaded."""
+        appended = enumerate(self._appended, len(self._base))
+        return {**self._changed, **dict(appended)}
+
+
+class MappingOverlay(MutableMapping[K, V]):
+    """Writable mapping over a read-only snapshot mapping.
+
+    Iteration keeps the snapshot's order, with keys added later at the end.
+    """
+
+    def __init__(self, base: Mapping[K, V]) -> None:
+        self._base = base
+        self._changed: dict[K, V] = {}
+        self._added: dict[K, V] = {}
+        self._removed: set[K] = set()
+
+    def _in_base(self, key: K) -> bool:
+        return key not in self._removed and key in self._base
+
+    def __getitem__(self, key: K) -> V:
+        if key in self._added:
+            return self._added[key]
+        if key in self._removed:
+            raise KeyError(key)
+        if key in self._changed:
+            return self._changed[key]
+        return self._base[key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        if key not in self._added and self._in_base(key):
+            self._changed[key] = value
+        else:
+            self._added[key] = value
+
+    def __delitem__(self, key: K) -> None:
+        if key in self._added:
+            del self._added[key]
+        elif self._in_base(key):
+            self._removed.add(key)
+            self._changed.pop(key, None)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[K]:
+        for key in self._base:
+            if key not in self._removed:
+                yield key
+        yield from self._added
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._removed) + len(self._added)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a JSON car feed into a snapshot.")
+    parser.add_argument("source", type=Path, help="JSON feed, e.g. app/data/cars.json")
+    parser.add_argument("output", type=Path, help="Snapshot file to write")
+    args = parser.parse_args()
+    cars = load_records(args.source)
+    compile_snapshot(cars, args.output)
+    print(f"Wrote {len(cars)} cars to {args.output} ({args.output.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""SQLite inventory databases, searched in SQL so the feed never has to fit in memory.
+
+The `cars` table holds every listing plus lowercased copies of the
+filterable columns. Covering indexes answer range filters in result order,
+and an FTS5 trigram table answers the substring lookups of feature filters
+(descriptions are indexed the same way). Every worker process opens the
+file read-only and shares it through the page cache; feed deltas stay in
+memory on top of it, as with snapshots.
+
+Compile a JSON feed with:
+
+    python -m app.inventory_sqlite app/data/cars.json app/data/cars.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import heapq
+import json
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping, Sequence, TypeVar, overload
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .car_inventory import CarFilters, CarRecord, FilterConstraint, load_records
+from .inventory_columnar import NO_RANGE, NUMERIC_COLUMNS
+from .inventory_geo import UNKNOWN_DISTANCE, Coordinates, PlaceIndex, distance_rank
+from .inventory_index import (
+    CATEGORICAL_FILTERS,
+    HISTOGRAM_EDGES,
+    VALUE_MILES_PER_POUND,
+    VALUE_PER_MODEL_YEAR,
+    CategoricalCounts,
+    histogram_bucket,
+    rank_value,
+)
+
+MAGIC = b"SQLite format 3\x00"
+
+T = TypeVar("T")
+
+RECORD_COLUMNS = (
+    "id",
+    "make",
+    "model",
+    "trim",
+    "year",
+    "price",
+    "mileage",
+    "body_style",
+    "drivetrain",
+    "fuel_type",
+    "seats",
+    "range_miles",
+    "color",
+    "location",
+    "description",
+    "features",
+    "listing_url",
+    "image_url",
+)
+
+# Lowercased copy of each categorical column, which filters compare against.
+KEY_COLUMNS = {key: f"{attribute}_key" for key, attribute in CATEGORICAL_FILTERS.items()}
+
+SCHEMA = f"""
+CREATE TABLE cars (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    trim TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    mileage INTEGER NOT NULL,
+    body_style TEXT NOT NULL,
+    drivetrain TEXT NOT NULL,
+    fuel_type TEXT NOT NULL,
+    seats INTEGER NOT NULL,
+    range_miles INTEGER,
+    color TEXT NOT NULL,
+    location TEXT NOT NULL,
+    description TEXT NOT NULL,
+    -- JSON array, as in the feed.
+    features TEXT NOT NULL,
+    listing_url TEXT NOT NULL,
+    image_url TEXT NOT NULL,
+    {", ".join(f"{column} TEXT NOT NULL" for column in KEY_COLUMNS.values())},
+    -- The features joined by spaces and lowercased, which feature filters search.
+    features_key TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE cars_text USING fts5(
+    description, features_key, content='cars', content_rowid='row', tokenize='trigram'
+);
+"""
+
+# Result order is (price, mileage, row), and the row id ends every index entry, so
+# `cars_by_price` hands back any filter without features already sorted, read from
+# the index alone. The others serve selective bounds on a different column.
+INDEXES = (
+    "CREATE INDEX cars_by_price ON cars (price, mileage, year, seats, "
+    + ", ".join(KEY_COLUMNS.values())
+    + ")",
+    "CREATE INDEX cars_by_mileage ON cars (mileage, price, year, seats)",
+    "CREATE INDEX cars_by_year ON cars (year, price, mileage, seats)",
+    *(
+        f"CREATE INDEX cars_by_{column} ON cars ({column}, price, mileage)"
+        for column in KEY_COLUMNS.values()
+    ),
+)
+
+DEFAULT_SEARCH_THREADS = 4
+
+
+def is_database(path: Path) -> bool:
+    with path.open("rb") as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+def compile_database(cars: Sequence[CarRecord], output_path: Path) -> None:
+    output_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(output_path)
+    try:
+        connection.executescript(SCHEMA)
+        columns = (*RECORD_COLUMNS, *KEY_COLUMNS.values(), "features_key")
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        connection.executemany(
+            f"INSERT INTO cars (row, {', '.join(columns)}) VALUES ({placeholders})",
+            (
+                (
+                    row,
+                    *(
+                        json.dumps(car.features) if name == "features" else getattr(car, name)
+                        for name in RECORD_COLUMNS
+                    ),
+                    *(
+                        getattr(car, attribute).lower()
+                        for attribute in CATEGORICAL_FILTERS.values()
+                    ),
+                    " ".join(car.features).lower(),
+                )
+                for row, car in enumerate(cars)
+            ),
+        )
+        connection.execute(
+            "INSERT INTO cars_text (rowid, description, features_key) "
+            "SELECT row, description, features_key FROM cars"
+        )
+        for statement in INDEXES:
+            connection.execute(statement)
+        connection.execute("INSERT INTO cars_text (cars_text) VALUES ('optimize')")
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+    # Compact once, so the file carries no free pages from the build.
+    connection = sqlite3.connect(output_path)
+    connection.execute("VACUUM")
+    connection.close()
+
+
+class InventoryDatabase(Sequence[CarRecord]):
+    """Read-only view of a compiled database, one connection per thread.
+
+    Indexing builds the `CarRecord` for that row on demand; recently built
+    records are kept in a small LRU cache.
+    """
+
+    def __init__(self, path: Path, record_cache_size: int = 4096) -> None:
+        self._uri = f"{path.resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._size: int = self.connection().execute("SELECT COUNT(*) FROM cars").fetchone()[0]
+        self._record = lru_cache(maxsize=record_cache_size)(self._build_record)
+        self.ids = _IdColumn(self)
+        self.rows_by_id = _RowsById(self)
+        self.records_by_id = _RecordsById(self)
+
+    def connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @overload
+    def __getitem__(self, index: int) -> CarRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[CarRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> CarRecord | list[CarRecord]:
+        if isinstance(index, slice):
+            return [self._record(row) for row in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("database row out of range")
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[CarRecord]:
+        cursor = self.connection().execute(
+            f"SELECT {', '.join(RECORD_COLUMNS)} FROM cars ORDER BY row"
+        )
+        for values in cursor:
+            yield _record(values)
+
+    def _build_record(self, row: int) -> CarRecord:
+        values = (
+            self.connection()
+            .execute(f"SELECT {', '.join(RECORD_COLUMNS)} FROM cars WHERE row = ?", (row,))
+            .fetchone()
+        )
+        return _record(values)
+
+
+def _record(values: Sequence[Any]) -> CarRecord:
+    fields = dict(zip(RECORD_COLUMNS, values))
+    fields["features"] = tuple(json.loads(fields["features"]))
+    return CarRecord(**fields)
+
+
+class _IdColumn(Sequence[str]):
+    def __init__(self, database: InventoryDatabase) -> None:
+        self._database = database
+
+    def __len__(self) -> int:
+        return len(self._database)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("database row out of range")
+        return self._database[index].id
+
+    def __iter__(self) -> Iterator[str]:
+        cursor = self._database.connection().execute("SELECT id FROM cars ORDER BY row")
+        return (car_id for (car_id,) in cursor)
+
+
+class _RowsById(Mapping[str, int]):
+    def __init__(self, database: InventoryDatabase) -> None:
+        self._database = database
+
+    def __getitem__(self, car_id: str) -> int:
+        found = (
+            self._database.connection()
+            .execute("SELECT row FROM cars WHERE id = ?", (car_id,))
+            .fetchone()
+        )
+        if found is None:
+            raise KeyError(car_id)
+        row: int = found[0]
+        return row
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._database.ids)
+
+    def __len__(self) -> int:
+        return len(self._database)
+
+
+class _RecordsById(Mapping[str, CarRecord]):
+    def __init__(self, database: InventoryDatabase) -> None:
+        self._database = database
+
+    def __getitem__(self, car_id: str) -> CarRecord:
+        return self._database[self._database.rows_by_id[car_id]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._database.ids)
+
+    def __len__(self) -> int:
+        return len(self._database)
+
+
+class SqliteInventory:
+    """Search engine over an `InventoryDatabase`, with the same interface as `ColumnarInventory`.
+
+    Each `CarFilters` becomes one parameterized `WHERE` clause. The database
+    itself is never written, so any number of processes can share the file:
+    rows changed by `apply` are left out of every query, and their current
+    records are matched in Python and merged into the results. `run` calls
+    any of the query methods on a small thread pool, so the event loop never
+    waits on SQLite.
+    """
+
+    def __init__(self, database: InventoryDatabase, threads: int = DEFAULT_SEARCH_THREADS) -> None:
+        self.database = database
+        # Replaced rather than mutated, so a search in flight on the pool sees one version.
+        self._changed: dict[int, CarRecord | None] = {}
+        # Last records of removed rows the database does not hold, for `numeric`.
+        self._removed: dict[int, CarRecord] = {}
+        self._size = len(database)
+        # The serialized rows of `_changed`, which every query leaves out.
+        self._excluded: tuple[Mapping[int, CarRecord | None], str] | None = None
+        locations = database.connection().execute("SELECT DISTINCT location_key FROM cars")
+        self._locations = {location for (location,) in locations}
+        self.places = PlaceIndex(self._locations)
+        self._version = 0
+        self._order: NDArray[np.int64] | None = None
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="car-search")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def apply(self, changes: Mapping[int, CarRecord | None]) -> None:
+        """Record changed rows: a record replaces or appends a row, None removes it."""
+        removed = {
+            row: previous
+            for row, car in changes.items()
+            if car is None and (previous := self._changed.get(row)) is not None
+        }
+        if removed:
+            self._removed = {**self._removed, **removed}
+        self._changed = {**self._changed, **changes}
+        self._size = max(self._size, max(changes, default=-1) + 1)
+        added = {car.location.lower() for car in changes.values() if car is not None}
+        if not added <= self._locations:
+            self._locations = self._locations | added
+            self.places = PlaceIndex(self._locations)
+        self._version += 1
+        self._order = None
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.database.close()
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """Call `function` on the search pool, so the event loop never waits on SQLite."""
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+
+    async def search_async(self, filters: CarFilters) -> list[int]:
+        return await self.run(self.search, filters)
+
+    def search(self, filters: CarFilters, within: Sequence[int] | None = None) -> list[int]:
+        """Matching rows in `(price, mileage)` order.
+
+        `within` is accepted for parity with the other engines, but the
+        indexed query is cheaper than probing a known superset row by row.
+        """
+        changed = self._changed
+        where, params = self._where(filters, changed)
+        cursor = self.database.connection().execute(
+            f"SELECT price, mileage, row FROM cars WHERE {where} ORDER BY price, mileage, row",
+            params,
+        )
+        extra = sorted(
+            (car.price, car.mileage, row)
+            for row, car in changed.items()
+            if car is not None and filters.matches(car)
+        )
+        return [row for _, _, row in heapq.merge(cursor, extra)]
+
+    @property
+    def order(self) -> NDArray[np.int64]:
+        """Every live row in result order."""
+        order = self._order
+        if order is None:
+            version = self._version
+            order = np.asarray(self.search(CarFilters()), dtype=np.int64)
+            # Computed on the pool, so keep it only if no delta landed meanwhile.
+            if version == self._version:
+                self._order = order
+        return order
+
+    def value_counts(self) -> dict[str, Counter[str]]:
+        """Cars per make, body style, ..., location and feature, as spelled in the feed."""
+        changed = self._changed
+        live, params = self._where(CarFilters(), changed)
+        connection = self.database.connection()
+        counts: dict[str, Counter[str]] = {}
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            counts[key] = Counter(
+                dict(
+                    connection.execute(
+                        f"SELECT {attribute}, COUNT(*) FROM cars WHERE {live} GROUP BY {attribute}",
+                        params,
+                    ).fetchall()
+                )
+            )
+        counts["must_have_features"] = Counter(
+            dict(
+                connection.execute(
+                    "SELECT feature.value, COUNT(*) FROM cars, json_each(cars.features) AS feature "
+                    f"WHERE {live} GROUP BY feature.value",
+                    params,
+                ).fetchall()
+            )
+        )
+        for car in changed.values():
+            if car is not None:
+                for key, attribute in CATEGORICAL_FILTERS.items():
+                    counts[key][getattr(car, attribute)] += 1
+                counts["must_have_features"].update(car.features)
+        return counts
+
+    @property
+    def numeric(self) -> dict[str, NDArray[np.int64]]:
+        """The numeric columns by row, with `NO_RANGE` for cars without a range.
+
+        Removed rows keep their last values, as in `ColumnarInventory`.
+        """
+        changed, removed = self._changed, self._removed
+        cursor = self.database.connection().execute(
+            f"SELECT {', '.join(NUMERIC_COLUMNS[:-1])}, COALESCE(range_miles, ?) "
+            "FROM cars ORDER BY row",
+            (NO_RANGE,),
+        )
+        values = np.zeros((len(self), len(NUMERIC_COLUMNS)), dtype=np.int64)
+        values[: len(self.database)] = np.array(cursor.fetchall(), dtype=np.int64).reshape(
+            -1, len(NUMERIC_COLUMNS)
+        )
+        for row, car in changed.items():
+            car = car or removed.get(row)
+            if car is not None:
+                columns = [getattr(car, name) for name in NUMERIC_COLUMNS]
+                values[row] = [NO_RANGE if value is None else value for value in columns]
+        return {name: values[:, index] for index, name in enumerate(NUMERIC_COLUMNS)}
+
+    def facet_counts(
+        self, filters: CarFilters | None
+    ) -> tuple[CategoricalCounts, dict[str, list[int]]]:
+        """Facet and histogram counts over the rows matching `filters` (all rows if None).
+
+        One `GROUP BY` per column; each value's representative is its lowest row.
+        """
+        filters = filters or CarFilters()
+        changed = self._changed
+        where, params = self._where(filters, changed)
+        connection = self.database.connection()
+        extra = [
+            (row, car) for row, car in changed.items() if car is not None and filters.matches(car)
+        ]
+        categorical: CategoricalCounts = {}
+        for key, attribute in CATEGORICAL_FILTERS.items():
+            column = KEY_COLUMNS[key]
+            groups = {
+                value: [first, count]
+                for value, first, count in connection.execute(
+                    f"SELECT {column}, MIN(row), COUNT(*) FROM cars WHERE {where} "
+                    f"GROUP BY {column}",
+                    params,
+                )
+            }
+            for row, car in extra:
+                group = groups.setdefault(getattr(car, attribute).lower(), [row, 0])
+                group[0] = min(group[0], row)
+                group[1] += 1
+            categorical[key] = [(first, count) for first, count in groups.values()]
+        histograms = {}
+        for name, edges in HISTOGRAM_EDGES.items():
+            bucket = " ".join(
+                f"WHEN {name} >= {edge} THEN {index}"
+                for index, edge in reversed(list(enumerate(edges)))
+            )
+            counts = [0] * len(edges)
+            for index, count in connection.execute(
+                f"SELECT CASE {bucket} ELSE 0 END AS bucket, COUNT(*) FROM cars WHERE {where} "
+                "GROUP BY bucket",
+                params,
+            ):
+                counts[index] = count
+            for _, car in extra:
+                counts[histogram_bucket(name, getattr(car, name))] += 1
+            histograms[name] = counts
+        return categorical, histograms
+
+    def relaxation_counts(
+        self, constraints: Sequence[FilterConstraint]
+    ) -> list[tuple[int, int | None]]:
+        """Per constraint, the match count without it and with it widened (if it can be).
+
+        One scan computes every constraint as a 0/1 flag per row; a row
+        failing exactly one counts towards relaxing that one.
+        """
+        if not constraints:
+            return []
+        changed = self._changed
+        flags, params = [], []
+        for constraint in constraints:
+            clause, clause_params = self._where(constraint.only)
+            flags.append(f"({clause})")
+            params += clause_params
+        widened = []
+        for constraint in constraints:
+            if constraint.widened is not None:
+                clause, clause_params = self._where(constraint.widened)
+                widened.append(f"({clause})")
+                params += clause_params
+            else:
+                widened.append("0")
+        live, live_params = self._where(CarFilters(), changed)
+        names = [f"f{index}" for index in range(len(constraints))]
+        passed = " + ".join(names)
+        failed_one = f"({passed}) = {len(constraints) - 1}"
+        totals = [f"SUM(({passed}) = {len(constraints)})"]
+        totals += [f"SUM({name} = 0 AND {failed_one})" for name in names]
+        totals += [
+            f"SUM({name} = 0 AND {failed_one} AND w{index})" for index, name in enumerate(names)
+        ]
+        columns = [f"{flag} AS {name}" for flag, name in zip(flags, names)]
+        columns += [f"{flag} AS w{index}" for index, flag in enumerate(widened)]
+        sql = (
+            f"WITH flags AS (SELECT {', '.join(columns)} FROM cars WHERE {live}) "
+            f"SELECT {', '.join(totals)} FROM flags"
+        )
+        row = self.database.connection().execute(sql, [*params, *live_params]).fetchone()
+        passing = row[0] or 0
+        without = [value or 0 for value in row[1 : len(constraints) + 1]]
+        recovered = [value or 0 for value in row[len(constraints) + 1 :]]
+        for car in changed.values():
+            if car is None:
+                continue
+            failures = [
+                position
+                for position, constraint in enumerate(constraints)
+                if not constraint.only.matches(car)
+            ]
+            if not failures:
+                passing += 1
+            elif len(failures) == 1:
+                culprit = constraints[failures[0]]
+                without[failures[0]] += 1
+                if culprit.widened is not None and culprit.widened.matches(car):
+                    recovered[failures[0]] += 1
+        return [
+            (
+                passing + without[position],
+                None if constraint.widened is None else passing + recovered[position],
+            )
+            for position, constraint in enumerate(constraints)
+        ]
+
+    def top_k(
+        self, filters: CarFilters | None, sort: str, k: int, origin: Coordinates | None = None
+    ) -> list[int]:
+        """The first `k` rows matching `filters` (all rows if None) ranked by `sort`."""
+        if k <= 0:
+            return []
+        filters = filters or CarFilters()
+        changed = self._changed
+        rank, rank_params = self._rank(sort, origin)
+        where, params = self._where(filters, changed)
+        cursor = self.database.connection().execute(
+            f"SELECT {rank} AS rank, price, mileage, row FROM cars WHERE {where} "
+            "ORDER BY rank, price, mileage, row LIMIT ?",
+            [*rank_params, *params, k],
+        )
+        extra = sorted(
+            (rank_value(sort, car, origin), car.price, car.mileage, row)
+            for row, car in changed.items()
+            if car is not None and filters.matches(car)
+        )
+        return [row for *_, row in heapq.merge(cursor, extra)][:k]
+
+    def _rank(self, sort: str, origin: Coordinates | None) -> tuple[str, list[Any]]:
+        """SQL for `inventory_index.rank_value`."""
+        if sort == "cheapest":
+            return "price", []
+        if sort == "newest":
+            return "-year", []
+        if sort == "lowest_mileage":
+            return "mileage", []
+        if sort == "best_range":
+            return "CASE WHEN range_miles IS NULL THEN 1 ELSE -range_miles END", []
+        if sort == "value":
+            # Integer division, like `//` for the non-negative mileages of a feed.
+            return f"price + mileage / {VALUE_MILES_PER_POUND} - {VALUE_PER_MODEL_YEAR} * year", []
+        if sort == "nearest":
+            # One distance per distinct location, looked up by the lowercased location.
+            params: list[Any] = []
+            for location in self._locations:
+                distance = distance_rank(origin, location)
+                if distance != UNKNOWN_DISTANCE:
+                    params += [location, distance]
+            if not params:
+                return str(UNKNOWN_DISTANCE), []
+            cases = " ".join("WHEN ? THEN ?" for _ in params[::2])
+            return f"CASE location_key {cases} ELSE {UNKNOWN_DISTANCE} END", params
+        raise ValueError(f"Unknown sort order {sort!r}")
+
+    def _where(
+        self, filters: CarFilters, changed: Mapping[int, CarRecord | None] | None = None
+    ) -> tuple[str, list[Any]]:
+        """A parameterized `WHERE` clause for `filters`, leaving out the `changed` rows."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        for name, column, operator in (
+            ("price_min", "price", ">="),
+            ("price_max", "price", "<="),
+            ("seats_min", "seats", ">="),
+            ("max_mileage", "mileage", "<="),
+            ("min_year", "year", ">="),
+        ):
+            value = getattr(filters, name)
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        for key, column in KEY_COLUMNS.items():
+            values = getattr(filters, key)
+            if values:
+                wanted = sorted({value.lower() for value in values})
+                clauses.append(f"{column} IN ({', '.join('?' for _ in wanted)})")
+                params += wanted
+        area = filters.area()
+        if area is not None:
+            nearby = sorted(self.places.within(*area))
+            clauses.append(f"location_key IN ({', '.join('?' for _ in nearby)})")
+            params += nearby
+        for feature in sorted({feature.lower() for feature in filters.must_have_features}):
+            if len(feature) >= 3:
+                # Trigram phrases match any substring of three characters or more.
+                clauses.append("row IN (SELECT rowid FROM cars_text WHERE cars_text MATCH ?)")
+                params.append(f'features_key : "{feature.replace(chr(34), chr(34) * 2)}"')
+            elif feature:
+                clauses.append("instr(features_key, ?) > 0")
+                params.append(feature)
+        if changed:
+            excluded = self._excluded
+            if excluded is None or excluded[0] is not changed:
+                excluded = self._excluded = (changed, json.dumps(list(changed)))
+            clauses.append("row NOT IN (SELECT value FROM json_each(?))")
+            params.append(excluded[1])
+        return " AND ".join(clauses) or "1", params
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a JSON car feed into a SQLite database.")
+    parser.add_argument("source", type=Path, help="JSON feed, e.g. app/data/cars.json")
+    parser.add_argument("output", type=Path, help="Database file to write")
+    args = parser.parse_args()
+    cars = load_records(args.source)
+    compile_database(cars, args.output)
+    print(f"Wrote {len(cars)} cars to {args.output} ({args.output.stat().st_size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
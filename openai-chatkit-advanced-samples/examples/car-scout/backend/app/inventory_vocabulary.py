@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from collections import Counter
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping, Sequence
+
+from .inventory_geo import GAZETTEER, PLACE_ALIASES, geocode, normalize_place
+from .inventory_index import CATEGORICAL_FILTERS
+
+if TYPE_CHECKING:
+    from .car_inventory import CarRecord
+
+# Least trigram similarity (Dice coefficient) for a value to be corrected.
+MIN_SIMILARITY = 0.5
+
+# Other names for categorical values; used only when the target is in the inventory.
+VALUE_ALIASES: dict[str, dict[str, str]] = {
+    "body_styles": {
+        "estate": "wagon",
+        "saloon": "sedan",
+        "pickup": "truck",
+        "pickup truck": "truck",
+        "minivan": "van",
+        "mpv": "van",
+        "hatch": "hatchback",
+    },
+    "drivetrains": {
+        "4wd": "4x4",
+        "four wheel drive": "4x4",
+        "all wheel drive": "awd",
+        "front wheel drive": "fwd",
+        "rear wheel drive": "rwd",
+    },
+    "fuel_types": {
+        "petrol": "gasoline",
+        "gas": "gasoline",
+        "ev": "electric",
+        "bev": "electric",
+        "phev": "hybrid",
+        "plug-in hybrid": "hybrid",
+    },
+}
+
+
+def trigrams(term: str) -> set[str]:
+    """Trigrams of `term` padded at both ends, so short words and word edges count."""
+    padded = f"  {term} "
+    return {padded[start : start + 3] for start in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Lowercased terms with a posting list per trigram, for fuzzy and substring lookups.
+
+    `closest` scores only the terms sharing a trigram with the query, so a
+    lookup costs microseconds whatever the vocabulary size. A discarded term
+    keeps its postings but is skipped until it is added again.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()) -> None:
+        self._terms: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+        self._discarded: set[int] = set()
+        for term in terms:
+            self.add(term)
+
+    def __contains__(self, term: object) -> bool:
+        term_id = self._ids.get(term)  # type: ignore[call-overload]
+        return term_id is not None and term_id not in self._discarded
+
+    def add(self, term: str) -> None:
+        if term in self._ids:
+            self._discarded.discard(self._ids[term])
+            return
+        term_id = len(self._terms)
+        self._terms.append(term)
+        self._ids[term] = term_id
+        grams = trigrams(term)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(term_id)
+
+    def discard(self, term: str) -> None:
+        if term in self._ids:
+            self._discarded.add(self._ids[term])
+
+    def closest(self, query: str, threshold: float = MIN_SIMILARITY) -> str | None:
+        """The most similar term at or above `threshold`; ties go to the term added first."""
+        grams = trigrams(query)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        for term_id in self._discarded:
+            shared.pop(term_id, None)
+        best, best_score = None, threshold
+        for term_id, count in sorted(shared.items()):
+            score = 2 * count / (len(grams) + self._sizes[term_id])
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = term_id, score
+        return None if best is None else self._terms[best]
+
+    def contains_substring(self, fragment: str) -> bool:
+        """Whether `fragment` occurs inside any term."""
+        inner = [fragment[start : start + 3] for start in range(len(fragment) - 2)]
+        if not inner:
+            return any(
+                fragment in term
+                for term_id, term in enumerate(self._terms)
+                if term_id not in self._discarded
+            )
+        candidates: set[int] | None = None
+        for gram in inner:
+            posting = set(self._postings.get(gram, ()))
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return False
+        return any(
+            fragment in self._terms[term_id]
+            for term_id in candidates or ()
+            if term_id not in self._discarded
+        )
+
+
+class FilterVocabulary:
+    """Every make, body style, drivetrain, fuel type, location and feature in the inventory.
+
+    `canonicalize` rewrites filter values the inventory does not know to the
+    closest value it does, so a near miss like "Aurora Sprnt" or "heatd seats"
+    still finds cars instead of costing a zero-match turn. Values are counted,
+    so one whose last car is removed is no longer offered as a correction.
+    """
+
+    def __init__(self) -> None:
+        keys = (*CATEGORICAL_FILTERS, "must_have_features")
+        self._indexes = {key: TrigramIndex() for key in keys}
+        # Lowercased value -> the spelling first seen in the feed, per filter.
+        self._display: dict[str, dict[str, str]] = {key: {} for key in keys}
+        self._counts: dict[str, dict[str, int]] = {key: {} for key in keys}
+        # Normalized place name -> lowercased inventory location.
+        self._places_by_name: dict[str, str] = {}
+        self._gazetteer = TrigramIndex([*GAZETTEER, *PLACE_ALIASES])
+
+    @classmethod
+    def from_records(cls, cars: Sequence[CarRecord]) -> FilterVocabulary:
+        counts = {
+            key: Counter(getattr(car, attribute) for car in cars)
+            for key, attribute in CATEGORICAL_FILTERS.items()
+        }
+        counts["must_have_features"] = Counter(chain.from_iterable(car.features for car in cars))
+        return cls.from_counts(counts)
+
+    @classmethod
+    def from_counts(cls, counts: Mapping[str, Mapping[str, int]]) -> FilterVocabulary:
+        """Build from the number of cars per value, keyed like `CarFilters` fields."""
+        vocabulary = cls()
+        # Sorted, so the spelling kept for a value does not depend on feed order.
+        for key, values in counts.items():
+            for value in sorted(values):
+                vocabulary._add(key, value, values[value])
+        return vocabulary
+
+    def add(self, car: CarRecord) -> None:
+        for key, value in _filter_values(car):
+            self._add(key, value)
+
+    def discard(self, car: CarRecord) -> None:
+        for key, value in _filter_values(car):
+            lowered = value.lower()
+            self._counts[key][lowered] -= 1
+            if not self._counts[key][lowered]:
+                self._indexes[key].discard(lowered)
+
+    def _add(self, key: str, value: str, count: int = 1) -> None:
+        lowered = value.lower()
+        current = self._counts[key].get(lowered, 0)
+        if not current:
+            self._indexes[key].add(lowered)
+        self._counts[key][lowered] = current + count
+        self._display[key].setdefault(lowered, value)
+        if key == "locations":
+            self._places_by_name.setdefault(normalize_place(value), lowered)
+
+    def canonicalize(self, update: dict[str, Any]) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+        """`update` with unknown values replaced by their closest known ones, and what changed.
+
+        Values that already match are kept as given. A correction is reported
+        as `{"filter", "value", "corrected_to"}`.
+        """
+        canonical = dict(update)
+        corrections: list[dict[str, Any]] = []
+        for key in (*CATEGORICAL_FILTERS, "must_have_features"):
+            values = update.get(key)
+            if not values:
+                continue
+            items = [values] if isinstance(values, str) else list(values)
+            corrected = []
+            for item in items:
+                replacement = self._correct(key, str(item)) if item else None
+                if replacement is not None:
+                    corrections.append({"filter": key, "value": item, "corrected_to": replacement})
+                corrected.append(item if replacement is None else replacement)
+            canonical[key] = corrected
+        near = update.get("near")
+        if near and geocode(near) is None:
+            place = self._gazetteer.closest(normalize_place(near))
+            if place is not None:
+                replacement = PLACE_ALIASES.get(place, place).title()
+                corrections.append({"filter": "near", "value": near, "corrected_to": replacement})
+                canonical["near"] = replacement
+        return canonical, corrections
+
+    def _correct(self, key: str, value: str) -> str | None:
+        lowered = " ".join(value.lower().split())
+        index, display = self._indexes[key], self._display[key]
+        if key == "must_have_features":
+            # Features match as substrings, and a term may span two phrases.
+            if all(index.contains_substring(word) for word in lowered.split()):
+                return None
+        elif lowered in index:
+            return None
+        alias = VALUE_ALIASES.get(key, {}).get(lowered)
+        if alias is not None and alias in index:
+            return display[alias]
+        if key == "locations":
+            place = self._places_by_name.get(normalize_place(lowered))
+            if place is not None and place in index:
+                return display[place]
+        closest = index.closest(lowered)
+        return None if closest is None else display[closest]
+
+
+def _filter_values(car: CarRecord) -> Iterator[tuple[str, str]]:
+    for key, attribute in CATEGORICAL_FILTERS.items():
+        yield key, getattr(car, attribute)
+    for feature in car.features:
+        yield "must_have_features", feature
@@ -1,31 +1,36 @@
 from __future__ import annotations
 
 import asyncio
+import hmac
+import os
 from typing import Any, AsyncIterator
 
+import orjson
 from agents import RunConfig, Runner
 from agents.model_settings import ModelSettings
 from chatkit.agents import stream_agent_response
 from chatkit.server import ChatKitServer, StreamingResult
 from chatkit.types import Attachment, ThreadMetadata, ThreadStreamEvent, UserMessageItem
-from fastapi import Depends, FastAPI, Query, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.responses import Response, StreamingResponse
 from openai.types.responses import EasyInputMessageParam, ResponseInputContentParam, ResponseInputTextParam
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from starlette.responses import JSONResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
 from .car_agent import CarAgentContext, car_sales_agent, inventory_state
-from .car_inventory import CarInventoryStore
+from .car_inventory import CarInventoryStore, CarRecord
+from .inventory_events import ThreadEventBroker
 from .memory_store import MemoryStore
 from .thread_item_converter import CarScoutThreadItemConverter
 from .title_agent import title_agent
 
 
-def _inventory_context_block(
+async def _inventory_context_block(
     thread_id: str, inventory: CarInventoryStore
 ) -> EasyInputMessageParam:
-    summary = inventory.build_context_block(thread_id)
+    summary = await inventory.build_context_block_async(thread_id)
     return EasyInputMessageParam(
         type="message",
         role="user",
@@ -55,7 +60,7 @@ class CarScoutServer(ChatKitServer[dict[str, Any]]):
         )
         items = list(reversed(items_page.data))
 
-        inventory_item = _inventory_context_block(thread.id, self.inventory)
+        inventory_item = await _inventory_context_block(thread.id, self.inventory)
         agent_input = [inventory_item] + (await self.thread_item_converter.to_agent_input(items))
 
         agent_context = CarAgentContext(
@@ -106,6 +111,11 @@ def _thread_id_or_default(thread_id: str | None) -> str | None:
 
 car_scout_server = CarScoutServer(inventory=inventory_state)
 
+inventory_events = ThreadEventBroker()
+inventory_state.add_listener(inventory_events.publish)
+
+INVENTORY_EVENTS_KEEPALIVE_SECONDS = 15.0
+
 app = FastAPI(title="ChatKit Car Scout API")
 
 app.add_middleware(
@@ -113,6 +123,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -129,12 +140,111 @@ async def chatkit_endpoint(
     return JSONResponse(result)
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/autos/cars")
 async def inventory_snapshot(
     thread_id: str | None = Query(None, description="ChatKit thread identifier"),
+    limit: int | None = Query(None, ge=1, le=500, description="Cars per page"),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    fields: str | None = Query(None, description="Comma-separated car fields to return"),
+    if_none_match: str | None = Header(None),
+) -> Response:
+    try:
+        page = await inventory_state.snapshot_page_async(
+            _thread_id_or_default(thread_id),
+            limit=limit,
+            cursor=cursor,
+            fields=fields.split(",") if fields else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=await inventory_state.render_snapshot_async(page),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@app.get("/autos/cars/events")
+async def inventory_events_stream(
+    request: Request,
+    thread_id: str = Query(..., description="ChatKit thread identifier"),
+) -> StreamingResponse:
+    """Server-sent `inventory` events whenever the thread's matches or filters change."""
+
+    async def stream() -> AsyncIterator[bytes]:
+        with inventory_events.subscribe(thread_id) as changes:
+            yield b": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    change = await asyncio.wait_for(
+                        changes.get(), timeout=INVENTORY_EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield b"event: inventory\ndata: " + orjson.dumps(change) + b"\n\n"
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+class InventoryDelta(BaseModel):
+    """Body of `POST /autos/cars/delta`; strict, so a car with a mistyped field is rejected."""
+
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+    upsert: list[CarRecord] = Field(default_factory=list)
+    remove: list[str] = Field(default_factory=list)
+
+
+@app.post("/autos/cars/delta")
+async def apply_inventory_delta(
+    request: Request,
+    x_admin_token: str | None = Header(None),
 ) -> dict[str, Any]:
-    data = inventory_state.snapshot(_thread_id_or_default(thread_id))
-    return {"inventory": data}
+    """Apply `{"upsert": [car, ...], "remove": [car_id, ...]}` to the live inventory.
+
+    Disabled unless `CAR_INVENTORY_ADMIN_TOKEN` is set, and then only callers
+    sending it as `X-Admin-Token` may write.
+    """
+    admin_token = os.environ.get("CAR_INVENTORY_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Inventory deltas are disabled")
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), admin_token.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        delta = InventoryDelta.model_validate_json(await request.body())
+        return {"inventory": inventory_state.apply_delta(delta.upsert, delta.remove)}
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_context=False, include_input=False)
+        raise HTTPException(status_code=400, detail=errors) from exc
+    except ValueError as exc:
+        # Well-formed cars whose values the inventory cannot hold.
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+@app.get("/autos/stats")
+async def inventory_stats() -> dict[str, Any]:
+    return {
+        "inventory_version": inventory_state.version,
+        "results": inventory_state.cache_stats(),
+        "payloads": inventory_state.payload_stats(),
+        "facets": inventory_state.facet_stats(),
+        "profiles": inventory_state.profile_stats(),
+    }
 
 
 @app.get("/autos/health")
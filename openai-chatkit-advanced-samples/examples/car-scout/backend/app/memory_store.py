@@ -1,17 +1,117 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List
+from itertools import count
+from sys import maxsize
+from typing import Any, Dict, List, Tuple
 
 from chatkit.store import NotFoundError, Store
 from chatkit.types import Attachment, Page, Thread, ThreadItem, ThreadMetadata
 
+# Items sort by creation time, then by the order they were added.
+_ItemKey = Tuple[datetime, int]
+# Threads sort by creation time, then by id.
+_ThreadKey = Tuple[datetime, str]
+
+
+class _ThreadItems:
+    """A thread's items kept in `created_at` order, with each item's sort key by id.
+
+    The keys list is parallel to the items list, so an item's position is
+    one bisect away and a page is a slice.
+    """
+
+    def __init__(self) -> None:
+        self._keys: List[_ItemKey] = []
+        self._items: List[ThreadItem] = []
+        self._keys_by_id: Dict[str, _ItemKey] = {}
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _position(self, item_id: str) -> int | None:
+        key = self._keys_by_id.get(item_id)
+        return None if key is None else bisect_left(self._keys, key)
+
+    def get(self, item_id: str) -> ThreadItem | None:
+        position = self._position(item_id)
+        return None if position is None else self._items[position]
+
+    def put(self, item: ThreadItem) -> None:
+        """Add `item`, or replace the item with its id (which keeps its place among ties)."""
+        position = self._position(item.id)
+        sequence = None
+        if position is not None:
+            if self._keys[position][0] == item.created_at:
+                self._items[position] = item
+                return
+            sequence = self._keys[position][1]
+            self.remove(item.id)
+        key = (item.created_at, next(self._sequence) if sequence is None else sequence)
+        self._keys_by_id[item.id] = key
+        if not self._keys or self._keys[-1] <= key:
+            # Items nearly always arrive in order.
+            self._keys.append(key)
+            self._items.append(item)
+        else:
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._items.insert(position, item)
+
+    def remove(self, item_id: str) -> None:
+        position = self._position(item_id)
+        if position is not None:
+            del self._keys_by_id[item_id]
+            del self._keys[position]
+            del self._items[position]
+
+    def page(self, after: str | None, limit: int, order: str) -> Tuple[List[ThreadItem], bool]:
+        """Up to `limit` items following the `after` item in `order`, and whether more follow.
+
+        An unknown `after` starts from the first item.
+        """
+        position = self._position(after) if after else None
+        if order == "desc":
+            return self._page_desc(position, limit)
+        start = 0 if position is None else position + 1
+        end = start + limit
+        return self._items[start:end], end < len(self._items)
+
+    def _page_desc(self, position: int | None, limit: int) -> Tuple[List[ThreadItem], bool]:
+        """Newest first, keeping items created at the same time in the order they were added.
+
+        Walks runs of equal `created_at` from the newest, each read forwards.
+        """
+        if position is None:
+            end = len(self._keys)
+            start = index = self._run_start(end)
+        else:
+            end = bisect_right(self._keys, (self._keys[position][0], maxsize))
+            start, index = self._run_start(end), position + 1
+        items: List[ThreadItem] = []
+        while len(items) < limit:
+            if index == end:
+                if start == 0:
+                    break
+                end = start
+                start = index = self._run_start(end)
+            taken = self._items[index : min(end, index + limit - len(items))]
+            items += taken
+            index += len(taken)
+        return items, index < end or start > 0
+
+    def _run_start(self, end: int) -> int:
+        """Position of the first item created at the same time as the item before `end`."""
+        return 0 if end == 0 else bisect_left(self._keys, (self._keys[end - 1][0], -1))
+
 
 @dataclass
 class _ThreadState:
     thread: ThreadMetadata
-    items: List[ThreadItem]
+    items: _ThreadItems = field(default_factory=_ThreadItems)
 
 
 class MemoryStore(Store[dict[str, Any]]):
@@ -19,6 +119,8 @@ class MemoryStore(Store[dict[str, Any]]):
 
     def __init__(self) -> None:
         self._threads: Dict[str, _ThreadState] = {}
+        # Every thread's (created_at, id), sorted, so listing threads is a bisect and a slice.
+        self._thread_keys: List[_ThreadKey] = []
         # Attachments intentionally unsupported; use a real store that enforces auth.
 
     @staticmethod
@@ -45,12 +147,28 @@ class MemoryStore(Store[dict[str, Any]]):
         metadata = self._get_thread_metadata(thread)
         state = self._threads.get(thread.id)
         if state:
+            if state.thread.created_at != metadata.created_at:
+                self._unindex_thread(state.thread)
+                self._index_thread(metadata)
             state.thread = metadata
         else:
-            self._threads[thread.id] = _ThreadState(
-                thread=metadata,
-                items=[],
-            )
+            self._add_thread(metadata)
+
+    def _add_thread(self, metadata: ThreadMetadata) -> _ThreadState:
+        state = self._threads[metadata.id] = _ThreadState(thread=metadata)
+        self._index_thread(metadata)
+        return state
+
+    def _index_thread(self, thread: ThreadMetadata) -> None:
+        key = (thread.created_at, thread.id)
+        if not self._thread_keys or self._thread_keys[-1] < key:
+            # Threads nearly always arrive in order.
+            self._thread_keys.append(key)
+        else:
+            insort(self._thread_keys, key)
+
+    def _unindex_thread(self, thread: ThreadMetadata) -> None:
+        del self._thread_keys[bisect_left(self._thread_keys, (thread.created_at, thread.id))]
 
     async def load_threads(
         self,
@@ -59,40 +177,40 @@ class MemoryStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadMetadata]:
-        threads = sorted(
-            (self._get_thread_metadata(state.thread) for state in self._threads.values()),
-            key=lambda t: t.created_at or datetime.min,
-            reverse=(order == "desc"),
-        )
-
-        if after:
-            index_map = {thread.id: idx for idx, thread in enumerate(threads)}
-            start = index_map.get(after, -1) + 1
+        keys = self._thread_keys
+        cursor = self._threads.get(after) if after else None
+        position = None
+        if cursor is not None:
+            position = bisect_left(keys, (cursor.thread.created_at, cursor.thread.id))
+        if order == "desc":
+            end = len(keys) if position is None else position
+            start = max(end - limit, 0)
+            page, has_more = keys[start:end][::-1], start > 0
         else:
-            start = 0
+            start = 0 if position is None else position + 1
+            page, has_more = keys[start : start + limit], start + limit < len(keys)
 
-        slice_threads = threads[start : start + limit + 1]
-        has_more = len(slice_threads) > limit
-        slice_threads = slice_threads[:limit]
-        next_after = slice_threads[-1].id if has_more and slice_threads else None
+        # Only the returned page is copied out of the store.
+        threads = [self._threads[thread_id].thread.model_copy(deep=True) for _, thread_id in page]
+        next_after = threads[-1].id if has_more and threads else None
         return Page(
-            data=slice_threads,
+            data=threads,
             has_more=has_more,
             after=next_after,
         )
 
     async def delete_thread(self, thread_id: str, context: dict[str, Any]) -> None:
-        self._threads.pop(thread_id, None)
+        state = self._threads.pop(thread_id, None)
+        if state is not None:
+            self._unindex_thread(state.thread)
 
     # -- Thread items ----------------------------------------------------
-    def _items(self, thread_id: str) -> List[ThreadItem]:
+    def _items(self, thread_id: str) -> _ThreadItems:
         state = self._threads.get(thread_id)
         if state is None:
-            state = _ThreadState(
-                thread=ThreadMetadata(id=thread_id, created_at=datetime.utcnow()),
-                items=[],
+            state = self._add_thread(
+                ThreadMetadata(id=thread_id, created_at=datetime.utcnow()),
             )
-            self._threads[thread_id] = state
         return state.items
 
     async def load_thread_items(
@@ -103,48 +221,30 @@ class MemoryStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadItem]:
-        items = [item.model_copy(deep=True) for item in self._items(thread_id)]
-        items.sort(
-            key=lambda item: getattr(item, "created_at", datetime.utcnow()),
-            reverse=(order == "desc"),
-        )
-
-        if after:
-            index_map = {item.id: idx for idx, item in enumerate(items)}
-            start = index_map.get(after, -1) + 1
-        else:
-            start = 0
-
-        slice_items = items[start : start + limit + 1]
-        has_more = len(slice_items) > limit
-        slice_items = slice_items[:limit]
-        next_after = slice_items[-1].id if has_more and slice_items else None
-        return Page(data=slice_items, has_more=has_more, after=next_after)
+        page, has_more = self._items(thread_id).page(after, limit, order)
+        # Only the returned page is copied, so callers cannot mutate stored items.
+        data = [item.model_copy(deep=True) for item in page]
+        next_after = data[-1].id if has_more and data else None
+        return Page(data=data, has_more=has_more, after=next_after)
 
     async def add_thread_item(
         self, thread_id: str, item: ThreadItem, context: dict[str, Any]
     ) -> None:
-        self._items(thread_id).append(item.model_copy(deep=True))
+        self._items(thread_id).put(item.model_copy(deep=True))
 
     async def save_item(self, thread_id: str, item: ThreadItem, context: dict[str, Any]) -> None:
-        items = self._items(thread_id)
-        for idx, existing in enumerate(items):
-            if existing.id == item.id:
-                items[idx] = item.model_copy(deep=True)
-                return
-        items.append(item.model_copy(deep=True))
+        self._items(thread_id).put(item.model_copy(deep=True))
 
     async def load_item(self, thread_id: str, item_id: str, context: dict[str, Any]) -> ThreadItem:
-        for item in self._items(thread_id):
-            if item.id == item_id:
-                return item.model_copy(deep=True)
-        raise NotFoundError(f"Item {item_id} not found")
+        item = self._items(thread_id).get(item_id)
+        if item is None:
+            raise NotFoundError(f"Item {item_id} not found")
+        return item.model_copy(deep=True)
 
     async def delete_thread_item(
         self, thread_id: str, item_id: str, context: dict[str, Any]
     ) -> None:
-        items = self._items(thread_id)
-        self._threads[thread_id].items = [item for item in items if item.id != item_id]
+        self._items(thread_id).remove(item_id)
 
     # -- Files -----------------------------------------------------------
     # These methods are not currently used but required to be compatible with the Store interface.
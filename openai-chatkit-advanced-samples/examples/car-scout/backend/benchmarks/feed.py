@@ -0,0 +1,240 @@
+"""Generate synthetic dealer feeds shaped like `app/data/cars.json`.
+
+Makes and locations follow skewed, Zipf-like distributions. Features come
+from a vocabulary that depends on the body style and powertrain. Year,
+mileage and price are correlated the way a used-car lot is:
+
+    python -m benchmarks.feed --cars 1000000 --output feed.json
+    python -m benchmarks.feed --cars 1000000 --output feed.bin --snapshot
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "app" / "data" / "cars.json"
+
+MAKES = (
+    "Aurora",
+    "Summit",
+    "Velo",
+    "Canyon",
+    "Terra",
+    "Zenith",
+    "Northstar",
+    "Metro",
+    "Pioneer",
+    "Vista",
+    "Civic",
+    "Oceanic",
+    "Lumen",
+    "Ember",
+    "Solstice",
+    "Pilot",
+    "Vento",
+    "Heritage",
+    "Bolt",
+    "Flash",
+)
+
+# Roughly in proportion to each city's share of UK used-car listings.
+LOCATIONS = {
+    "London, UK": 24,
+    "Manchester, UK": 9,
+    "Birmingham, UK": 9,
+    "Leeds, UK": 6,
+    "Glasgow, UK": 6,
+    "Bristol, UK": 5,
+    "Liverpool, UK": 5,
+    "Sheffield, UK": 4,
+    "Edinburgh, UK": 4,
+    "Newcastle upon Tyne, UK": 4,
+    "Nottingham, UK": 3,
+    "Leicester, UK": 3,
+    "Cardiff, UK": 3,
+    "Southampton, UK": 3,
+    "Reading, UK": 2,
+    "Brighton, UK": 2,
+    "Oxford, UK": 2,
+    "Cambridge, UK": 2,
+    "Norwich, UK": 2,
+    "Belfast, UK": 2,
+    "Aberdeen, UK": 1,
+}
+
+COMMON_FEATURES = (
+    "Apple CarPlay",
+    "Android Auto",
+    "wireless CarPlay",
+    "navigation",
+    "parking sensors",
+    "HD rear cam",
+    "adaptive cruise",
+    "lane centering",
+    "blind spot monitor",
+    "heated seats",
+    "heated steering wheel",
+    "dual-zone climate",
+    "digital cockpit",
+    "wireless charging pad",
+    "remote start",
+    "matrix headlights",
+    "digital key",
+)
+
+FEATURES_BY_BODY_STYLE = {
+    "SUV": (
+        "panoramic roof",
+        "hands-free liftgate",
+        "roof rails",
+        "tow package",
+        "heated rear seats",
+        "tri-zone climate",
+        "surround sensors",
+        "air suspension",
+    ),
+    "Sedan": (
+        "ventilated seats",
+        "heads-up display",
+        "massage seats",
+        "soft-close doors",
+        "rear sunshades",
+        "Bowers & Wilkins audio",
+        "pilot assist",
+    ),
+    "Hatchback": ("car share mode", "regen paddles", "cooled seats", "auto park"),
+    "Wagon": ("roof rack", "cargo rails", "power ottoman", "hands-free liftgate"),
+    "Coupe": (
+        "sport exhaust",
+        "Brembo brakes",
+        "Recaro seats",
+        "adaptive dampers",
+        "track telemetry",
+        "carbon trim",
+    ),
+    "Truck": (
+        "tow mirrors",
+        "trailer camera",
+        "spray-in liner",
+        "locking rear diff",
+        "gooseneck prep",
+        "exhaust brake",
+        "skid plates",
+        "off-road cruise",
+    ),
+    "Van": (
+        "swivel seats",
+        "rear-seat entertainment",
+        "cabin intercom",
+        "vinyl floor",
+        "rear lounge",
+        "induction cooktop",
+        "outdoor shower",
+    ),
+}
+
+FEATURES_BY_FUEL_TYPE = {
+    "Electric": ("fast charging", "heat pump", "vehicle-to-load", "regen paddles", "solar roof"),
+    "Hybrid": ("regen paddles", "air purifier"),
+    "Diesel": ("smart tow", "trailering tech"),
+    "Gasoline": ("sport exhaust",),
+}
+
+YEARS = range(2012, 2026)
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> list[float]:
+    return [1 / rank**exponent for rank in range(1, count + 1)]
+
+
+def generate_feed(count: int, seed: int = 7) -> Iterator[dict[str, Any]]:
+    """Yield `count` feed entries; the same seed always yields the same feed."""
+    rng = random.Random(seed)
+    templates = json.loads(DATA_PATH.read_text())
+    make_weights = list(accumulate(zipf_weights(len(MAKES))))
+    locations = list(LOCATIONS)
+    location_weights = list(accumulate(LOCATIONS.values()))
+    # Newer stock dominates a used lot; the oldest cars are the rarest.
+    year_weights = list(accumulate(1 + index for index in range(len(YEARS))))
+    newest = YEARS[-1]
+    for _ in range(count):
+        template = rng.choice(templates)
+        year = rng.choices(YEARS, cum_weights=year_weights)[0]
+        age = newest - year
+        mileage = max(0, int(rng.gauss(7_500, 2_500) * (age + rng.random())))
+        depreciation = 0.88**age * max(0.5, 1 - mileage / 300_000)
+        price = max(4_000, int(template["price"] * depreciation * rng.uniform(0.85, 1.2)))
+        range_miles = template["range_miles"]
+        if range_miles is not None:
+            range_miles = max(0, int(range_miles * rng.uniform(0.85, 1.1)))
+        car_id = f"{rng.getrandbits(128):032x}"
+        yield {
+            **template,
+            "id": car_id,
+            "make": rng.choices(MAKES, cum_weights=make_weights)[0],
+            "year": year,
+            "price": price // 50 * 50,
+            "mileage": mileage // 10 * 10,
+            "range_miles": range_miles,
+            "location": rng.choices(locations, cum_weights=location_weights)[0],
+            "features": sample_features(rng, template["body_style"], template["fuel_type"]),
+            "listing_url": f"https://quotes.carwow.co.uk/deals/{car_id}",
+        }
+
+
+def sample_features(rng: random.Random, body_style: str, fuel_type: str) -> list[str]:
+    specific = FEATURES_BY_BODY_STYLE.get(body_style, ()) + FEATURES_BY_FUEL_TYPE.get(fuel_type, ())
+    features = rng.sample(COMMON_FEATURES, rng.randint(1, 4))
+    features += rng.sample(specific, min(len(specific), rng.randint(1, 4)))
+    return features
+
+
+def reparsed(entries: Iterable[dict[str, Any]], batch: int = 10_000) -> Iterator[dict[str, Any]]:
+    """Round-trip `entries` through JSON, so repeated values are separate strings as in a feed."""
+    pending: list[dict[str, Any]] = []
+    for entry in entries:
+        pending.append(entry)
+        if len(pending) == batch:
+            yield from json.loads(json.dumps(pending))
+            pending = []
+    yield from json.loads(json.dumps(pending))
+
+
+def write_feed(path: Path, count: int, seed: int = 7) -> None:
+    """Write a generated feed as a JSON array, streamed so large feeds never sit in memory."""
+    with path.open("w") as output:
+        output.write("[")
+        for index, entry in enumerate(generate_feed(count, seed)):
+            output.write(",\n" if index else "\n")
+            output.write(json.dumps(entry))
+        output.write("\n]\n")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=100_000, help="Cars to generate")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument(
+        "--snapshot", action="store_true", help="Compile a memory-mapped snapshot instead of JSON"
+    )
+    args = parser.parse_args(argv)
+    if args.snapshot:
+        from app.car_inventory import CarRecord
+        from app.inventory_snapshot import compile_snapshot
+
+        # Compiled straight from the generator, so no feed is written or held in memory.
+        cars = (CarRecord(**entry) for entry in generate_feed(args.cars, args.seed))
+        compile_snapshot(cars, args.output)
+    else:
+        write_feed(args.output, args.cars, args.seed)
+    print(f"wrote {args.cars:,} cars to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Benchmark the inventory hot paths and write the timings as JSON.
+
+Generates a feed of each requested size, then times `load_inventory`,
+`_apply_filters`, `update_filters`, `snapshot` and `build_context_block`
+for each engine over a fixed set of filter mixes:
+
+    python -m benchmarks.inventory --cars 10000 100000 --output results.json
+    python -m benchmarks.inventory --cars 100000 --output new.json --compare results.json
+
+Timings are milliseconds per call. `--compare` prints the ratio of each
+median to the matching one in an earlier results file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from app.car_inventory import CarFilters, CarInventoryStore, load_inventory
+
+from .feed import write_feed
+
+FILTER_MIXES: dict[str, dict[str, Any]] = {
+    "unfiltered": {},
+    "budget": {"price_max": 20_000},
+    "family_suv": {"body_styles": ["SUV"], "seats_min": 7, "price_max": 45_000},
+    "ev_commuter": {
+        "fuel_types": ["Electric"],
+        "max_mileage": 30_000,
+        "must_have_features": ["heat pump"],
+    },
+    "narrow": {
+        "makes": ["Summit"],
+        "locations": ["London, UK"],
+        "min_year": 2022,
+        "drivetrains": ["AWD"],
+    },
+    "nearby": {"near": "Reading", "radius_miles": 40, "price_max": 30_000},
+    "no_match": {"price_max": 5_000, "fuel_types": ["Electric"], "seats_min": 8},
+}
+
+CARD_FIELDS = ["id", "name", "price", "mileage", "year", "location", "image_url"]
+
+
+def timed(call: Callable[[], object], repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def time_load(path: Path, engine: str, repeat: int) -> tuple[CarInventoryStore, dict[str, Any]]:
+    os.environ["CAR_INVENTORY_PATH"] = str(path)
+    os.environ["CAR_INVENTORY_ENGINE"] = engine
+    stores: list[CarInventoryStore] = []
+    timing = timed(lambda: stores.append(load_inventory()), repeat)
+    for store in stores[:-1]:
+        store.close()
+    return stores[-1], timing
+
+
+def time_mix(
+    store: CarInventoryStore, name: str, update: dict[str, Any], repeat: int
+) -> dict[str, Any]:
+    filters = CarFilters()
+    store._apply_update(filters, dict(update))
+    threads = (f"{name}-{index}" for index in count())
+    # Every call starts a new thread, so only the first misses the result cache.
+    start = time.perf_counter()
+    matches = len(store.update_filters(next(threads), dict(update)))
+    cold = (time.perf_counter() - start) * 1000
+    warm = timed(lambda: store.update_filters(next(threads), dict(update)), repeat)
+    thread_id = next(threads)
+    store.update_filters(thread_id, dict(update))
+    return {
+        "matches": matches,
+        "apply_filters": timed(lambda: store._apply_filters(filters), repeat),
+        "update_filters": {"cold_ms": cold, **warm},
+        "snapshot_cards": timed(
+            lambda: store.snapshot(thread_id, limit=24, fields=CARD_FIELDS), repeat
+        ),
+        "snapshot_page": timed(lambda: store.snapshot(thread_id, limit=100), repeat),
+        "build_context_block": timed(lambda: store.build_context_block(thread_id), repeat),
+    }
+
+
+def run(sizes: Sequence[int], engines: Sequence[str], seed: int, repeat: int) -> dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for cars in sizes:
+            path = Path(directory) / f"cars-{cars}.json"
+            write_feed(path, cars, seed)
+            for engine in engines:
+                # Loading is slow at scale, so it is timed fewer times.
+                store, load = time_load(path, engine, max(1, repeat // 5))
+                mixes = {
+                    name: time_mix(store, name, update, repeat)
+                    for name, update in FILTER_MIXES.items()
+                }
+                store.close()
+                results.append({"cars": cars, "engine": engine, "load": load, "mixes": mixes})
+                print(f"{cars:>10,} cars  {engine:<6} load {load['median_ms']:9.1f} ms")
+    return {"meta": metadata(seed, repeat), "results": results}
+
+
+def metadata(seed: int, repeat: int) -> dict[str, Any]:
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False
+    ).stdout.strip()
+    return {
+        "commit": commit or None,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+def medians(report: dict[str, Any]) -> dict[tuple[Any, ...], float]:
+    """Every median in a report, keyed by (cars, engine, mix, operation)."""
+    flat = {}
+    for result in report["results"]:
+        key = (result["cars"], result["engine"])
+        flat[(*key, None, "load")] = result["load"]["median_ms"]
+        for mix, timings in result["mixes"].items():
+            for operation, timing in timings.items():
+                if isinstance(timing, dict):
+                    flat[(*key, mix, operation)] = timing["median_ms"]
+    return flat
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> None:
+    before = medians(baseline)
+    print(f"\nvs {baseline['meta'].get('commit')} (ratio > 1 is slower)")
+    for key, after in medians(report).items():
+        if key in before and before[key] > 0:
+            cars, engine, mix, operation = key
+            label = f"{cars:,} {engine} {mix or '-'} {operation}"
+            print(
+                f"  {label:<55} {before[key]:9.2f} -> {after:9.2f} ms  {after / before[key]:5.2f}x"
+            )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--engine", nargs="+", default=["python", "numpy"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per operation")
+    parser.add_argument("--output", type=Path, help="Write the results here as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.cars, args.engine, args.seed, args.repeat)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure how many bytes each loaded car costs in memory.
+
+Compares the original plain-dataclass record (its own copy of every string,
+a list of features) with the slotted, interned `CarRecord`:
+
+    python -m benchmarks.record_memory --cars 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Callable
+
+from app.car_inventory import CarRecord
+
+from .feed import generate_feed, reparsed
+
+
+@dataclass
+class LegacyCarRecord:
+    id: str
+    make: str
+    model: str
+    trim: str
+    year: int
+    price: int
+    mileage: int
+    body_style: str
+    drivetrain: str
+    fuel_type: str
+    seats: int
+    range_miles: int | None
+    color: str
+    location: str
+    description: str
+    features: list[str]
+    listing_url: str
+    image_url: str
+
+
+def deep_size(records: list[Any]) -> int:
+    """Bytes held by `records`, counting objects shared between cars only once."""
+    seen: set[int] = set()
+    total = sys.getsizeof(records)
+
+    def visit(value: object) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value)
+        if isinstance(value, (list, tuple)):
+            size += sum(visit(item) for item in value)
+        return size
+
+    for record in records:
+        total += sys.getsizeof(record)
+        if hasattr(record, "__dict__"):
+            total += sys.getsizeof(record.__dict__)
+        total += sum(visit(getattr(record, field.name)) for field in fields(record))
+    return total
+
+
+def bytes_per_car(build: Callable[..., object], count: int) -> float:
+    records = [build(**entry) for entry in reparsed(generate_feed(count))]
+    return deep_size(records) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1_000_000, help="Cars to generate")
+    args = parser.parse_args()
+
+    before = bytes_per_car(LegacyCarRecord, args.cars)
+    after = bytes_per_car(CarRecord, args.cars)
+    print(f"cars:   {args.cars:,}")
+    print(f"before: {before:,.0f} bytes/car (plain dataclass)")
+    print(f"after:  {after:,.0f} bytes/car (slotted, interned CarRecord)")
+    print(f"saved:  {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
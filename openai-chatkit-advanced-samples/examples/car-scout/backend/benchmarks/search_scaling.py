@@ -0,0 +1,75 @@
+"""Measure how sharded search scales with the number of worker processes.
+
+Times a fixed set of searches in-process and then through a
+`ShardedSearchExecutor` with each requested worker count:
+
+    python -m benchmarks.search_scaling --cars 1000000 --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.car_inventory import CarFilters, CarInventoryStore
+from app.inventory_parallel import ShardedSearchExecutor
+
+from .feed import write_feed
+
+QUERIES = (
+    CarFilters(price_max=20_000),
+    CarFilters(body_styles=["SUV"], drivetrains=["AWD"], seats_min=5),
+    CarFilters(price_min=25_000, price_max=45_000, max_mileage=40_000, min_year=2020),
+    CarFilters(fuel_types=["Electric"], must_have_features=["heated"]),
+)
+
+
+async def time_executor(store: CarInventoryStore, workers: int, rounds: int) -> float:
+    executor = ShardedSearchExecutor(workers)
+    try:
+        columns = store._search_columns()
+        executor.publish(columns, columns.order, store.version)
+        for filters in QUERIES:
+            # Warm-up: starts the workers and maps the columns in each of them.
+            await executor.search(filters)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for filters in QUERIES:
+                await executor.search(filters)
+        return (time.perf_counter() - start) / (rounds * len(QUERIES))
+    finally:
+        executor.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=1_000_000, help="Cars to generate")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to try"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the queries")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        feed = Path(directory) / "cars.json"
+        write_feed(feed, args.cars)
+        store = CarInventoryStore(feed, engine="numpy")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for filters in QUERIES:
+            store._filter_rows(filters)
+    inline = (time.perf_counter() - start) / (args.rounds * len(QUERIES))
+    print(f"cars:      {args.cars:,} on {os.cpu_count()} cores")
+    print(f"in-process: {inline * 1000:8.1f} ms/search")
+    for workers in args.workers:
+        elapsed = asyncio.run(time_executor(store, workers, args.rounds))
+        print(f"{workers:2d} workers: {elapsed * 1000:8.1f} ms/search ({inline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Generated feeds for the tests, with deltas and a reference scan to check engines against."""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+from app.car_inventory import CarFilters, CarRecord
+from benchmarks.feed import generate_feed, write_feed
+
+
+class Feed:
+    """A generated feed on disk, and the entries it holds after the deltas made so far."""
+
+    def __init__(self, path: Path, count: int, seed: int) -> None:
+        write_feed(path, count, seed)
+        self.path = path
+        self.entries: list[dict[str, Any]] = json.loads(path.read_text())
+        self.rng = random.Random(seed)
+        self._arrivals = generate_feed(10 * count, seed + 1)
+
+    def ids(self) -> list[str]:
+        return [entry["id"] for entry in self.entries]
+
+    def delta(self) -> tuple[list[CarRecord], list[str]]:
+        """Reprice a few cars, add and remove a few, and return the delta that does the same."""
+        rng = self.rng
+        upserts = [
+            {
+                **entry,
+                "price": rng.randrange(4_000, 60_000, 50),
+                "mileage": rng.randrange(0, 90_000, 10),
+            }
+            for entry in rng.sample(self.entries, rng.randint(0, 4))
+        ]
+        upserts += [next(self._arrivals) for _ in range(rng.randint(0, 3))]
+        removals = [entry["id"] for entry in rng.sample(self.entries, rng.randint(0, 3))]
+        positions = {entry["id"]: position for position, entry in enumerate(self.entries)}
+        for upsert in upserts:
+            if upsert["id"] in positions:
+                self.entries[positions[upsert["id"]]] = upsert
+            else:
+                self.entries.append(upsert)
+        removed = set(removals)
+        self.entries = [entry for entry in self.entries if entry["id"] not in removed]
+        return [CarRecord(**upsert) for upsert in upserts], removals
+
+    def filters(self) -> dict[str, Any]:
+        """A random filter update built around one of the cars, so it usually matches some."""
+        rng = self.rng
+        car = rng.choice(self.entries)
+        update: dict[str, Any] = {}
+        if rng.random() < 0.5:
+            update["price_max"] = car["price"]
+        if rng.random() < 0.3:
+            update["price_min"] = car["price"] // 2
+        if rng.random() < 0.3:
+            update["max_mileage"] = car["mileage"]
+        if rng.random() < 0.3:
+            update["min_year"] = car["year"]
+        if rng.random() < 0.3:
+            update["seats_min"] = car["seats"]
+        for key, attribute in (
+            ("makes", "make"),
+            ("body_styles", "body_style"),
+            ("drivetrains", "drivetrain"),
+            ("fuel_types", "fuel_type"),
+            ("locations", "location"),
+        ):
+            if rng.random() < 0.25:
+                update[key] = [car[attribute]]
+        if rng.random() < 0.3:
+            update["must_have_features"] = rng.sample(car["features"], 1)
+        if rng.random() < 0.2:
+            update["near"] = car["location"].split(",")[0]
+            update["radius_miles"] = rng.choice([10, 50, 150])
+        return update
+
+    def scan(self, update: dict[str, Any]) -> list[str]:
+        """Ids matching `update` by checking every car, cheapest first, as the engines order them."""
+        filters = CarFilters(**update)
+        cars = [CarRecord(**entry) for entry in self.entries]
+        matches = [car for car in cars if filters.matches(car)]
+        matches.sort(key=lambda car: (car.price, car.mileage))
+        return [car.id for car in matches]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.car_inventory import CarInventoryStore
+from tests.feeds import Feed
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def store(feed: Feed, monkeypatch: pytest.MonkeyPatch) -> CarInventoryStore:
+    store = CarInventoryStore(feed.path)
+    monkeypatch.setattr(main, "inventory_state", store)
+    return store
+
+
+@pytest.fixture
+def client(store: CarInventoryStore) -> TestClient:
+    return TestClient(main.app)
+
+
+def _car(feed: Feed, **changes: Any) -> dict[str, Any]:
+    return {**feed.entries[0], **changes}
+
+
+def test_cars_pages_through_every_match(client: TestClient, store: CarInventoryStore) -> None:
+    ids: list[str] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 50, "fields": "id,price"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/autos/cars", params=params)
+        assert response.status_code == 200
+        inventory = response.json()["inventory"]
+        assert all(set(car) == {"id", "price"} for car in inventory["cars"])
+        ids += [car["id"] for car in inventory["cars"]]
+        cursor = inventory["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == [car.id for car in store.initial_matches()]
+    assert inventory["total"] == len(ids)
+
+
+def test_cars_rejects_bad_cursors_and_fields(client: TestClient) -> None:
+    assert client.get("/autos/cars", params={"cursor": "nope"}).status_code == 400
+    assert client.get("/autos/cars", params={"fields": "id,nope"}).status_code == 400
+
+
+def test_cars_answers_unchanged_pages_with_304(
+    client: TestClient, feed: Feed, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    first = client.get("/autos/cars", params={"limit": 10})
+    etag = first.headers["ETag"]
+    unchanged = client.get("/autos/cars", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["ETag"] == etag
+    assert client.get("/autos/cars", params={"limit": 20}).headers["ETag"] != etag
+
+    monkeypatch.setenv("CAR_INVENTORY_ADMIN_TOKEN", TOKEN)
+    cheapest = first.json()["inventory"]["cars"][0]
+    delta = {"remove": [cheapest["id"]]}
+    response = client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    changed = client.get("/autos/cars", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert cheapest["id"] not in {car["id"] for car in changed.json()["inventory"]["cars"]}
+
+
+def test_delta_needs_the_admin_token(
+    client: TestClient, store: CarInventoryStore, feed: Feed, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    delta = {"upsert": [_car(feed, price=1_000)]}
+    monkeypatch.delenv("CAR_INVENTORY_ADMIN_TOKEN", raising=False)
+    assert client.post("/autos/cars/delta", json=delta).status_code == 403
+    assert (
+        client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": TOKEN}).status_code
+        == 403
+    )
+
+    monkeypatch.setenv("CAR_INVENTORY_ADMIN_TOKEN", TOKEN)
+    assert client.post("/autos/cars/delta", json=delta).status_code == 403
+    response = client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    assert store.version == 0
+
+    response = client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    assert response.json()["inventory"]["updated"] == 1
+    assert store.version == 1
+    assert store.initial_matches()[0].price == 1_000
+
+
+@pytest.mark.parametrize(
+    ("changes", "status"),
+    [
+        ({"price": "cheap"}, 400),
+        ({"seats": 5.5}, 400),
+        ({"colour": "Red"}, 400),
+        ({"price": -1}, 422),
+        ({"seats": -5}, 422),
+        ({"year": -2020}, 422),
+        ({"range_miles": -1}, 422),
+        ({"mileage": -10}, 422),
+        ({"mileage": 1 << 32}, 422),
+    ],
+)
+def test_delta_rejects_bad_cars(
+    client: TestClient,
+    store: CarInventoryStore,
+    feed: Feed,
+    monkeypatch: pytest.MonkeyPatch,
+    changes: dict[str, Any],
+    status: int,
+) -> None:
+    monkeypatch.setenv("CAR_INVENTORY_ADMIN_TOKEN", TOKEN)
+    # A good car alongside the bad one must not be applied either.
+    delta = {"upsert": [_car(feed, price=1_000), {**feed.entries[1], **changes}]}
+    response = client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == status
+    assert store.version == 0
+    assert store.initial_matches()[0].price == feed.entries[0]["price"]
+
+
+def test_delta_accepts_the_largest_mileage(
+    client: TestClient, store: CarInventoryStore, feed: Feed, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("CAR_INVENTORY_ADMIN_TOKEN", TOKEN)
+    delta = {"upsert": [_car(feed, mileage=(1 << 32) - 1)]}
+    response = client.post("/autos/cars/delta", json=delta, headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    car_id = feed.entries[0]["id"]
+    assert car_id in {car.id for car in store.update_filters("a", {"max_mileage": (1 << 32) - 1})}
+    assert car_id not in {car.id for car in store.update_filters("b", {"max_mileage": 1 << 31})}
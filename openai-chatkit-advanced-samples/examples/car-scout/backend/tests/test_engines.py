@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.car_inventory import CarInventoryStore, load_records
+from app.inventory_snapshot import compile_snapshot
+from app.inventory_sqlite import compile_database
+from tests.feeds import Feed
+
+
+def _store(feed: Feed, tmp_path: Path, engine: str) -> CarInventoryStore:
+    if engine == "snapshot":
+        path = tmp_path / "feed.bin"
+        compile_snapshot(load_records(feed.path), path)
+        return CarInventoryStore(path)
+    if engine == "sqlite":
+        path = tmp_path / "feed.db"
+        compile_database(load_records(feed.path), path)
+        return CarInventoryStore(path)
+    if engine == "process":
+        return CarInventoryStore(feed.path, engine="numpy", search_workers=2)
+    return CarInventoryStore(feed.path, engine=engine)
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy", "snapshot", "sqlite", "process"])
+def test_engines_match_a_scan(feed: Feed, tmp_path: Path, engine: str) -> None:
+    """Every engine finds what checking each car would, before and after deltas."""
+    store = _store(feed, tmp_path, engine)
+
+    async def check() -> None:
+        for step in range(12):
+            for query in range(4):
+                update = feed.filters()
+                thread_id = f"thread-{step}-{query}"
+                expected = feed.scan(update)
+                assert [car.id for car in store.update_filters(thread_id, update)] == expected
+                matches = await store.update_filters_async(f"{thread_id}-async", update)
+                assert [car.id for car in matches] == expected
+            upserts, removals = feed.delta()
+            store.apply_delta(upserts, removals)
+            assert [car.id for car in store.initial_matches()] == feed.ids()
+
+    try:
+        asyncio.run(check())
+    finally:
+        store.close()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from app.car_inventory import CarInventoryStore, load_records
+from app.inventory_sqlite import compile_database
+from tests.feeds import Feed
+
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_deltas_stay_in_memory(feed: Feed, tmp_path: Path) -> None:
+    """Deltas overlay the database without writing it, so other stores see it as compiled."""
+    database = tmp_path / "feed.db"
+    compile_database(load_records(feed.path), database)
+    digest = _digest(database)
+    loaded = feed.ids()
+    store = CarInventoryStore(database)
+    try:
+        for _ in range(60):
+            store.apply_delta(*feed.delta())
+        assert _digest(database) == digest
+        assert [car.id for car in store.initial_matches()] == feed.ids()
+        for query in range(20):
+            update = feed.filters()
+            expected = feed.scan(update)
+            assert [car.id for car in store.update_filters(f"t{query}", update)] == expected
+
+        # Another process opening the file now sees the feed it was compiled from.
+        other = CarInventoryStore(database)
+        assert [car.id for car in other.initial_matches()] == loaded
+        other.close()
+        store.apply_delta(*feed.delta())
+        assert [car.id for car in store.initial_matches()] == feed.ids()
+        assert _digest(database) == digest
+    finally:
+        store.close()
@@ -11,13 +11,11 @@ import {
 type ChatKitPanelProps = {
   theme: ColorScheme;
   onThreadChange: (threadId: string | null) => void;
-  onResponseCompleted: () => void;
 };
 
 export function ChatKitPanel({
   theme,
   onThreadChange,
-  onResponseCompleted,
 }: ChatKitPanelProps) {
 
   const chatkit = useChatKit({
@@ -50,9 +48,6 @@ export function ChatKitPanel({
     threadItemActions: {
       feedback: false,
     },
-    onResponseEnd: () => {
-      onResponseCompleted();
-    },
     onThreadChange: ({ threadId }) => {
       onThreadChange(threadId ?? null);
     },
@@ -8,7 +8,17 @@ import type { ColorScheme } from "../hooks/useColorScheme";
 
 export default function Home() {
   const [threadId, setThreadId] = useState<string | null>(null);
-  const { cars, filters, total, activeFilters, loading, error, refresh } = useInventory(threadId);
+  const {
+    cars,
+    filters,
+    total,
+    activeFilters,
+    loading,
+    error,
+    hasMore,
+    loadingMore,
+    loadMore,
+  } = useInventory(threadId);
   const scheme: ColorScheme = "light";
 
   const containerClass = clsx(
@@ -22,10 +32,6 @@ export default function Home() {
     setThreadId(nextThreadId);
   }, []);
 
-  const handleResponseCompleted = useCallback(() => {
-    void refresh();
-  }, [refresh]);
-
   return (
     <div className={containerClass}>
       <div className="mx-auto flex min-h-screen w-full max-w-6xl flex-col gap-8 px-6 py-8 lg:h-screen lg:max-h-screen lg:py-10">
@@ -38,8 +44,8 @@ export default function Home() {
               Find the right car without dealer speak
             </h1>
             <p className="max-w-3xl text-sm text-slate-600 dark:text-slate-300">
-              Chat with the salesperson-like agent on the left. Every reply refreshes the short
-              list on the right so you can see how each filter narrows the inventory.
+              Chat with the salesperson-like agent on the left. The short list on the right
+              updates as soon as a filter changes, so you can see how each one narrows the inventory.
             </p>
           </div>
         </header>
@@ -50,7 +56,6 @@ export default function Home() {
               <ChatKitPanel
                 theme={scheme}
                 onThreadChange={handleThreadChange}
-                onResponseCompleted={handleResponseCompleted}
               />
             </div>
           </section>
@@ -62,6 +67,9 @@ export default function Home() {
             activeFilters={activeFilters}
             loading={loading}
             error={error}
+            hasMore={hasMore}
+            loadingMore={loadingMore}
+            onLoadMore={loadMore}
           />
         </div>
       </div>
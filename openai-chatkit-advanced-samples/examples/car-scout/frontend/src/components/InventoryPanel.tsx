@@ -1,6 +1,6 @@
 import clsx from "clsx";
 
-import type { CarRecord, InventoryFilters } from "../hooks/useInventory";
+import type { CarCardRecord, InventoryFilters } from "../hooks/useInventory";
 
 const currency = new Intl.NumberFormat("en-GB", {
   style: "currency",
@@ -10,15 +10,28 @@ const currency = new Intl.NumberFormat("en-GB", {
 const mileageFormat = new Intl.NumberFormat("en-GB");
 
 type InventoryPanelProps = {
-  cars: CarRecord[];
+  cars: CarCardRecord[];
   filters: InventoryFilters | null;
   total: number;
   activeFilters: string[];
   loading: boolean;
   error: string | null;
+  hasMore: boolean;
+  loadingMore: boolean;
+  onLoadMore: () => void;
 };
 
-export function InventoryPanel({ cars, filters, total, activeFilters, loading, error }: InventoryPanelProps) {
+export function InventoryPanel({
+  cars,
+  filters,
+  total,
+  activeFilters,
+  loading,
+  error,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+}: InventoryPanelProps) {
   if (loading) {
     return (
       <section className="flex h-full flex-col gap-4 rounded-3xl border border-slate-200/60 bg-white/80 p-6 shadow-[0_45px_90px_-45px_rgba(15,23,42,0.5)] ring-1 ring-slate-200/60 backdrop-blur dark:border-slate-800/70 dark:bg-slate-900/70 dark:shadow-[0_45px_95px_-55px_rgba(15,23,42,0.85)] dark:ring-slate-800/60">
@@ -89,6 +102,16 @@ export function InventoryPanel({ cars, filters, total, activeFilters, loading, e
             {cars.map((car) => (
               <CarCard key={car.id} car={car} />
             ))}
+            {hasMore && (
+              <button
+                type="button"
+                onClick={onLoadMore}
+                disabled={loadingMore}
+                className="rounded-full border border-slate-200 px-4 py-2 text-sm font-semibold text-slate-600 transition hover:border-emerald-300 disabled:opacity-60 dark:border-slate-700 dark:text-slate-300"
+              >
+                {loadingMore ? "Loading…" : `Show more (${cars.length} of ${total})`}
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -96,7 +119,7 @@ export function InventoryPanel({ cars, filters, total, activeFilters, loading, e
   );
 }
 
-function CarCard({ car }: { car: CarRecord }) {
+function CarCard({ car }: { car: CarCardRecord }) {
   return (
     <article className="flex flex-col gap-4 rounded-2xl border border-slate-200 bg-white/95 p-4 shadow-sm transition hover:border-emerald-300 hover:shadow-md dark:border-slate-800 dark:bg-slate-900/80">
       <div className="flex flex-col gap-3 sm:flex-row">
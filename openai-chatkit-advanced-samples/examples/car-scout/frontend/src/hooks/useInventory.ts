@@ -1,6 +1,6 @@
-import { useCallback, useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 
-import { CAR_INVENTORY_URL } from "../lib/config";
+import { CAR_INVENTORY_EVENTS_URL, CAR_INVENTORY_URL } from "../lib/config";
 
 const currencyFormatter = new Intl.NumberFormat("en-GB", {
   style: "currency",
@@ -31,6 +31,28 @@ export type CarRecord = {
   image_url: string;
 };
 
+// Only the fields the inventory cards render are fetched.
+const CARD_FIELDS = [
+  "id",
+  "name",
+  "price",
+  "mileage",
+  "body_style",
+  "drivetrain",
+  "fuel_type",
+  "seats",
+  "range_miles",
+  "location",
+  "description",
+  "features",
+  "listing_url",
+  "image_url",
+] as const;
+
+const PAGE_SIZE = 24;
+
+export type CarCardRecord = Pick<CarRecord, (typeof CARD_FIELDS)[number]>;
+
 export type InventoryFilters = {
   price_min: number | null;
   price_max: number | null;
@@ -43,56 +65,167 @@ export type InventoryFilters = {
   min_year: number | null;
   must_have_features: string[];
   locations: string[];
+  near: string | null;
+  radius_miles: number | null;
 };
 
 type InventoryResponse = {
   inventory: {
-    cars: CarRecord[];
+    cars: CarCardRecord[];
     filters: InventoryFilters;
     total: number;
+    next_cursor: string | null;
   };
 };
 
+/** Pushed by the backend when the agent changes the thread's filters or matches. */
+type InventoryChange = {
+  filters: InventoryFilters;
+  total: number;
+  reordered: boolean;
+  replaced: boolean;
+  added: string[];
+  removed: string[];
+};
+
+type InventoryPage = {
+  payload: InventoryResponse;
+  etag: string | null;
+};
+
+/** Resolves to null when `etag` still matches, i.e. the page has not changed. */
+async function fetchInventoryPage(
+  threadId: string | null,
+  cursor: string | null,
+  etag: string | null = null
+): Promise<InventoryPage | null> {
+  const url = new URL(CAR_INVENTORY_URL, window.location.origin);
+  if (threadId) {
+    url.searchParams.set("thread_id", threadId);
+  }
+  if (cursor) {
+    url.searchParams.set("cursor", cursor);
+  }
+  url.searchParams.set("limit", String(PAGE_SIZE));
+  url.searchParams.set("fields", CARD_FIELDS.join(","));
+  const headers: Record<string, string> = { Accept: "application/json" };
+  if (etag) {
+    headers["If-None-Match"] = etag;
+  }
+  const response = await fetch(url.toString(), { headers, cache: "no-store" });
+  if (response.status === 304) {
+    return null;
+  }
+  if (!response.ok) {
+    throw new Error(`Failed to load inventory (${response.status})`);
+  }
+  return {
+    payload: (await response.json()) as InventoryResponse,
+    etag: response.headers.get("ETag"),
+  };
+}
+
 export function useInventory(threadId: string | null) {
-  const [cars, setCars] = useState<CarRecord[]>([]);
+  const [cars, setCars] = useState<CarCardRecord[]>([]);
   const [filters, setFilters] = useState<InventoryFilters | null>(null);
   const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // ETag of the first page on screen, so unchanged refreshes come back as empty 304s.
+  const firstPageEtag = useRef<{ threadId: string | null; etag: string | null }>({
+    threadId: null,
+    etag: null,
+  });
 
   const fetchInventory = useCallback(async () => {
-    setLoading(true);
+    const known = firstPageEtag.current;
+    const etag = known.threadId === threadId ? known.etag : null;
+    // With a page on screen, refreshes mostly come back as 304s: keep showing it meanwhile.
+    if (!etag) {
+      setLoading(true);
+    }
     setError(null);
     try {
-      const url = new URL(CAR_INVENTORY_URL, window.location.origin);
-      if (threadId) {
-        url.searchParams.set("thread_id", threadId);
-      }
-      const response = await fetch(url.toString(), {
-        headers: { Accept: "application/json" },
-      });
-      if (!response.ok) {
-        throw new Error(`Failed to load inventory (${response.status})`);
+      const page = await fetchInventoryPage(threadId, null, etag);
+      if (!page) {
+        return;
       }
-      const payload = (await response.json()) as InventoryResponse;
+      const { payload } = page;
+      firstPageEtag.current = { threadId, etag: page.etag };
       setCars(payload.inventory.cars);
       setFilters(payload.inventory.filters);
       setTotal(payload.inventory.total);
+      setNextCursor(payload.inventory.next_cursor);
     } catch (err) {
       const message = err instanceof Error ? err.message : String(err);
       setError(message);
+      firstPageEtag.current = { threadId, etag: null };
       setCars([]);
       setFilters(null);
       setTotal(0);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   }, [threadId]);
 
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const page = await fetchInventoryPage(threadId, nextCursor);
+      if (!page) {
+        return;
+      }
+      const { payload } = page;
+      setCars((current) => [...current, ...payload.inventory.cars]);
+      setTotal(payload.inventory.total);
+      setNextCursor(payload.inventory.next_cursor);
+    } catch {
+      // The results changed underneath the cursor; start again from the first page.
+      await fetchInventory();
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [fetchInventory, loadingMore, nextCursor, threadId]);
+
   useEffect(() => {
     void fetchInventory();
   }, [fetchInventory]);
 
+  useEffect(() => {
+    if (!threadId) {
+      return;
+    }
+    const url = new URL(CAR_INVENTORY_EVENTS_URL, window.location.origin);
+    url.searchParams.set("thread_id", threadId);
+    const source = new EventSource(url.toString());
+    // Catch up on anything that changed while the stream was (re)connecting.
+    source.onopen = () => {
+      void fetchInventory();
+    };
+    source.addEventListener("inventory", (event) => {
+      const change = JSON.parse((event as MessageEvent<string>).data) as InventoryChange;
+      if (change.replaced || change.reordered || change.added.length > 0) {
+        void fetchInventory();
+        return;
+      }
+      // Only removals: drop them locally instead of refetching.
+      const removed = new Set(change.removed);
+      firstPageEtag.current = { threadId, etag: null };
+      setCars((current) => current.filter((car) => !removed.has(car.id)));
+      setFilters(change.filters);
+      setTotal(change.total);
+    });
+    return () => {
+      source.close();
+    };
+  }, [fetchInventory, threadId]);
+
   const activeFilters = useMemo(() => {
     if (!filters) {
       return [] as string[];
@@ -136,6 +269,9 @@ export function useInventory(threadId: string | null) {
     if (filters.locations.length) {
       chips.push(`Near ${filters.locations.join(", ")}`);
     }
+    if (filters.near) {
+      chips.push(`Within ${filters.radius_miles} mi of ${filters.near}`);
+    }
     return chips;
   }, [filters]);
 
@@ -146,6 +282,9 @@ export function useInventory(threadId: string | null) {
     activeFilters,
     loading,
     error,
+    hasMore: nextCursor !== null,
+    loadingMore,
+    loadMore,
     refresh: fetchInventory,
   };
 }
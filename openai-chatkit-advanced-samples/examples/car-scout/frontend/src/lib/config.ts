@@ -19,6 +19,9 @@ export const AUTO_CHATKIT_API_URL =
 export const CAR_INVENTORY_URL =
   import.meta.env.VITE_AUTO_INVENTORY_URL ?? `${AUTO_API_BASE}/cars`;
 
+export const CAR_INVENTORY_EVENTS_URL =
+  import.meta.env.VITE_AUTO_INVENTORY_EVENTS_URL ?? `${AUTO_API_BASE}/cars/events`;
+
 export const CAR_GREETING =
   import.meta.env.VITE_AUTO_GREETING ??
   "Tell me how you drive and I'll shortlist a few cars.";